@@ -0,0 +1,58 @@
+"""Add precomputed snippet and sizes to ticket_messages
+
+Revision ID: 4413c939dbe9
+Revises: 7cd76a49e601
+Create Date: 2026-10-19 11:20:05.371446
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4413c939dbe9'
+down_revision: Union[str, None] = '7cd76a49e601'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BACKFILL_CHUNK_SIZE = 5000
+
+
+def upgrade() -> None:
+    op.add_column('ticket_messages', sa.Column('snippet', sa.String(length=255), nullable=True))
+    op.add_column('ticket_messages', sa.Column('body_size', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('ticket_messages', sa.Column('attachment_count', sa.Integer(), server_default='0', nullable=False))
+
+    # Backfill in id ranges to keep each statement (and its locks) small
+    bind = op.get_bind()
+    max_id = bind.execute(sa.text("SELECT MAX(id) FROM ticket_messages")).scalar() or 0
+    for start in range(0, max_id + 1, BACKFILL_CHUNK_SIZE):
+        bind.execute(sa.text("""
+            UPDATE ticket_messages
+            SET snippet = LEFT(TRIM(REGEXP_REPLACE(body, '[[:space:]]+', ' ')), 200),
+                body_size = LENGTH(body),
+                attachment_count = CASE
+                    WHEN attachments_json IS NOT NULL AND JSON_VALID(attachments_json)
+                    THEN COALESCE(JSON_LENGTH(attachments_json), 0)
+                    ELSE 0
+                END
+            WHERE id >= :start AND id < :end
+        """), {"start": start, "end": start + BACKFILL_CHUNK_SIZE})
+
+    # Refresh the list projection from the new column
+    op.execute("""
+        UPDATE ticket_list_view v
+        SET v.last_message_snippet = (
+            SELECT m.snippet FROM ticket_messages m
+            WHERE m.ticket_id = v.ticket_id
+            ORDER BY m.sent_at DESC, m.id DESC LIMIT 1
+        )
+    """)
+
+
+def downgrade() -> None:
+    op.drop_column('ticket_messages', 'attachment_count')
+    op.drop_column('ticket_messages', 'body_size')
+    op.drop_column('ticket_messages', 'snippet')
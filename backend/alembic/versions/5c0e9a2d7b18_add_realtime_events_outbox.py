@@ -0,0 +1,37 @@
+"""Add realtime_events outbox
+
+Revision ID: 5c0e9a2d7b18
+Revises: b2f1c7d94e05
+Create Date: 2026-10-19 13:54:02.774310
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c0e9a2d7b18'
+down_revision: Union[str, None] = 'b2f1c7d94e05'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('realtime_events',
+    sa.Column('id', sa.BigInteger(), autoincrement=True, nullable=False),
+    sa.Column('event_type', sa.String(length=50), nullable=False),
+    sa.Column('ticket_id', sa.BigInteger(), nullable=False),
+    sa.Column('assigned_to', sa.BigInteger(), nullable=True),
+    sa.Column('previous_assigned_to', sa.BigInteger(), nullable=True),
+    sa.Column('payload', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_realtime_events_created_at'), 'realtime_events', ['created_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_realtime_events_created_at'), table_name='realtime_events')
+    op.drop_table('realtime_events')
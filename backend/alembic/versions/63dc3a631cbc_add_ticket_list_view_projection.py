@@ -0,0 +1,92 @@
+"""Add ticket_list_view projection
+
+Revision ID: 63dc3a631cbc
+Revises: 7dffe0647e69
+Create Date: 2026-10-19 09:12:40.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '63dc3a631cbc'
+down_revision: Union[str, None] = '7dffe0647e69'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('ticket_list_view',
+    sa.Column('ticket_id', sa.BigInteger(), nullable=False),
+    sa.Column('customer_email', sa.String(length=255), nullable=False),
+    sa.Column('customer_name', sa.String(length=255), nullable=True),
+    sa.Column('subject', sa.String(length=500), nullable=False),
+    sa.Column('status', sa.Enum('Open', 'Pending', 'Closed', name='ticketstatus'), nullable=False),
+    sa.Column('channel', sa.Enum('email', 'instagram', 'facebook', 'whatsapp', name='channeltype'), nullable=True),
+    sa.Column('assigned_to', sa.BigInteger(), nullable=True),
+    sa.Column('assigned_user_name', sa.String(length=255), nullable=True),
+    sa.Column('assigned_user_email', sa.String(length=255), nullable=True),
+    sa.Column('assigned_user_role', sa.Enum('admin', 'adviser', name='role'), nullable=True),
+    sa.Column('language_id', sa.Integer(), nullable=True),
+    sa.Column('language_name', sa.String(length=100), nullable=True),
+    sa.Column('voc_id', sa.Integer(), nullable=True),
+    sa.Column('voc_name', sa.String(length=100), nullable=True),
+    sa.Column('priority_id', sa.Integer(), nullable=True),
+    sa.Column('priority_name', sa.String(length=100), nullable=True),
+    sa.Column('priority_weight', sa.Integer(), nullable=True),
+    sa.Column('message_count', sa.Integer(), nullable=False),
+    sa.Column('last_message_snippet', sa.String(length=255), nullable=True),
+    sa.Column('last_message_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('last_inbound_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['ticket_id'], ['tickets.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('ticket_id')
+    )
+    op.create_index('idx_ticket_list_view_assigned_updated', 'ticket_list_view', ['assigned_to', 'updated_at'], unique=False)
+    op.create_index('idx_ticket_list_view_status_updated', 'ticket_list_view', ['status', 'updated_at'], unique=False)
+    op.create_index('idx_ticket_list_view_priority_updated', 'ticket_list_view', ['priority_id', 'updated_at'], unique=False)
+    op.create_index('idx_ticket_list_view_updated', 'ticket_list_view', ['updated_at'], unique=False)
+    op.create_index('idx_ticket_list_view_created', 'ticket_list_view', ['created_at'], unique=False)
+
+    # Backfill from existing tickets
+    op.execute("""
+        INSERT INTO ticket_list_view (
+            ticket_id, customer_email, customer_name, subject, status, channel,
+            assigned_to, assigned_user_name, assigned_user_email, assigned_user_role,
+            language_id, language_name, voc_id, voc_name,
+            priority_id, priority_name, priority_weight,
+            message_count, last_message_snippet, last_message_at, last_inbound_at,
+            created_at, updated_at
+        )
+        SELECT
+            t.id, t.customer_email, t.customer_name, t.subject, t.status, t.channel,
+            t.assigned_to, u.name, u.email, u.role,
+            t.language_id, l.name, t.voc_id, v.name,
+            t.priority_id, p.name, p.weight,
+            (SELECT COUNT(*) FROM ticket_messages m WHERE m.ticket_id = t.id),
+            (SELECT LEFT(TRIM(REGEXP_REPLACE(m.body, '[[:space:]]+', ' ')), 200)
+               FROM ticket_messages m WHERE m.ticket_id = t.id
+               ORDER BY m.sent_at DESC, m.id DESC LIMIT 1),
+            (SELECT MAX(m.sent_at) FROM ticket_messages m WHERE m.ticket_id = t.id),
+            (SELECT MAX(m.sent_at) FROM ticket_messages m
+               WHERE m.ticket_id = t.id AND m.direction = 'inbound'),
+            t.created_at, t.updated_at
+        FROM tickets t
+        LEFT JOIN users u ON u.id = t.assigned_to
+        LEFT JOIN category_language l ON l.id = t.language_id
+        LEFT JOIN category_voc v ON v.id = t.voc_id
+        LEFT JOIN category_priority p ON p.id = t.priority_id
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index('idx_ticket_list_view_created', table_name='ticket_list_view')
+    op.drop_index('idx_ticket_list_view_updated', table_name='ticket_list_view')
+    op.drop_index('idx_ticket_list_view_priority_updated', table_name='ticket_list_view')
+    op.drop_index('idx_ticket_list_view_status_updated', table_name='ticket_list_view')
+    op.drop_index('idx_ticket_list_view_assigned_updated', table_name='ticket_list_view')
+    op.drop_table('ticket_list_view')
@@ -0,0 +1,51 @@
+"""Add covering indexes for hot query shapes
+
+Revision ID: 7cd76a49e601
+Revises: 63dc3a631cbc
+Create Date: 2026-10-19 10:03:17.552931
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7cd76a49e601'
+down_revision: Union[str, None] = '63dc3a631cbc'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (index name, table, columns) - keep in sync with the bottom of app/models.py
+INDEXES = [
+    ('idx_tickets_status_updated', 'tickets', ['status', 'updated_at']),
+    ('idx_tickets_assigned_status_updated', 'tickets', ['assigned_to', 'status', 'updated_at']),
+    ('idx_tickets_assigned_updated_status', 'tickets', ['assigned_to', 'updated_at', 'status']),
+    ('idx_tickets_customer_email_created', 'tickets', ['customer_email', 'created_at']),
+    ('idx_ticket_messages_ticket_sent', 'ticket_messages', ['ticket_id', 'sent_at']),
+    ('idx_ticket_messages_ticket_direction_sent', 'ticket_messages', ['ticket_id', 'direction', 'sent_at']),
+    ('idx_ticket_messages_sent', 'ticket_messages', ['sent_at']),
+    ('idx_ticket_events_ticket_created', 'ticket_events', ['ticket_id', 'created_at']),
+    ('idx_ticket_events_created', 'ticket_events', ['created_at']),
+    ('idx_ticket_feedback_created', 'ticket_feedback', ['created_at']),
+    ('idx_bulk_emails_status_id', 'bulk_emails', ['status', 'id']),
+    ('idx_social_posts_platform_post_id', 'social_media_posts', ['platform', 'post_id']),
+]
+
+
+def upgrade() -> None:
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, unique=False)
+
+
+def downgrade() -> None:
+    # MySQL drops the implicit foreign key indexes on tickets.assigned_to and
+    # ticket_events.ticket_id once a composite index can serve the FK, so
+    # recreate plain ones before the composites go away.
+    op.create_index('ix_tickets_assigned_to', 'tickets', ['assigned_to'], unique=False)
+    op.create_index('ix_ticket_events_ticket_id', 'ticket_events', ['ticket_id'], unique=False)
+
+    for name, table, columns in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
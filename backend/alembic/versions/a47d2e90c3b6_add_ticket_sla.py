@@ -0,0 +1,45 @@
+"""Add ticket_sla timers
+
+Revision ID: a47d2e90c3b6
+Revises: e81a4d3c6f27
+Create Date: 2026-10-19 15:22:31.064455
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a47d2e90c3b6'
+down_revision: Union[str, None] = 'e81a4d3c6f27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('ticket_sla',
+    sa.Column('ticket_id', sa.BigInteger(), nullable=False),
+    sa.Column('first_response_due_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('first_responded_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('first_response_breached_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('resolution_due_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('resolved_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('resolution_breached_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('pending_reminder_due_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('pending_reminded_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('next_due_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['ticket_id'], ['tickets.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('ticket_id')
+    )
+    op.create_index('idx_ticket_sla_next_due', 'ticket_sla', ['next_due_at'], unique=False)
+    op.create_index('idx_ticket_sla_pending_reminder_due', 'ticket_sla', ['pending_reminder_due_at'], unique=False)
+    # Rows are backfilled on API startup (services/sla.py ensure_populated),
+    # since deadlines depend on the SLA_* settings
+
+
+def downgrade() -> None:
+    op.drop_index('idx_ticket_sla_pending_reminder_due', table_name='ticket_sla')
+    op.drop_index('idx_ticket_sla_next_due', table_name='ticket_sla')
+    op.drop_table('ticket_sla')
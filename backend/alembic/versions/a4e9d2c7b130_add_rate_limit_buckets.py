@@ -0,0 +1,31 @@
+"""Add rate_limit_buckets for rate limits shared across processes
+
+Revision ID: a4e9d2c7b130
+Revises: b7c3e52f9a14
+Create Date: 2026-10-19 16:05:42.118304
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4e9d2c7b130'
+down_revision: Union[str, None] = 'b7c3e52f9a14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('rate_limit_buckets',
+    sa.Column('key', sa.String(length=320), nullable=False),
+    sa.Column('tokens', sa.Double(), nullable=False),
+    sa.Column('refilled_at', sa.Double(), nullable=False),
+    sa.PrimaryKeyConstraint('key')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('rate_limit_buckets')
@@ -0,0 +1,53 @@
+"""Add bulk_campaigns
+
+Revision ID: a8d4f6c21e93
+Revises: c5e7a19b3d42
+Create Date: 2026-10-19 19:12:37.518204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a8d4f6c21e93'
+down_revision: Union[str, None] = 'c5e7a19b3d42'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('bulk_campaigns',
+    sa.Column('id', sa.BigInteger(), nullable=False),
+    sa.Column('name', sa.String(length=255), nullable=False),
+    sa.Column('subject', sa.String(length=500), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('scheduled_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('queued_count', sa.Integer(), nullable=False),
+    sa.Column('sent_count', sa.Integer(), nullable=False),
+    sa.Column('failed_count', sa.Integer(), nullable=False),
+    sa.Column('cancelled_count', sa.Integer(), nullable=False),
+    sa.Column('send_rate', sa.Float(), nullable=False),
+    sa.Column('started_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('last_sent_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('created_by', sa.BigInteger(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['created_by'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_bulk_campaigns_id'), 'bulk_campaigns', ['id'], unique=False)
+
+    op.add_column('bulk_emails', sa.Column('campaign_id', sa.BigInteger(), nullable=True))
+    op.create_foreign_key('fk_bulk_emails_campaign_id', 'bulk_emails', 'bulk_campaigns', ['campaign_id'], ['id'])
+    op.create_index('idx_bulk_emails_campaign_status', 'bulk_emails', ['campaign_id', 'status'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('idx_bulk_emails_campaign_status', table_name='bulk_emails')
+    op.drop_constraint('fk_bulk_emails_campaign_id', 'bulk_emails', type_='foreignkey')
+    op.drop_column('bulk_emails', 'campaign_id')
+    op.drop_index(op.f('ix_bulk_campaigns_id'), table_name='bulk_campaigns')
+    op.drop_table('bulk_campaigns')
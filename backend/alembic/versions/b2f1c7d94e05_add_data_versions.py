@@ -0,0 +1,35 @@
+"""Add data_versions change counters
+
+Revision ID: b2f1c7d94e05
+Revises: 4413c939dbe9
+Create Date: 2026-10-19 12:41:18.530917
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b2f1c7d94e05'
+down_revision: Union[str, None] = '4413c939dbe9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    data_versions = op.create_table('data_versions',
+    sa.Column('name', sa.String(length=64), nullable=False),
+    sa.Column('version', sa.BigInteger(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+    op.bulk_insert(data_versions, [
+        {'name': 'tickets', 'version': 1},
+        {'name': 'categories', 'version': 1},
+        {'name': 'templates', 'version': 1},
+    ])
+
+
+def downgrade() -> None:
+    op.drop_table('data_versions')
@@ -0,0 +1,34 @@
+"""Mark bulk emails that used up their attempts as failed
+
+Revision ID: b7c3e52f9a14
+Revises: d3b9f1a6c074
+Create Date: 2026-10-19 23:05:41.382915
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.config import settings
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7c3e52f9a14'
+down_revision: Union[str, None] = 'd3b9f1a6c074'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Rows left pending after their last attempt (status 3 = failed)
+    op.execute(
+        sa.text(
+            "UPDATE bulk_emails SET status = 3, claimed_by = NULL, claimed_until = NULL "
+            "WHERE status = 0 AND attempts >= :max_attempts"
+        ).bindparams(max_attempts=settings.BULK_EMAIL_MAX_ATTEMPTS)
+    )
+
+
+def downgrade() -> None:
+    op.execute("UPDATE bulk_emails SET status = 0 WHERE status = 3")
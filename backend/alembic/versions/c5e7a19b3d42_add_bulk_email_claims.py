@@ -0,0 +1,34 @@
+"""Add claim lease columns to bulk_emails
+
+Revision ID: c5e7a19b3d42
+Revises: f2c86b14e7d9
+Create Date: 2026-10-19 18:05:12.604118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5e7a19b3d42'
+down_revision: Union[str, None] = 'f2c86b14e7d9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('bulk_emails', sa.Column('claimed_by', sa.String(length=64), nullable=True))
+    op.add_column('bulk_emails', sa.Column('claimed_until', sa.DateTime(timezone=True), nullable=True))
+    op.add_column('bulk_emails', sa.Column('attempts', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('bulk_emails', sa.Column('sent_at', sa.DateTime(timezone=True), nullable=True))
+    op.create_index('idx_bulk_emails_claim', 'bulk_emails', ['status', 'claimed_until'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('idx_bulk_emails_claim', table_name='bulk_emails')
+    op.drop_column('bulk_emails', 'sent_at')
+    op.drop_column('bulk_emails', 'attempts')
+    op.drop_column('bulk_emails', 'claimed_until')
+    op.drop_column('bulk_emails', 'claimed_by')
@@ -0,0 +1,100 @@
+"""Store compressed text as LONGBLOB, keep ticket_messages.body plain
+
+ticket_messages.body is searched with LIKE, so compressed bodies are
+decoded back to plain text. The other CompressedText columns become
+LONGBLOBs and their base64 payloads are replaced by the raw bytes.
+
+Revision ID: c9f4e1a8d362
+Revises: a4e9d2c7b130
+Create Date: 2026-10-19 16:48:03.652117
+
+"""
+import base64
+import zlib
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c9f4e1a8d362'
+down_revision: Union[str, None] = 'a4e9d2c7b130'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+ZSTD_MARKER = "\x1fS1:"
+CHUNK_SIZE = 500
+
+BLOB_COLUMNS = (
+    ('email_templates', 'body'),
+    ('bulk_emails', 'content'),
+    ('ticket_notes', 'note'),
+)
+
+
+def _decompress(marker: str, payload: bytes) -> bytes:
+    if marker == ZSTD_MARKER:
+        import zstandard
+        return zstandard.ZstdDecompressor().decompress(payload)
+    return zlib.decompress(payload)
+
+
+def _convert(table_name: str, column_name: str, column_type, separator, convert) -> None:
+    """Rewrite every value starting with `separator` (a marker) as convert(value), in id chunks"""
+    connection = op.get_bind()
+    table = sa.table(table_name, sa.column('id', sa.BigInteger), sa.column(column_name, column_type))
+    column = table.c[column_name]
+    marked = sa.func.substr(column, 1, 1) == sa.literal(separator, column_type)
+    last_id = 0
+
+    while True:
+        rows = connection.execute(
+            sa.select(table.c.id, column)
+            .where(table.c.id > last_id, marked)
+            .order_by(table.c.id)
+            .limit(CHUNK_SIZE)
+        ).all()
+        if not rows:
+            break
+        connection.execute(
+            table.update().where(table.c.id == sa.bindparam('row_id')).values({column_name: sa.bindparam('value')}),
+            [{'row_id': row_id, 'value': convert(value)} for row_id, value in rows]
+        )
+        last_id = rows[-1][0]
+
+
+def _text_to_plain(value: str) -> str:
+    return _decompress(value[:4], base64.b64decode(value[4:])).decode('utf-8')
+
+
+def _text_to_bytes(value: bytes) -> bytes:
+    return value[:4] + base64.b64decode(value[4:])
+
+
+def _bytes_to_text(value: bytes) -> bytes:
+    return value[:4] + base64.b64encode(value[4:])
+
+
+def upgrade() -> None:
+    _convert('ticket_messages', 'body', sa.Text(), '\x1f', _text_to_plain)
+
+    for table_name, column_name in BLOB_COLUMNS:
+        op.alter_column(
+            table_name, column_name,
+            existing_type=sa.Text(length=4294967295),
+            type_=sa.LargeBinary(length=4294967295),
+            existing_nullable=False,
+        )
+        _convert(table_name, column_name, sa.LargeBinary(), b'\x1f', _text_to_bytes)
+
+
+def downgrade() -> None:
+    for table_name, column_name in BLOB_COLUMNS:
+        _convert(table_name, column_name, sa.LargeBinary(), b'\x1f', _bytes_to_text)
+        op.alter_column(
+            table_name, column_name,
+            existing_type=sa.LargeBinary(length=4294967295),
+            type_=sa.Text(length=4294967295),
+            existing_nullable=False,
+        )
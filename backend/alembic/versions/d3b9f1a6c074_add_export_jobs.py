@@ -0,0 +1,50 @@
+"""Add export_jobs
+
+Revision ID: d3b9f1a6c074
+Revises: a8d4f6c21e93
+Create Date: 2026-10-19 21:40:03.116482
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd3b9f1a6c074'
+down_revision: Union[str, None] = 'a8d4f6c21e93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('export_jobs',
+    sa.Column('id', sa.BigInteger(), nullable=False),
+    sa.Column('kind', sa.String(length=30), nullable=False),
+    sa.Column('params_json', sa.Text(), nullable=False),
+    sa.Column('compressed', sa.Boolean(), nullable=False),
+    sa.Column('cache_key', sa.String(length=64), nullable=False),
+    sa.Column('watermark', sa.String(length=255), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('total', sa.Integer(), nullable=False),
+    sa.Column('processed', sa.Integer(), nullable=False),
+    sa.Column('file_path', sa.String(length=500), nullable=True),
+    sa.Column('file_name', sa.String(length=255), nullable=True),
+    sa.Column('file_size', sa.BigInteger(), nullable=True),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('created_by', sa.BigInteger(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['created_by'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_export_jobs_id'), 'export_jobs', ['id'], unique=False)
+    op.create_index('idx_export_jobs_cache', 'export_jobs', ['cache_key', 'watermark'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('idx_export_jobs_cache', table_name='export_jobs')
+    op.drop_index(op.f('ix_export_jobs_id'), table_name='export_jobs')
+    op.drop_table('export_jobs')
@@ -0,0 +1,51 @@
+"""Add adviser stats rollup tables
+
+Revision ID: d93b51f0a2c8
+Revises: a47d2e90c3b6
+Create Date: 2026-10-19 16:05:12.482913
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd93b51f0a2c8'
+down_revision: Union[str, None] = 'a47d2e90c3b6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('adviser_stats_daily',
+    sa.Column('id', sa.BigInteger(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('adviser_id', sa.BigInteger(), nullable=False),
+    sa.Column('status', sa.Enum('Open', 'Pending', 'Closed', name='ticketstatus'), nullable=False),
+    sa.Column('language_id', sa.Integer(), nullable=False),
+    sa.Column('voc_id', sa.Integer(), nullable=False),
+    sa.Column('ticket_count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('day', 'adviser_id', 'status', 'language_id', 'voc_id', name='uq_adviser_stats_daily_key')
+    )
+    op.create_index(op.f('ix_adviser_stats_daily_id'), 'adviser_stats_daily', ['id'], unique=False)
+    op.create_index('idx_adviser_stats_daily_adviser_day', 'adviser_stats_daily', ['adviser_id', 'day'], unique=False)
+    op.create_table('adviser_stats_tickets',
+    sa.Column('ticket_id', sa.BigInteger(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('adviser_id', sa.BigInteger(), nullable=False),
+    sa.Column('status', sa.Enum('Open', 'Pending', 'Closed', name='ticketstatus'), nullable=False),
+    sa.Column('language_id', sa.Integer(), nullable=False),
+    sa.Column('voc_id', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('ticket_id')
+    )
+    # Filled on API startup or with `python -m app.services.adviser_stats`
+
+
+def downgrade() -> None:
+    op.drop_table('adviser_stats_tickets')
+    op.drop_index('idx_adviser_stats_daily_adviser_day', table_name='adviser_stats_daily')
+    op.drop_index(op.f('ix_adviser_stats_daily_id'), table_name='adviser_stats_daily')
+    op.drop_table('adviser_stats_daily')
@@ -0,0 +1,42 @@
+"""Add bulk_ticket_jobs
+
+Revision ID: e81a4d3c6f27
+Revises: 5c0e9a2d7b18
+Create Date: 2026-10-19 14:37:45.902113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e81a4d3c6f27'
+down_revision: Union[str, None] = '5c0e9a2d7b18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('bulk_ticket_jobs',
+    sa.Column('id', sa.BigInteger(), nullable=False),
+    sa.Column('operation', sa.String(length=20), nullable=False),
+    sa.Column('params_json', sa.Text(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('total', sa.Integer(), nullable=False),
+    sa.Column('processed', sa.Integer(), nullable=False),
+    sa.Column('updated', sa.Integer(), nullable=False),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('created_by', sa.BigInteger(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['created_by'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_bulk_ticket_jobs_id'), 'bulk_ticket_jobs', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_bulk_ticket_jobs_id'), table_name='bulk_ticket_jobs')
+    op.drop_table('bulk_ticket_jobs')
@@ -0,0 +1,26 @@
+"""Add email_templates.updated_at
+
+Revision ID: f2c86b14e7d9
+Revises: d93b51f0a2c8
+Create Date: 2026-10-19 16:48:40.217306
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2c86b14e7d9'
+down_revision: Union[str, None] = 'd93b51f0a2c8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('email_templates', sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('email_templates', 'updated_at')
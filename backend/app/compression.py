@@ -0,0 +1,248 @@
+"""
+Transparent compression for large text columns.
+
+CompressedText columns are LONGBLOBs. Values at or above
+TEXT_COMPRESSION_MIN_BYTES are stored as a marker prefix plus the
+compressed UTF-8 bytes, smaller ones as their plain UTF-8 bytes, and
+both are decoded to str when loaded. Compressed and plain rows live side
+by side, so compression can be switched on or off at any time.
+
+The stored bytes can't be matched by SQL LIKE, so columns that are
+searched (ticket_messages.body) must stay plain Text.
+
+Compress existing rows with:
+    python -m app.compression [--dry-run] [--chunk 500]
+"""
+import logging
+import threading
+import time
+import zlib
+
+from sqlalchemy import LargeBinary
+from sqlalchemy.types import TypeDecorator
+
+from .config import settings
+
+try:
+    import zstandard
+except ImportError:  # optional, only needed for TEXT_COMPRESSION=zstd
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# \x1f (unit separator) never appears in cleaned email text or typed input
+ZLIB_MARKER = b"\x1fZ1:"
+ZSTD_MARKER = b"\x1fS1:"
+MARKERS = (ZLIB_MARKER, ZSTD_MARKER)
+MARKER_LENGTH = 4
+
+# LONGBLOB on MySQL
+BLOB_LENGTH = 4294967295
+
+_stats_lock = threading.Lock()
+_stats = {"decoded": 0, "decode_seconds": 0.0}
+
+
+def compress_text(value: str, codec: str = None) -> bytes:
+    """Compress `value` with the given codec (defaults to TEXT_COMPRESSION)"""
+    codec = codec or settings.TEXT_COMPRESSION
+    raw = value.encode("utf-8")
+
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("TEXT_COMPRESSION=zstd requires the zstandard package")
+        data = zstandard.ZstdCompressor(level=settings.TEXT_COMPRESSION_LEVEL).compress(raw)
+        marker = ZSTD_MARKER
+    else:
+        data = zlib.compress(raw, settings.TEXT_COMPRESSION_LEVEL)
+        marker = ZLIB_MARKER
+
+    return marker + data
+
+
+def decompress_text(value: bytes) -> str:
+    """Decode a stored value, compressed or plain"""
+    if not is_compressed(value):
+        return value.decode("utf-8")
+
+    started = time.perf_counter()
+    marker, payload = value[:MARKER_LENGTH], value[MARKER_LENGTH:]
+
+    if marker == ZSTD_MARKER:
+        if zstandard is None:
+            raise RuntimeError("Stored value is zstd-compressed but zstandard is not installed")
+        raw = zstandard.ZstdDecompressor().decompress(payload)
+    else:
+        raw = zlib.decompress(payload)
+
+    with _stats_lock:
+        _stats["decoded"] += 1
+        _stats["decode_seconds"] += time.perf_counter() - started
+    return raw.decode("utf-8")
+
+
+def is_compressed(value) -> bool:
+    return isinstance(value, bytes) and value[:MARKER_LENGTH] in MARKERS
+
+
+def should_compress(value: str) -> bool:
+    # Plain values that happen to look compressed are always compressed, so they read back intact
+    looks_compressed = value[:MARKER_LENGTH].encode("utf-8") in MARKERS
+    if settings.TEXT_COMPRESSION == "none":
+        return looks_compressed
+    return len(value) >= settings.TEXT_COMPRESSION_MIN_BYTES or looks_compressed
+
+
+def decode_stats() -> dict:
+    """Number of values decoded and time spent decoding since process start"""
+    with _stats_lock:
+        decoded = _stats["decoded"]
+        seconds = _stats["decode_seconds"]
+    return {
+        "decoded": decoded,
+        "decode_seconds": seconds,
+        "avg_decode_us": (seconds / decoded * 1_000_000) if decoded else 0.0,
+    }
+
+
+class CompressedText(TypeDecorator):
+    """Binary column holding text: large values are compressed on write, all are decoded on read"""
+    impl = LargeBinary
+    cache_ok = True
+
+    def __init__(self, length: int = BLOB_LENGTH):
+        super().__init__(length=length)
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return value
+        if not should_compress(value):
+            return value.encode("utf-8")
+        codec = settings.TEXT_COMPRESSION if settings.TEXT_COMPRESSION != "none" else "zlib"
+        return compress_text(value, codec)
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return value
+        return decompress_text(bytes(value))
+
+
+def compress_existing_rows(db, chunk_size: int = 500, dry_run: bool = False) -> dict:
+    """
+    Compress existing rows of every CompressedText column in id chunks.
+    Returns storage (stored bytes, marker included) and read-latency
+    figures per column.
+    """
+    from sqlalchemy import bindparam, select, update, type_coerce
+    from .models import Base
+
+    if settings.TEXT_COMPRESSION == "none":
+        raise RuntimeError("Set TEXT_COMPRESSION to zlib or zstd before compressing existing rows")
+
+    report = {}
+
+    for table in Base.metadata.sorted_tables:
+        for column in table.columns:
+            if not isinstance(column.type, CompressedText):
+                continue
+
+            raw_column = type_coerce(column, LargeBinary)
+            stats = {"rows": 0, "compressed": 0, "bytes_before": 0, "bytes_after": 0}
+            last_id = 0
+
+            while True:
+                rows = db.execute(
+                    select(table.c.id, raw_column)
+                    .where(table.c.id > last_id)
+                    .order_by(table.c.id)
+                    .limit(chunk_size)
+                ).all()
+                if not rows:
+                    break
+
+                updates = []
+                for row_id, value in rows:
+                    stats["rows"] += 1
+                    if value is None:
+                        continue
+                    value = bytes(value)
+                    stats["bytes_before"] += len(value)
+                    text = None if is_compressed(value) else value.decode("utf-8")
+                    if text is None or len(text) < settings.TEXT_COMPRESSION_MIN_BYTES:
+                        stats["bytes_after"] += len(value)
+                        continue
+                    packed = compress_text(text)
+                    stats["bytes_after"] += len(packed)
+                    stats["compressed"] += 1
+                    updates.append({"row_id": row_id, "packed": packed})
+
+                if updates and not dry_run:
+                    db.connection().execute(
+                        update(table)
+                        .where(table.c.id == bindparam("row_id"))
+                        .values({column.name: type_coerce(bindparam("packed"), LargeBinary)}),
+                        updates
+                    )
+                    db.commit()
+
+                last_id = rows[-1][0]
+
+            stats["read_latency"] = _measure_read_latency(db, table, column)
+            report[f"{table.name}.{column.name}"] = stats
+            logger.info(f"Compressed {table.name}.{column.name}: {stats}")
+
+    return report
+
+
+def _measure_read_latency(db, table, column, sample_size: int = 200) -> dict:
+    """
+    Read the newest `sample_size` values twice - raw and through the
+    decoding column - and report the per-row cost of decompression.
+    """
+    from sqlalchemy import select, type_coerce
+
+    def timed(expression):
+        started = time.perf_counter()
+        values = db.execute(
+            select(expression).order_by(table.c.id.desc()).limit(sample_size)
+        ).scalars().all()
+        return values, time.perf_counter() - started
+
+    raw_values, raw_seconds = timed(type_coerce(column, LargeBinary))
+    _, decoded_seconds = timed(column)
+
+    rows = len(raw_values) or 1
+    return {
+        "sampled_rows": len(raw_values),
+        "compressed_rows": sum(1 for v in raw_values if is_compressed(v)),
+        "raw_read_us": raw_seconds / rows * 1_000_000,
+        "decoded_read_us": decoded_seconds / rows * 1_000_000,
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+    from .db import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Compress existing large text values")
+    parser.add_argument("--chunk", type=int, default=500)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        report = compress_existing_rows(db, chunk_size=args.chunk, dry_run=args.dry_run)
+    finally:
+        db.close()
+
+    total_before = sum(s["bytes_before"] for s in report.values())
+    total_after = sum(s["bytes_after"] for s in report.values())
+    for name, s in report.items():
+        saved = s["bytes_before"] - s["bytes_after"]
+        print(
+            f"{name}: {s['compressed']}/{s['rows']} rows compressed, "
+            f"{s['bytes_before']:,} -> {s['bytes_after']:,} bytes (saved {saved:,}), "
+            f"read {s['read_latency']['raw_read_us']:.1f} us/row raw vs "
+            f"{s['read_latency']['decoded_read_us']:.1f} us/row decoded"
+        )
+    print(f"Total saved: {total_before - total_after:,} bytes{' (dry run)' if args.dry_run else ''}")
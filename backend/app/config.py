@@ -26,6 +26,12 @@ class Settings:
     SMTP_USER: str = os.getenv("SMTP_USER", "")
     SMTP_PASS: str = os.getenv("SMTP_PASS", "")
     SMTP_FROM: str = os.getenv("SMTP_FROM", "support@mas.local")
+    # Reused SMTP connections per process and per transport (0 = new connection per mail)
+    SMTP_POOL_SIZE: int = int(os.getenv("SMTP_POOL_SIZE", "4"))
+    SMTP_POOL_IDLE_TIMEOUT: int = int(os.getenv("SMTP_POOL_IDLE_TIMEOUT", "60"))
+    SMTP_POOL_MAX_MESSAGES: int = int(os.getenv("SMTP_POOL_MAX_MESSAGES", "100"))
+    # Idle seconds after which a pooled connection is checked with NOOP
+    SMTP_POOL_CHECK_AFTER: int = int(os.getenv("SMTP_POOL_CHECK_AFTER", "10"))
     
     # IMAP
     IMAP_HOST: str = os.getenv("IMAP_HOST", "")
@@ -36,5 +42,52 @@ class Settings:
     # App
     APP_ENV: str = os.getenv("APP_ENV", "dev")
     CORS_ORIGINS: List[str] = os.getenv("CORS_ORIGINS", "http://localhost:5173").split(",")
+    ATTACHMENTS_ROOT: str = os.getenv("ATTACHMENTS_ROOT", "attachments")
+
+    # Ticket list counts
+    TICKET_COUNT_CACHE_TTL: int = int(os.getenv("TICKET_COUNT_CACHE_TTL", "30"))
+    TICKET_COUNT_CACHE_SIZE: int = int(os.getenv("TICKET_COUNT_CACHE_SIZE", "1000"))
+    TICKET_COUNT_ESTIMATE_CAP: int = int(os.getenv("TICKET_COUNT_ESTIMATE_CAP", "1000"))
+
+    # Large text compression: none, zlib or zstd (zstd needs the zstandard package).
+    # Applies to notes, templates and bulk content; message bodies stay searchable text
+    TEXT_COMPRESSION: str = os.getenv("TEXT_COMPRESSION", "none")
+    TEXT_COMPRESSION_MIN_BYTES: int = int(os.getenv("TEXT_COMPRESSION_MIN_BYTES", "4096"))
+    TEXT_COMPRESSION_LEVEL: int = int(os.getenv("TEXT_COMPRESSION_LEVEL", "6"))
+
+    # Realtime push: "database" relays events between processes (IMAP worker,
+    # several API workers) through realtime_events, "local" stays in-process
+    REALTIME_FANOUT: str = os.getenv("REALTIME_FANOUT", "database")
+    REALTIME_POLL_INTERVAL: float = float(os.getenv("REALTIME_POLL_INTERVAL", "1.0"))
+    REALTIME_RETENTION_MINUTES: int = int(os.getenv("REALTIME_RETENTION_MINUTES", "60"))
+    REALTIME_HEARTBEAT_SECONDS: int = int(os.getenv("REALTIME_HEARTBEAT_SECONDS", "15"))
+
+    # Bulk ticket operations: tickets per UPDATE/transaction
+    BULK_TICKET_CHUNK_SIZE: int = int(os.getenv("BULK_TICKET_CHUNK_SIZE", "500"))
+
+    # Background export jobs: directory for result files, and hours a file is
+    # kept for reuse by identical requests (while the data is unchanged)
+    EXPORTS_ROOT: str = os.getenv("EXPORTS_ROOT", "exports")
+    EXPORT_RETENTION_HOURS: int = int(os.getenv("EXPORT_RETENTION_HOURS", "24"))
+    # Delta exports stop this many seconds (at least 1) before now, so rows
+    # whose transactions are still committing are picked up by the next pull
+    EXPORT_DELTA_LAG_SECONDS: int = int(os.getenv("EXPORT_DELTA_LAG_SECONDS", "60"))
+
+    # Bulk email sender: concurrent sends, rows claimed per batch, claim lease,
+    # retries, and rate limits in mails per minute (0 = unlimited). The limits
+    # are kept in the rate_limit_buckets table, so they apply to all API
+    # processes and manual sends together, not to each of them
+    BULK_EMAIL_WORKERS: int = int(os.getenv("BULK_EMAIL_WORKERS", "4"))
+    BULK_EMAIL_BATCH_SIZE: int = int(os.getenv("BULK_EMAIL_BATCH_SIZE", "200"))
+    BULK_EMAIL_LEASE_SECONDS: int = int(os.getenv("BULK_EMAIL_LEASE_SECONDS", "300"))
+    BULK_EMAIL_MAX_ATTEMPTS: int = int(os.getenv("BULK_EMAIL_MAX_ATTEMPTS", "5"))
+    BULK_EMAIL_RATE_PER_MINUTE: int = int(os.getenv("BULK_EMAIL_RATE_PER_MINUTE", "0"))
+    BULK_EMAIL_DOMAIN_RATE_PER_MINUTE: int = int(os.getenv("BULK_EMAIL_DOMAIN_RATE_PER_MINUTE", "0"))
+
+    # SLA timers (hours after ticket creation / last pending activity)
+    SLA_FIRST_RESPONSE_HOURS: int = int(os.getenv("SLA_FIRST_RESPONSE_HOURS", "24"))
+    SLA_RESOLUTION_HOURS: int = int(os.getenv("SLA_RESOLUTION_HOURS", "72"))
+    SLA_PENDING_REMINDER_HOURS: int = int(os.getenv("SLA_PENDING_REMINDER_HOURS", "48"))
+    SLA_TICK_SECONDS: int = int(os.getenv("SLA_TICK_SECONDS", "30"))
 
 settings = Settings() 
\ No newline at end of file
@@ -8,12 +8,8 @@ from .utils import decode_jwt
 
 security = HTTPBearer()
 
-def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> User:
-    """Get current authenticated user from JWT token"""
-    token = credentials.credentials
+def authenticate_token(token: str, db: Session) -> User:
+    """Resolve a JWT to an active user, raising 401 otherwise"""
     payload = decode_jwt(token)
     
     if payload is None:
@@ -48,6 +44,13 @@ def get_current_user(
     
     return user
 
+def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db)
+) -> User:
+    """Get current authenticated user from JWT token"""
+    return authenticate_token(credentials.credentials, db)
+
 def require_role(*roles: Role):
     """Dependency to require specific user roles"""
     def role_checker(current_user: User = Depends(get_current_user)) -> User:
@@ -3,11 +3,18 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse
 import os
-from .db import engine
+from .db import engine, SessionLocal
 from .models import Base
-from .routers import auth, users, categories, templates, tickets, blocked_senders, emails, exports, instagram, bulk_emails_router, ticket_notes, feedback
+from .routers import auth, users, categories, templates, tickets, blocked_senders, emails, exports, instagram, bulk_emails_router, ticket_notes, feedback, events, bulk_tickets
 from .config import settings
 from .workers.bulk_email_worker import start_scheduler
+from .workers import sla_worker
+from .services import ticket_list_view  # registers projection sync hooks
+from .services import etags  # registers data version hooks
+from .services import realtime  # registers event publishing hooks
+from .services import sla  # registers SLA timer hooks
+from .services import adviser_stats  # registers stats rollup hooks
+from .services import mailer
 
 # Create database tables
 Base.metadata.create_all(bind=engine)
@@ -21,7 +28,23 @@ app = FastAPI(
 
 @app.on_event("startup")
 async def startup_event():
+    db = SessionLocal()
+    try:
+        ticket_list_view.ensure_populated(db)
+        etags.ensure_versions(db)
+        sla.ensure_populated(db)
+        adviser_stats.ensure_populated(db)
+    finally:
+        db.close()
     start_scheduler()
+    sla_worker.start_scheduler()
+    realtime.start()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    realtime.stop()
+    await mailer.close_async_pool()
 
 
 ATTACHMENTS_PATH = settings.ATTACHMENTS_ROOT
@@ -50,6 +73,8 @@ app.include_router(auth.router, prefix="/auth", tags=["authentication"])
 app.include_router(users.router, prefix="/users", tags=["users"])
 app.include_router(categories.router, prefix="/categories", tags=["categories"])
 app.include_router(templates.router, prefix="/templates", tags=["templates"])
+# Before the tickets router so /tickets/{ticket_id}/... does not capture "bulk"
+app.include_router(bulk_tickets.router, prefix="/tickets/bulk", tags=["tickets"])
 app.include_router(tickets.router, prefix="/tickets", tags=["tickets"])
 app.include_router(blocked_senders.router, prefix="/blocked-senders", tags=["blocked-senders"])
 app.include_router(emails.router, prefix="/emails", tags=["emails"])
@@ -58,6 +83,7 @@ app.include_router(instagram.router, prefix="/instagram", tags=["instagram"])
 app.include_router(bulk_emails_router.router, prefix="/bulk-emails", tags=["Bulk Emails"])
 app.include_router(ticket_notes.router, prefix="/ticket-notes", tags=["Ticket Notes"])
 app.include_router(feedback.router, prefix="/feedback", tags=["Feedback"])
+app.include_router(events.router, prefix="/events", tags=["events"])
 
 @app.get("/")
 async def root():
@@ -1,9 +1,14 @@
-from sqlalchemy import Column, Integer, String, Boolean, BigInteger, DateTime, Enum, ForeignKey, Text
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Boolean, BigInteger, DateTime, Enum, ForeignKey, Text, Float, Double
+from sqlalchemy.orm import relationship, validates
 from sqlalchemy.sql import func
-from sqlalchemy import Index
+from sqlalchemy import Index, Date, UniqueConstraint
 from enum import Enum as PyEnum
+import json
 from .db import Base
+from .compression import CompressedText
+
+# Length of precomputed message snippets (ticket threads and ticket_list_view)
+MESSAGE_SNIPPET_LENGTH = 200
 
 class Role(str, PyEnum):
     admin = "admin"
@@ -100,17 +105,38 @@ class TicketMessage(Base):
     from_email = Column(String(255), nullable=False)
     to_email = Column(String(255), nullable=False)
     subject = Column(String(500), nullable=False)
+    # Plain LONGTEXT, not CompressedText: inbox search matches bodies with LIKE
     body = Column(Text(length=4294967295), nullable=False)  # LONGTEXT equivalent
     attachments_json = Column(Text(length=4294967295))  # LONGTEXT equivalent
     smtp_message_id = Column(String(255))
     in_reply_to = Column(String(255))
     sent_at = Column(DateTime(timezone=True), server_default=func.now())
     created_by = Column(BigInteger, ForeignKey("users.id"), nullable=True)
+
+    # Precomputed at write time so thread listings never read the body blobs
+    snippet = Column(String(255), nullable=True)
+    body_size = Column(Integer, default=0, nullable=False)
+    attachment_count = Column(Integer, default=0, nullable=False)
     
     # Relationships
     ticket = relationship("Ticket", back_populates="messages")
     created_user = relationship("User")
 
+    @validates("body")
+    def _summarize_body(self, key, body):
+        self.snippet = " ".join(body.split())[:MESSAGE_SNIPPET_LENGTH] if body else ""
+        self.body_size = len(body.encode("utf-8")) if body else 0
+        return body
+
+    @validates("attachments_json")
+    def _count_attachments(self, key, attachments_json):
+        try:
+            attachments = json.loads(attachments_json) if attachments_json else []
+        except ValueError:
+            attachments = []
+        self.attachment_count = len(attachments) if isinstance(attachments, list) else 0
+        return attachments_json
+
 class EmailIngest(Base):
     __tablename__ = "email_ingest"
     
@@ -142,7 +168,9 @@ class EmailTemplate(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(255), unique=True, nullable=False)
     subject = Column(String(500), nullable=False)
-    body = Column(Text(length=4294967295), nullable=False)  # LONGTEXT equivalent
+    body = Column(CompressedText(), nullable=False)  # LONGBLOB
+    # Cache key for compiled templates (services/templating.py)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
 class InstagramConfig(Base):
     __tablename__ = "instagram_config"
@@ -176,17 +204,59 @@ class SocialMediaPost(Base):
 class BulkEmailStatus(int, Enum):
     pending = 0
     sent = 1
+    cancelled = 2
+    # Gave up after BULK_EMAIL_MAX_ATTEMPTS failed sends
+    failed = 3
+
+class BulkCampaign(Base):
+    """
+    A group of bulk emails with its own subject and schedule. The counters
+    and send_rate are maintained incrementally by the bulk email sender.
+    """
+    __tablename__ = "bulk_campaigns"
+
+    id = Column(BigInteger, primary_key=True, index=True)
+    name = Column(String(255), nullable=False)
+    subject = Column(String(500), nullable=False)
+    # running, paused, cancelled or completed
+    status = Column(String(20), nullable=False, default="running")
+    scheduled_at = Column(DateTime(timezone=True), nullable=True)
+
+    queued_count = Column(Integer, default=0, nullable=False)
+    sent_count = Column(Integer, default=0, nullable=False)
+    failed_count = Column(Integer, default=0, nullable=False)
+    cancelled_count = Column(Integer, default=0, nullable=False)
+    # Recent mails per second (smoothed)
+    send_rate = Column(Float, default=0, nullable=False)
+
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    last_sent_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+    created_by = Column(BigInteger, ForeignKey("users.id"), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
 
 class BulkEmail(Base):
     __tablename__ = "bulk_emails"
 
     id = Column(BigInteger, primary_key=True, index=True)
+    campaign_id = Column(BigInteger, ForeignKey("bulk_campaigns.id"), nullable=True)
     email = Column(String(255), nullable=False, index=True)
-    content = Column(Text(length=4294967295), nullable=False)
+    content = Column(CompressedText(), nullable=False)
     status = Column(Integer, default=0, nullable=False)
     response = Column(Text(length=4294967295), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    # Send lease: the worker named in claimed_by owns the row until claimed_until
+    claimed_by = Column(String(64), nullable=True)
+    claimed_until = Column(DateTime(timezone=True), nullable=True)
+    attempts = Column(Integer, default=0, server_default="0", nullable=False)
+    sent_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        Index("idx_bulk_emails_claim", "status", "claimed_until"),
+        Index("idx_bulk_emails_campaign_status", "campaign_id", "status"),
+    )
+
 
 
 class TicketNote(Base):
@@ -195,7 +265,7 @@ class TicketNote(Base):
     id = Column(BigInteger, primary_key=True, index=True)
     ticket_id = Column(BigInteger, ForeignKey("tickets.id"), nullable=False, index=True)
     user_id = Column(BigInteger, ForeignKey("users.id"), nullable=True)
-    note = Column(Text(length=4294967295), nullable=False)
+    note = Column(CompressedText(), nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     ticket = relationship("Ticket", back_populates="notes")
@@ -235,7 +305,226 @@ class TicketEvent(Base):
     ticket = relationship("Ticket")
 
 
+class DataVersion(Base):
+    """
+    Change counters for cacheable API resources (see services/etags.py).
+    Bumped right after the writing transaction commits, so every process
+    sees them.
+    """
+    __tablename__ = "data_versions"
+
+    name = Column(String(64), primary_key=True)
+    version = Column(BigInteger, default=0, nullable=False)
+
+
+class RateLimitBucket(Base):
+    """
+    Token bucket state shared by every process (see services/rate_limit.py).
+    refilled_at is epoch seconds of the last reservation.
+    """
+    __tablename__ = "rate_limit_buckets"
+
+    key = Column(String(320), primary_key=True)
+    tokens = Column(Double, nullable=False)
+    refilled_at = Column(Double, nullable=False)
+
+
+class RealtimeEvent(Base):
+    """
+    Outbox of inbox change events, written in the same transaction as the
+    change and relayed to connected clients by services/realtime.py.
+    """
+    __tablename__ = "realtime_events"
+
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    event_type = Column(String(50), nullable=False)
+    ticket_id = Column(BigInteger, nullable=False)
+    assigned_to = Column(BigInteger, nullable=True)
+    previous_assigned_to = Column(BigInteger, nullable=True)
+    payload = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+
+
+class BulkTicketJob(Base):
+    """Progress of a bulk reassign / status / re-tag run (services/bulk_tickets.py)"""
+    __tablename__ = "bulk_ticket_jobs"
+
+    id = Column(BigInteger, primary_key=True, index=True)
+    operation = Column(String(20), nullable=False)
+    params_json = Column(Text, nullable=False)
+    status = Column(String(20), nullable=False, default="queued")
+    total = Column(Integer, default=0, nullable=False)
+    processed = Column(Integer, default=0, nullable=False)
+    updated = Column(Integer, default=0, nullable=False)
+    error = Column(Text, nullable=True)
+    created_by = Column(BigInteger, ForeignKey("users.id"), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+
+class ExportJob(Base):
+    """
+    A background export and its result file (services/export_jobs.py).
+    cache_key identifies the export and its filters, watermark the data
+    versions the file was built from.
+    """
+    __tablename__ = "export_jobs"
+
+    id = Column(BigInteger, primary_key=True, index=True)
+    kind = Column(String(30), nullable=False)
+    params_json = Column(Text, nullable=False)
+    compressed = Column(Boolean, default=False, nullable=False)
+    cache_key = Column(String(64), nullable=False)
+    watermark = Column(String(255), nullable=False)
+    status = Column(String(20), nullable=False, default="queued")
+    total = Column(Integer, default=0, nullable=False)
+    processed = Column(Integer, default=0, nullable=False)
+    file_path = Column(String(500), nullable=True)
+    file_name = Column(String(255), nullable=True)
+    file_size = Column(BigInteger, nullable=True)
+    error = Column(Text, nullable=True)
+    created_by = Column(BigInteger, ForeignKey("users.id"), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Set with each progress write; a running job that stops updating is abandoned
+    updated_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        Index("idx_export_jobs_cache", "cache_key", "watermark"),
+    )
+
+
+class TicketSLA(Base):
+    """
+    Per-ticket SLA deadlines and fired timers, maintained by services/sla.py.
+    next_due_at is the earliest deadline that has not fired yet.
+    """
+    __tablename__ = "ticket_sla"
+
+    ticket_id = Column(BigInteger, ForeignKey("tickets.id", ondelete="CASCADE"), primary_key=True)
+
+    first_response_due_at = Column(DateTime(timezone=True), nullable=True)
+    first_responded_at = Column(DateTime(timezone=True), nullable=True)
+    first_response_breached_at = Column(DateTime(timezone=True), nullable=True)
+
+    resolution_due_at = Column(DateTime(timezone=True), nullable=True)
+    resolved_at = Column(DateTime(timezone=True), nullable=True)
+    resolution_breached_at = Column(DateTime(timezone=True), nullable=True)
+
+    # Pending tickets with no activity; reset whenever the ticket changes
+    pending_reminder_due_at = Column(DateTime(timezone=True), nullable=True)
+    pending_reminded_at = Column(DateTime(timezone=True), nullable=True)
+
+    next_due_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        Index("idx_ticket_sla_next_due", "next_due_at"),
+        Index("idx_ticket_sla_pending_reminder_due", "pending_reminder_due_at"),
+    )
+
+
+class AdviserStatsDaily(Base):
+    """
+    Ticket counts per day of last update, adviser, status, language and
+    VOC, maintained by services/adviser_stats.py. Each assigned ticket is
+    counted once, in the bucket of its current values.
+    """
+    __tablename__ = "adviser_stats_daily"
+
+    id = Column(BigInteger, primary_key=True, index=True)
+    day = Column(Date, nullable=False)
+    adviser_id = Column(BigInteger, nullable=False)
+    status = Column(Enum(TicketStatus), nullable=False)
+    # 0 = not tagged (part of the unique key, so no NULLs)
+    language_id = Column(Integer, nullable=False, default=0)
+    voc_id = Column(Integer, nullable=False, default=0)
+    ticket_count = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        UniqueConstraint("day", "adviser_id", "status", "language_id", "voc_id", name="uq_adviser_stats_daily_key"),
+        Index("idx_adviser_stats_daily_adviser_day", "adviser_id", "day"),
+    )
+
+
+class AdviserStatsTicket(Base):
+    """Bucket each ticket is currently counted in, so changes can be moved out of it"""
+    __tablename__ = "adviser_stats_tickets"
+
+    # No FK: deleted tickets still need their old bucket decremented
+    ticket_id = Column(BigInteger, primary_key=True)
+    day = Column(Date, nullable=False)
+    adviser_id = Column(BigInteger, nullable=False)
+    status = Column(Enum(TicketStatus), nullable=False)
+    language_id = Column(Integer, nullable=False, default=0)
+    voc_id = Column(Integer, nullable=False, default=0)
+
+
+class TicketListView(Base):
+    """
+    Denormalized projection of everything the ticket list needs.
+    Maintained from session flush hooks in services/ticket_list_view.py.
+    """
+    __tablename__ = "ticket_list_view"
+
+    ticket_id = Column(BigInteger, ForeignKey("tickets.id", ondelete="CASCADE"), primary_key=True)
+    customer_email = Column(String(255), nullable=False)
+    customer_name = Column(String(255))
+    subject = Column(String(500), nullable=False)
+    status = Column(Enum(TicketStatus), nullable=False)
+    channel = Column(Enum(ChannelType), nullable=True)
+
+    assigned_to = Column(BigInteger, nullable=True)
+    assigned_user_name = Column(String(255), nullable=True)
+    assigned_user_email = Column(String(255), nullable=True)
+    assigned_user_role = Column(Enum(Role), nullable=True)
+
+    language_id = Column(Integer, nullable=True)
+    language_name = Column(String(100), nullable=True)
+    voc_id = Column(Integer, nullable=True)
+    voc_name = Column(String(100), nullable=True)
+    priority_id = Column(Integer, nullable=True)
+    priority_name = Column(String(100), nullable=True)
+    priority_weight = Column(Integer, nullable=True)
+
+    message_count = Column(Integer, default=0, nullable=False)
+    last_message_snippet = Column(String(255), nullable=True)
+    last_message_at = Column(DateTime(timezone=True), nullable=True)
+    last_inbound_at = Column(DateTime(timezone=True), nullable=True)
+
+    created_at = Column(DateTime(timezone=True))
+    updated_at = Column(DateTime(timezone=True))
+
+    __table_args__ = (
+        Index("idx_ticket_list_view_assigned_updated", "assigned_to", "updated_at"),
+        Index("idx_ticket_list_view_status_updated", "status", "updated_at"),
+        Index("idx_ticket_list_view_priority_updated", "priority_id", "updated_at"),
+        Index("idx_ticket_list_view_updated", "updated_at"),
+        Index("idx_ticket_list_view_created", "created_at"),
+    )
+
+
 # Indexes for performance
-Index('idx_tickets_status_assigned_priority_updated', 'status', 'assigned_to', 'priority_id', 'updated_at')
-Index('idx_ticket_messages_ticket_id', 'ticket_id')
-Index('idx_social_posts_platform_post_id', 'platform', 'post_id')
\ No newline at end of file
+# Declared with column objects so they are attached to their tables; each
+# one backs a hot query shape (see index_advisor.py for the registry).
+
+# Pending reminders: status = Pending AND updated_at <= cutoff
+Index('idx_tickets_status_updated', Ticket.status, Ticket.updated_at)
+# Adviser-scoped reminders/filters: assigned_to = ? AND status = ? ORDER BY updated_at
+Index('idx_tickets_assigned_status_updated', Ticket.assigned_to, Ticket.status, Ticket.updated_at)
+# Adviser stats: join on assigned_to, updated_at range, COUNT by status (covering)
+Index('idx_tickets_assigned_updated_status', Ticket.assigned_to, Ticket.updated_at, Ticket.status)
+# IMAP threading: customer_email = ? (AND subject match) ORDER BY created_at DESC
+Index('idx_tickets_customer_email_created', Ticket.customer_email, Ticket.created_at)
+
+# Thread reads and "last message" lookups: ticket_id = ? ORDER BY sent_at
+Index('idx_ticket_messages_ticket_sent', TicketMessage.ticket_id, TicketMessage.sent_at)
+# Previous reply / last inbound: ticket_id = ? AND direction = ? ORDER BY sent_at
+Index('idx_ticket_messages_ticket_direction_sent', TicketMessage.ticket_id, TicketMessage.direction, TicketMessage.sent_at)
+# Message export date ranges
+Index('idx_ticket_messages_sent', TicketMessage.sent_at)
+
+Index('idx_ticket_events_ticket_created', TicketEvent.ticket_id, TicketEvent.created_at)
+Index('idx_ticket_events_created', TicketEvent.created_at)
+Index('idx_ticket_feedback_created', TicketFeedback.created_at)
+Index('idx_bulk_emails_status_id', BulkEmail.status, BulkEmail.id)
+Index('idx_social_posts_platform_post_id', SocialMediaPost.platform, SocialMediaPost.post_id)
@@ -1,70 +1,120 @@
-import pandas as pd
-import io
-from fastapi import APIRouter, UploadFile, File, Depends, HTTPException
+from datetime import datetime, timezone
+from typing import Iterator, Optional
+
+from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, Query
 from fastapi.responses import StreamingResponse
+from sqlalchemy import select
 from sqlalchemy.orm import Session
-from datetime import datetime
+from starlette.concurrency import run_in_threadpool
+from pydantic import BaseModel
 
 from ..db import get_db
-from ..models import BulkEmail, BulkEmailStatus, User
-from ..services.mailer import send_mail  # your existing mail function
+from ..models import BulkCampaign, BulkEmail, BulkEmailStatus, User
+from ..services import bulk_campaigns
+from ..services.bulk_email_import import ImportFormatError, import_recipients
+from ..services.streaming_export import (
+    CSV_MEDIA_TYPE, XLSX_MEDIA_TYPE, csv_chunks, file_response, iter_rows, xlsx_chunks
+)
+from ..workers.bulk_email_worker import send_pending_bulk_emails
 from ..deps import get_current_user, require_admin
 
 router = APIRouter()
 
 
+class CampaignCreate(BaseModel):
+    name: str
+    subject: Optional[str] = None
+    scheduled_at: Optional[datetime] = None
+
+
 # ---------------------------------------------------------
 # UPLOAD EXCEL -> save email + content to DB
 # ---------------------------------------------------------
 @router.post("/upload", dependencies=[Depends(require_admin)])
-async def upload_bulk_email_file(file: UploadFile = File(...), db: Session = Depends(get_db)):
-    if not file.filename.endswith((".xlsx", ".xls")):
-        raise HTTPException(status_code=400, detail="Only Excel file allowed (.xlsx/.xls)")
-
-    file_bytes = await file.read()
-    df = pd.read_excel(io.BytesIO(file_bytes))
-
-    df.columns = df.columns.str.lower()
-
-    if "email" not in df.columns or "content" not in df.columns:
-        raise HTTPException(status_code=400, detail="Excel must contain columns: email, content")
-
-    count = 0
-    for _, row in df.iterrows():
-        if pd.isna(row["email"]) or pd.isna(row["content"]):
-            continue
-
-        entry = BulkEmail(
-            email=row["email"],
-            content=row["content"],
-            status=BulkEmailStatus.pending,
-            created_at=datetime.utcnow()
-        )
-        db.add(entry)
-        count += 1
-
-    db.commit()
-    return {"message": f"{count} emails uploaded successfully"}
+async def upload_bulk_email_file(
+    file: UploadFile = File(...),
+    campaign_id: Optional[int] = Query(None),
+    db: Session = Depends(get_db)
+):
+    filename = (file.filename or "").lower()
+    if filename.endswith(".xlsx"):
+        file_type = "xlsx"
+    elif filename.endswith(".csv"):
+        file_type = "csv"
+    else:
+        raise HTTPException(status_code=400, detail="Only Excel (.xlsx) or CSV files allowed")
+
+    if campaign_id is not None:
+        campaign = db.query(BulkCampaign).filter(BulkCampaign.id == campaign_id).first()
+        if not campaign:
+            raise HTTPException(status_code=404, detail="Campaign not found")
+        if campaign.status == bulk_campaigns.CANCELLED:
+            raise HTTPException(status_code=400, detail="Campaign is cancelled")
+
+    # The upload is already spooled to disk; it is parsed from there in chunks
+    try:
+        result = await run_in_threadpool(import_recipients, db, file.file, file_type, campaign_id)
+    except ImportFormatError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    stats = result["stats"]
+    skipped = stats["invalid"] + stats["duplicates_in_file"] + stats["duplicates_pending"]
+    message = f"{stats['inserted']} emails uploaded successfully"
+    if skipped:
+        message += f" ({skipped} skipped)"
+    return {"message": message, **result}
 
 
 # ---------------------------------------------------------
 # DOWNLOAD EXCEL (export saved bulk emails)
 # ---------------------------------------------------------
-@router.get("/download", response_class=StreamingResponse)
-async def download_bulk_email_excel(db: Session = Depends(get_db), current_user: User = Depends(require_admin)):
-    emails = db.query(BulkEmail).all()
-
-    df = pd.DataFrame([ [e.email, e.content] for e in emails ], columns=["Email", "Content"])
-    # 👆 Column headings defined clearly
+BULK_EXPORT_HEADER = ["ID", "Campaign ID", "Email", "Content", "Status", "Attempts", "Response", "Sent At", "Created At"]
+BULK_STATUS_NAMES = {
+    BulkEmailStatus.pending: "pending",
+    BulkEmailStatus.sent: "sent",
+    BulkEmailStatus.cancelled: "cancelled",
+    BulkEmailStatus.failed: "failed",
+}
+
+
+def _bulk_export_rows(campaign_id: Optional[int] = None) -> Iterator[list]:
+    statement = (
+        select(
+            BulkEmail.id, BulkEmail.campaign_id, BulkEmail.email, BulkEmail.content, BulkEmail.status,
+            BulkEmail.attempts, BulkEmail.response, BulkEmail.sent_at, BulkEmail.created_at
+        )
+        .order_by(BulkEmail.id)
+    )
+    if campaign_id is not None:
+        statement = statement.where(BulkEmail.campaign_id == campaign_id)
+    for row in iter_rows(statement):
+        yield [
+            row.id,
+            row.campaign_id,
+            row.email,
+            row.content,
+            BULK_STATUS_NAMES.get(row.status, row.status),
+            row.attempts,
+            row.response or "",
+            row.sent_at,
+            row.created_at,
+        ]
 
-    stream = io.BytesIO()
-    df.to_excel(stream, index=False, header=True)  # ensure headings show
-    stream.seek(0)
 
-    return StreamingResponse(
-        stream,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": "attachment; filename=bulk_emails.xlsx"}
+@router.get("/download", response_class=StreamingResponse)
+async def download_bulk_email_excel(
+    format: str = Query("xlsx", pattern="^(xlsx|csv)$"),
+    campaign_id: Optional[int] = Query(None),
+    current_user: User = Depends(require_admin)
+):
+    """Export bulk emails with their send status (xlsx or csv), streamed without loading all rows"""
+    rows = _bulk_export_rows(campaign_id)
+    if format == "csv":
+        return file_response(csv_chunks(BULK_EXPORT_HEADER, rows), "bulk_emails.csv", CSV_MEDIA_TYPE)
+    return file_response(
+        xlsx_chunks([("Bulk Emails", BULK_EXPORT_HEADER, rows)]),
+        "bulk_emails.xlsx",
+        XLSX_MEDIA_TYPE
     )
 
 
@@ -72,40 +122,99 @@ async def download_bulk_email_excel(db: Session = Depends(get_db), current_user:
 # SEND ALL PENDING EMAILS
 # ---------------------------------------------------------
 @router.post("/send-all")
-async def bulk_send_all(db: Session = Depends(get_db), current_user=Depends(require_admin)):
-    pending = db.query(BulkEmail).filter(BulkEmail.status == 0).all()
+async def bulk_send_all(current_user=Depends(require_admin)):
+    # Same claim-based sender as the scheduler, so the two never send a row twice
+    result = await run_in_threadpool(send_pending_bulk_emails)
 
-    if not pending:
+    if not result["sent"] and not result["failed"]:
         return {"message": "No pending emails to send"}
 
-    sent = 0
-    failed = 0
-
-    for record in pending:
-        try:
-            message_id = send_mail(
-                to_email=record.email,
-                subject="Bulk Mail Delivery",
-                body=record.content,
-                attachments=None
-            )
-
-            if message_id:
-                record.status = BulkEmailStatus.sent
-                record.response = f"Sent - MessageID {message_id}"
-                sent += 1
-            else:
-                record.response = "Mail Failed"
-                failed += 1
-
-        except Exception as e:
-            record.response = f"Error: {str(e)}"
-            failed += 1
-
-        db.commit()
-
     return {
         "message": "Bulk email processing complete",
-        "sent": sent,
-        "failed": failed
+        "sent": result["sent"],
+        "failed": result["failed"]
     }
+
+
+# ---------------------------------------------------------
+# CAMPAIGNS
+# ---------------------------------------------------------
+def _get_campaign(db: Session, campaign_id: int) -> BulkCampaign:
+    campaign = db.query(BulkCampaign).filter(BulkCampaign.id == campaign_id).first()
+    if not campaign:
+        raise HTTPException(status_code=404, detail="Campaign not found")
+    return campaign
+
+
+def _set_campaign_status(db: Session, campaign_id: int, status: str) -> dict:
+    campaign = _get_campaign(db, campaign_id)
+    try:
+        campaign = bulk_campaigns.set_status(db, campaign, status)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return bulk_campaigns.serialize_campaign(campaign)
+
+
+@router.post("/campaigns")
+async def create_campaign(
+    payload: CampaignCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_admin)
+):
+    """Create a campaign; upload its recipients with POST /upload?campaign_id=..."""
+    scheduled_at = payload.scheduled_at
+    if scheduled_at and scheduled_at.tzinfo:
+        scheduled_at = scheduled_at.astimezone(timezone.utc).replace(tzinfo=None)
+    campaign = bulk_campaigns.create_campaign(
+        db, payload.name, payload.subject, scheduled_at, current_user.id
+    )
+    return bulk_campaigns.serialize_campaign(campaign)
+
+
+@router.get("/campaigns")
+async def list_campaigns(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_admin)
+):
+    """Campaigns with live progress, newest first"""
+    campaigns = db.query(BulkCampaign).order_by(BulkCampaign.id.desc()).limit(200).all()
+    now = datetime.utcnow()
+    return [bulk_campaigns.serialize_campaign(campaign, now) for campaign in campaigns]
+
+
+@router.get("/campaigns/{campaign_id}")
+async def get_campaign(
+    campaign_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_admin)
+):
+    """Progress of a campaign: queued / sent / failed / cancelled, mails per second and ETA"""
+    return bulk_campaigns.serialize_campaign(_get_campaign(db, campaign_id))
+
+
+@router.post("/campaigns/{campaign_id}/pause")
+async def pause_campaign(
+    campaign_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_admin)
+):
+    return _set_campaign_status(db, campaign_id, bulk_campaigns.PAUSED)
+
+
+@router.post("/campaigns/{campaign_id}/resume")
+async def resume_campaign(
+    campaign_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_admin)
+):
+    return _set_campaign_status(db, campaign_id, bulk_campaigns.RUNNING)
+
+
+@router.post("/campaigns/{campaign_id}/cancel")
+async def cancel_campaign(
+    campaign_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_admin)
+):
+    """Cancel a campaign; its unsent rows are marked cancelled"""
+    return _set_campaign_status(db, campaign_id, bulk_campaigns.CANCELLED)
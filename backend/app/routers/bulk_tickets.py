@@ -0,0 +1,142 @@
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
+from sqlalchemy.orm import Session
+from pydantic import BaseModel
+from typing import List, Optional
+from ..db import get_db
+from ..deps import require_admin
+from ..models import (
+    User, Role, TicketStatus, BulkTicketJob,
+    CategoryLanguage, CategoryVOC, CategoryPriority
+)
+from ..services import bulk_tickets
+
+router = APIRouter()
+
+MAX_TICKET_IDS = 50000
+
+
+class BulkTicketFilter(BaseModel):
+    status: Optional[TicketStatus] = None
+    priority_id: Optional[int] = None
+    assigned_to: Optional[int] = None
+    unassigned: Optional[bool] = None
+    from_date: Optional[str] = None
+    to_date: Optional[str] = None
+
+class BulkSelection(BaseModel):
+    ticket_ids: Optional[List[int]] = None
+    filter: Optional[BulkTicketFilter] = None
+
+class BulkReassignRequest(BulkSelection):
+    assigned_to: int
+
+class BulkStatusRequest(BulkSelection):
+    status: TicketStatus
+    send_feedback: bool = False
+
+class BulkRetagRequest(BulkSelection):
+    language_id: Optional[int] = None
+    voc_id: Optional[int] = None
+    priority_id: Optional[int] = None
+
+
+def resolve_selection(selection: BulkSelection):
+    """Validate that exactly one of ticket_ids / filter is given"""
+    if bool(selection.ticket_ids) == bool(selection.filter):
+        raise HTTPException(status_code=400, detail="Provide either ticket_ids or filter")
+
+    if selection.ticket_ids:
+        if len(selection.ticket_ids) > MAX_TICKET_IDS:
+            raise HTTPException(status_code=400, detail=f"At most {MAX_TICKET_IDS} ticket ids per job")
+        return selection.ticket_ids, None
+
+    filters = selection.filter.model_dump(exclude_none=True, mode="json")
+    if not filters:
+        raise HTTPException(status_code=400, detail="Filter must have at least one condition")
+    return None, filters
+
+
+def start_job(db, background_tasks, operation, changes, selection, current_user, send_feedback=False):
+    ticket_ids, filters = resolve_selection(selection)
+    try:
+        job = bulk_tickets.create_job(
+            db, operation, changes, ticket_ids, filters, current_user.id, send_feedback
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format, use YYYY-MM-DD")
+
+    background_tasks.add_task(bulk_tickets.run_job, job.id)
+    return bulk_tickets.serialize_job(job)
+
+
+@router.post("/reassign")
+async def bulk_reassign(
+    payload: BulkReassignRequest,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_admin)
+):
+    """Reassign all selected tickets to one adviser (admin only)"""
+    user = db.query(User).filter(User.id == payload.assigned_to).first()
+    if not user or user.role != Role.adviser or not user.is_active:
+        raise HTTPException(status_code=400, detail="Invalid adviser ID")
+
+    return start_job(
+        db, background_tasks, bulk_tickets.REASSIGN,
+        {"assigned_to": payload.assigned_to}, payload, current_user
+    )
+
+
+@router.post("/status")
+async def bulk_status(
+    payload: BulkStatusRequest,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_admin)
+):
+    """Change status of all selected tickets (admin only). Closing sends feedback mails only if asked."""
+    return start_job(
+        db, background_tasks, bulk_tickets.STATUS,
+        {"status": payload.status.value}, payload, current_user,
+        send_feedback=payload.send_feedback
+    )
+
+
+@router.post("/retag")
+async def bulk_retag(
+    payload: BulkRetagRequest,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_admin)
+):
+    """Set language / VOC / priority of all selected tickets (admin only)"""
+    changes = {}
+    for field, model, label in (
+        ("language_id", CategoryLanguage, "language"),
+        ("voc_id", CategoryVOC, "VOC"),
+        ("priority_id", CategoryPriority, "priority"),
+    ):
+        value = getattr(payload, field)
+        if value is None:
+            continue
+        if not db.query(model.id).filter(model.id == value).first():
+            raise HTTPException(status_code=400, detail=f"Invalid {label} ID")
+        changes[field] = value
+
+    if not changes:
+        raise HTTPException(status_code=400, detail="Nothing to change")
+
+    return start_job(db, background_tasks, bulk_tickets.RETAG, changes, payload, current_user)
+
+
+@router.get("/jobs/{job_id}")
+async def get_bulk_job(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_admin)
+):
+    """Progress of a bulk ticket job"""
+    job = db.query(BulkTicketJob).filter(BulkTicketJob.id == job_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return bulk_tickets.serialize_job(job)
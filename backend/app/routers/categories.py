@@ -1,10 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Response
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 from typing import List
 from ..db import get_db
 from ..deps import require_admin
 from ..models import CategoryLanguage, CategoryVOC, CategoryPriority
+from ..services import etags
 
 router = APIRouter()
 
@@ -43,8 +44,14 @@ async def create_language(
     return language
 
 @router.get("/language", response_model=List[LanguageResponse])
-async def list_languages(db: Session = Depends(get_db)):
+async def list_languages(request: Request, response: Response, db: Session = Depends(get_db)):
     """List all language categories"""
+    etag = etags.make_etag("languages", etags.get_version(db, etags.CATEGORIES))
+    cached = etags.not_modified(request, etag)
+    if cached:
+        return cached
+
+    etags.set_headers(response, etag)
     return db.query(CategoryLanguage).order_by(CategoryLanguage.name).all()
 
 @router.patch("/language/{lang_id}", response_model=LanguageResponse)
@@ -101,8 +108,14 @@ async def create_voc(
     return voc
 
 @router.get("/voc", response_model=List[VOCResponse])
-async def list_vocs(db: Session = Depends(get_db)):
+async def list_vocs(request: Request, response: Response, db: Session = Depends(get_db)):
     """List all VOC categories"""
+    etag = etags.make_etag("vocs", etags.get_version(db, etags.CATEGORIES))
+    cached = etags.not_modified(request, etag)
+    if cached:
+        return cached
+
+    etags.set_headers(response, etag)
     return db.query(CategoryVOC).order_by(CategoryVOC.name).all()
 
 @router.patch("/voc/{voc_id}", response_model=VOCResponse)
@@ -162,8 +175,14 @@ async def create_priority(
     return priority
 
 @router.get("/priority", response_model=List[PriorityResponse])
-async def list_priorities(db: Session = Depends(get_db)):
+async def list_priorities(request: Request, response: Response, db: Session = Depends(get_db)):
     """List all priority categories"""
+    etag = etags.make_etag("priorities", etags.get_version(db, etags.CATEGORIES))
+    cached = etags.not_modified(request, etag)
+    if cached:
+        return cached
+
+    etags.set_headers(response, etag)
     return db.query(CategoryPriority).order_by(CategoryPriority.weight.desc()).all()
 
 @router.patch("/priority/{priority_id}", response_model=PriorityResponse)
@@ -1,4 +1,5 @@
 import json
+import uuid
 from pathlib import Path
 
 from fastapi import APIRouter, Depends, HTTPException, Form, File, UploadFile
@@ -7,7 +8,8 @@ from typing import Optional, List
 from ..db import get_db
 from ..models import User
 from ..deps import get_current_user
-from ..services.mailer import send_mail
+from ..services.mailer import send_mail_async, MAX_ATTACHMENT_SIZE
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel, EmailStr
 import logging
 from ..config import settings
@@ -81,6 +83,12 @@ async def debug_sent_emails(
         }
     }
 
+def _discard_uploads(handler, msg_dir: str, created: List[str]) -> None:
+    """Remove the uploads of an email that was not sent, and their directory"""
+    handler.remove_files(created)
+    handler.remove_empty_dir(msg_dir)
+
+
 @router.post("/send")
 async def send_email(
     to: str = Form(...),
@@ -109,28 +117,38 @@ async def send_email(
         # For now, send to the first recipient (we can enhance this later for multiple recipients)
         primary_recipient = to_emails[0]
 
-        prepared_files = []
+        from ..workers.attachment_handler import AttachmentHandler
+        handler = AttachmentHandler(settings.ATTACHMENTS_ROOT)
+
+        # Stream uploads to disk before sending; the mail is encoded from
+        # those files. The ticket doesn't exist yet, so they get their own dir.
+        msg_dir = f"msg_sent_{uuid.uuid4().hex}"
+        saved_attachments = []
+        created = []
+        try:
+            for file in attachments or []:
+                info, is_new = await run_in_threadpool(
+                    handler.save_upload, file, msg_dir, MAX_ATTACHMENT_SIZE
+                )
+                saved_attachments.append(info)
+                if is_new:
+                    created.append(info["file_path"])
+        except ValueError as e:
+            await run_in_threadpool(_discard_uploads, handler, msg_dir, created)
+            raise HTTPException(status_code=400, detail=str(e))
 
-        if attachments:
-            for file in attachments:
-                file_bytes = await file.read()
-                await file.seek(0)
-                prepared_files.append({
-                    "file": file,
-                    "bytes": file_bytes
-                })
-        
         # Send the email
-        message_id = send_mail(
+        message_id = await send_mail_async(
             to_email=primary_recipient,
             subject=subject,
             body=body,
             cc_emails=cc_emails if cc_emails else None,
             bcc_emails=bcc_emails if bcc_emails else None,
-            attachments=attachments
+            attachments=saved_attachments
         )
         
         if not message_id:
+            await run_in_threadpool(_discard_uploads, handler, msg_dir, created)
             raise HTTPException(status_code=500, detail="Failed to send email")
         
         # Save the sent email to database
@@ -149,33 +167,6 @@ async def send_email(
         db.add(ticket)
         db.flush()  # Get the ticket ID
         logger.info(f"Created new ticket #{ticket.id} for sent email")
-
-        from ..workers.attachment_handler import AttachmentHandler
-        handler = AttachmentHandler(settings.ATTACHMENTS_ROOT)
-
-        saved_attachments = []
-
-        if prepared_files:
-            msg_dir = f"msg_{ticket.id}"
-            message_dir = handler.attachment_dir / msg_dir
-            message_dir.mkdir(parents=True, exist_ok=True)
-
-            for item in prepared_files:
-                file = item["file"]
-                raw = item["bytes"]
-
-                safe_name = handler._sanitize_filename(file.filename)
-                file_path = message_dir / safe_name
-
-                with open(file_path, "wb") as f:
-                    f.write(raw)
-
-                saved_attachments.append({
-                    "filename": file.filename,
-                    "mime_type": file.content_type,
-                    "file_path": f"{msg_dir}/{safe_name}",
-                    "size": file_path.stat().st_size
-                })
         
         # Create message record
         message = TicketMessage(
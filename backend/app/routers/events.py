@@ -0,0 +1,53 @@
+import asyncio
+
+from fastapi import APIRouter, Query, Request
+from fastapi.responses import StreamingResponse
+
+from ..config import settings
+from ..db import SessionLocal
+from ..deps import authenticate_token
+from ..models import Role
+from ..services import realtime
+
+router = APIRouter()
+
+
+@router.get("/stream")
+async def stream_events(
+    request: Request,
+    token: str = Query(..., description="JWT access token (EventSource can't send headers)")
+):
+    """
+    Server-Sent Events stream of inbox changes. Advisers receive events
+    for tickets assigned (or previously assigned) to them, admins all.
+    """
+    # Not using get_db: its session would stay open for the whole stream
+    db = SessionLocal()
+    try:
+        user = authenticate_token(token, db)
+        user_id, is_admin = user.id, user.role == Role.admin
+    finally:
+        db.close()
+
+    subscriber = realtime.broker.subscribe(user_id, is_admin)
+
+    async def event_stream():
+        try:
+            yield "retry: 5000\n\n"
+            while not await request.is_disconnected():
+                try:
+                    item = await asyncio.wait_for(
+                        subscriber.queue.get(), timeout=settings.REALTIME_HEARTBEAT_SECONDS
+                    )
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield realtime.format_sse(item)
+        finally:
+            realtime.broker.unsubscribe(subscriber)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -1,18 +1,76 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from fastapi.responses import StreamingResponse
-from sqlalchemy.orm import Session, joinedload
+import os
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query
+from fastapi.responses import FileResponse, StreamingResponse
+from sqlalchemy.orm import Session
+from pydantic import BaseModel
 from typing import Optional
-from datetime import datetime, timedelta
-import csv
-import io
+from datetime import datetime, timedelta, timezone
 from ..db import get_db
 from ..deps import require_admin
-from ..models import Ticket, TicketMessage, User, BlockedSender, MsgDir, TicketFeedback, TicketEvent
-from io import BytesIO
-from openpyxl import Workbook
+from ..models import User, ExportJob
+from ..services import export_jobs, exports
+from ..services.streaming_export import (
+    CSV_MEDIA_TYPE, GZIP_MEDIA_TYPE, XLSX_MEDIA_TYPE, csv_chunks, file_response, gzip_chunks, xlsx_chunks
+)
 
 router = APIRouter()
 
+# CSV exports are read with yield_per on a session of their own and
+# written out as the rows arrive, so neither memory use nor the time to
+# the first byte grows with the export size. ?gzip=true compresses the
+# stream on the fly (a .csv.gz download). Exports too large to wait for
+# can be run as background jobs instead (POST /exports/jobs).
+#
+# Tickets and ticket events also export deltas (?delta=true): only rows
+# changed since the continuation token of the previous pull (or ?since=),
+# optionally ?limit= rows per page. The token for the next pull and
+# whether more rows are waiting come back in the X-Next-Token and
+# X-Has-More headers.
+
+
+class ExportJobRequest(BaseModel):
+    kind: str
+    gzip: bool = False
+    status: Optional[str] = None
+    assigned_to: Optional[int] = None
+    priority_id: Optional[int] = None
+    spam_status: Optional[str] = None
+    ticket_id: Optional[int] = None
+    from_date: Optional[str] = None
+    to_date: Optional[str] = None
+
+
+def _csv_response(export: exports.CsvExport, gzip: bool) -> StreamingResponse:
+    chunks = csv_chunks(export.header, export.rows())
+    if gzip:
+        return file_response(gzip_chunks(chunks), export.filename("csv.gz"), GZIP_MEDIA_TYPE)
+    return file_response(chunks, export.filename(), CSV_MEDIA_TYPE)
+
+
+def _delta_response(
+    db: Session,
+    kind: str,
+    export: exports.CsvExport,
+    filters: dict,
+    token: Optional[str],
+    since: Optional[datetime],
+    limit: Optional[int],
+    gzip: bool
+) -> StreamingResponse:
+    if since and since.tzinfo:
+        since = since.astimezone(timezone.utc).replace(tzinfo=None)
+    filters = {name: value for name, value in filters.items() if value is not None}
+    try:
+        export, next_token, has_more = exports.delta_export(db, kind, export, filters, token, since, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    response = _csv_response(export, gzip)
+    response.headers["X-Next-Token"] = next_token
+    response.headers["X-Has-More"] = "true" if has_more else "false"
+    return response
+
+
 @router.get("/tickets/csv")
 async def export_tickets_csv(
     status: Optional[str] = Query(None),
@@ -20,79 +78,26 @@ async def export_tickets_csv(
     priority_id: Optional[int] = Query(None),
     from_date: Optional[str] = Query(None),
     to_date: Optional[str] = Query(None),
+    gzip: bool = Query(False),
+    delta: bool = Query(False, description="Only tickets changed since token / since"),
+    token: Optional[str] = Query(None, description="X-Next-Token of the previous delta export"),
+    since: Optional[datetime] = Query(None),
+    limit: Optional[int] = Query(None, ge=1),
     db: Session = Depends(get_db),
     current_user: User = Depends(require_admin)
 ):
     """Export tickets to CSV format"""
-    
-    query = db.query(Ticket).options(
-        joinedload(Ticket.assigned_user),
-        joinedload(Ticket.language),
-        joinedload(Ticket.voc),
-        joinedload(Ticket.priority)
-    )
-    
-    # Apply filters
-    if status:
-        query = query.filter(Ticket.status == status)
-    if assigned_to:
-        query = query.filter(Ticket.assigned_to == assigned_to)
-    if priority_id:
-        query = query.filter(Ticket.priority_id == priority_id)
-    if from_date:
-        query = query.filter(Ticket.created_at >= from_date)
-    if to_date:
-        query = query.filter(Ticket.created_at <= to_date)
-    
-    query = query.order_by(Ticket.created_at.desc())
-    tickets = query.all()
-    
-    # Create CSV in memory
-    output = io.StringIO()
-    writer = csv.writer(output)
-    
-    # Write header
-    writer.writerow([
-        'Ticket ID',
-        'Customer Email',
-        'Customer Name',
-        'Subject',
-        'Status',
-        'Assigned To',
-        'Language',
-        'VOC',
-        'Priority',
-        'Created At',
-        'Updated At'
-    ])
-    
-    # Write data
-    for ticket in tickets:
-        writer.writerow([
-            ticket.id,
-            ticket.customer_email,
-            ticket.customer_name or '',
-            ticket.subject,
-            ticket.status.value,
-            ticket.assigned_user.name if ticket.assigned_user else '',
-            ticket.language.name if ticket.language else '',
-            ticket.voc.name if ticket.voc else '',
-            ticket.priority.name if ticket.priority else '',
-            ticket.created_at.strftime('%Y-%m-%d %H:%M:%S'),
-            ticket.updated_at.strftime('%Y-%m-%d %H:%M:%S')
-        ])
-    
-    output.seek(0)
-    
-    # Generate filename with timestamp
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    filename = f"tickets_export_{timestamp}.csv"
-    
-    return StreamingResponse(
-        iter([output.getvalue()]),
-        media_type="text/csv",
-        headers={"Content-Disposition": f"attachment; filename={filename}"}
-    )
+    filters = {
+        "status": status,
+        "assigned_to": assigned_to,
+        "priority_id": priority_id,
+        "from_date": from_date,
+        "to_date": to_date
+    }
+    export = exports.tickets_export(**filters)
+    if delta or token:
+        return _delta_response(db, exports.TICKETS, export, filters, token, since, limit, gzip)
+    return _csv_response(export, gzip)
 
 
 @router.get("/emails/csv")
@@ -100,97 +105,19 @@ async def export_emails_csv(
     spam_status: Optional[str] = Query(None, description="spam, not_spam, or all"),
     from_date: Optional[str] = Query(None),
     to_date: Optional[str] = Query(None),
-    db: Session = Depends(get_db),
+    gzip: bool = Query(False),
     current_user: User = Depends(require_admin)
 ):
     """Export emails to CSV format - includes spam and non-spam emails"""
-    
-    # Get all ticket messages
-    query = db.query(TicketMessage).options(
-        joinedload(TicketMessage.ticket),
-        joinedload(TicketMessage.created_user)
-    )
-    
-    # Apply date filters
-    if from_date:
-        query = query.filter(TicketMessage.sent_at >= from_date)
-    if to_date:
-        query = query.filter(TicketMessage.sent_at <= to_date)
-    
-    query = query.order_by(TicketMessage.sent_at.desc())
-    messages = query.all()
-    
-    # Get blocked senders (spam emails)
-    blocked_senders = db.query(BlockedSender).all()
-    blocked_emails = {bs.email.lower() for bs in blocked_senders}
-    
-    # Create CSV in memory
-    output = io.StringIO()
-    writer = csv.writer(output)
-    
-    # Write header
-    writer.writerow([
-        'Message ID',
-        'Ticket ID',
-        'Direction',
-        'From Email',
-        'To Email',
-        'Subject',
-        'Body Preview',
-        'Spam Status',
-        'Sent At',
-        'Has Attachments'
-    ])
-    
-    # Write data
-    for message in messages:
-        from_email_lower = message.from_email.lower()
-        is_spam = from_email_lower in blocked_emails
-        spam_label = 'Spam' if is_spam else 'Not Spam'
-        
-        # Apply spam filter if specified
-        if spam_status == 'spam' and not is_spam:
-            continue
-        if spam_status == 'not_spam' and is_spam:
-            continue
-        
-        # Get body preview (first 100 chars)
-        body_preview = message.body[:100].replace('\n', ' ').replace('\r', ' ') if message.body else ''
-        
-        has_attachments = 'Yes' if message.attachments_json else 'No'
-        
-        writer.writerow([
-            message.id,
-            message.ticket_id,
-            message.direction.value,
-            message.from_email,
-            message.to_email,
-            message.subject,
-            body_preview,
-            spam_label,
-            message.sent_at.strftime('%Y-%m-%d %H:%M:%S'),
-            has_attachments
-        ])
-    
-    output.seek(0)
-    
-    # Generate filename with timestamp
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    spam_suffix = f"_{spam_status}" if spam_status and spam_status != 'all' else ""
-    filename = f"emails_export{spam_suffix}_{timestamp}.csv"
-    
-    return StreamingResponse(
-        iter([output.getvalue()]),
-        media_type="text/csv",
-        headers={"Content-Disposition": f"attachment; filename={filename}"}
-    )
+    export = exports.emails_export(spam_status=spam_status, from_date=from_date, to_date=to_date)
+    return _csv_response(export, gzip)
 
 
 @router.get("/spam-emails/csv")
 async def export_spam_emails_csv(
     from_date: Optional[str] = Query(None),
     to_date: Optional[str] = Query(None),
-    db: Session = Depends(get_db),
+    gzip: bool = Query(False),
     current_user: User = Depends(require_admin)
 ):
     """Export only spam emails (from blocked senders)"""
@@ -198,46 +125,18 @@ async def export_spam_emails_csv(
         spam_status="spam",
         from_date=from_date,
         to_date=to_date,
-        db=db,
+        gzip=gzip,
         current_user=current_user
     )
 
 
 @router.get("/blocked-senders/csv")
 async def export_blocked_senders_csv(
-    db: Session = Depends(get_db),
+    gzip: bool = Query(False),
     current_user: User = Depends(require_admin)
 ):
     """Export blocked senders list to CSV"""
-    
-    blocked_senders = db.query(BlockedSender).all()
-    
-    # Create CSV in memory
-    output = io.StringIO()
-    writer = csv.writer(output)
-    
-    # Write header
-    writer.writerow(['ID', 'Email', 'Reason'])
-    
-    # Write data
-    for sender in blocked_senders:
-        writer.writerow([
-            sender.id,
-            sender.email,
-            sender.reason or ''
-        ])
-    
-    output.seek(0)
-    
-    # Generate filename with timestamp
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    filename = f"blocked_senders_{timestamp}.csv"
-    
-    return StreamingResponse(
-        iter([output.getvalue()]),
-        media_type="text/csv",
-        headers={"Content-Disposition": f"attachment; filename={filename}"}
-    )
+    return _csv_response(exports.blocked_senders_export(), gzip)
 
 
 
@@ -245,65 +144,21 @@ async def export_blocked_senders_csv(
 def export_ticket_feedback_excel(
     from_date: str = Query(None),
     to_date: str = Query(None),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_admin)
 ):
-    query = (
-        db.query(TicketFeedback, Ticket)
-        .join(Ticket, TicketFeedback.ticket_id == Ticket.id)
-    )
-
-    # ✅ Date filtering
-    if from_date:
-        from_dt = datetime.strptime(from_date, "%Y-%m-%d")
-        query = query.filter(TicketFeedback.created_at >= from_dt)
-
-    if to_date:
-        to_dt = datetime.strptime(to_date, "%Y-%m-%d") + timedelta(days=1)
-        query = query.filter(TicketFeedback.created_at <= to_dt)
-
-    results = query.all()
-
-    # ✅ Create Excel file
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Ticket Feedback"
-
-    # Headers
-    headers = [
-        "Ticket ID",
-        "Customer Email",
-        "Support Rating",
-        "Delivery Rating",
-        "Product Rating",
-        "Submitted At",
-        "Created At",
-    ]
-    ws.append(headers)
-
-    # Data rows
-    for feedback, ticket in results:
-        ws.append([
-            feedback.ticket_id,
-            ticket.customer_email,
-            feedback.support_rating,
-            feedback.delivery_rating,
-            feedback.product_rating,
-            feedback.submitted_at,
-            feedback.created_at,
-        ])
-
-    # Save to memory
-    output = BytesIO()
-    wb.save(output)
-    output.seek(0)
-
+    """Ticket feedback ratings, plus average ratings per adviser per week (xlsx, streamed)"""
+    # Parsed before streaming starts, so a bad date is a 400 rather than a broken download
+    try:
+        from_dt = datetime.strptime(from_date, "%Y-%m-%d") if from_date else None
+        # include full day
+        to_dt = datetime.strptime(to_date, "%Y-%m-%d") + timedelta(days=1) if to_date else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format, use YYYY-MM-DD")
+
+    sheets = exports.feedback_sheets(db.get_bind().dialect.name, from_dt, to_dt)
     filename = f"ticket_feedback_{datetime.now().strftime('%Y%m%d%H%M%S')}.xlsx"
-
-    return StreamingResponse(
-        output,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": f"attachment; filename={filename}"}
-    )
+    return file_response(xlsx_chunks(sheets), filename, XLSX_MEDIA_TYPE)
 
 
 
@@ -312,76 +167,88 @@ async def export_ticket_events_csv(
     ticket_id: Optional[int] = Query(None),
     from_date: Optional[str] = Query(None),
     to_date: Optional[str] = Query(None),
+    gzip: bool = Query(False),
+    delta: bool = Query(False, description="Only events recorded since token / since"),
+    token: Optional[str] = Query(None, description="X-Next-Token of the previous delta export"),
+    since: Optional[datetime] = Query(None),
+    limit: Optional[int] = Query(None, ge=1),
     db: Session = Depends(get_db),
     current_user: User = Depends(require_admin)
 ):
     """Export ticket events (status changes) to CSV"""
+    filters = {"ticket_id": ticket_id, "from_date": from_date, "to_date": to_date}
+    export = exports.ticket_events_export(**filters)
+    if delta or token:
+        return _delta_response(db, exports.TICKET_EVENTS, export, filters, token, since, limit, gzip)
+    return _csv_response(export, gzip)
+
+
+# ---------------------------------------------------------
+# BACKGROUND EXPORT JOBS
+# ---------------------------------------------------------
+def _get_job(db: Session, job_id: int) -> ExportJob:
+    job = db.query(ExportJob).filter(ExportJob.id == job_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Export job not found")
+    return job
+
+
+@router.post("/jobs")
+async def create_export_job(
+    payload: ExportJobRequest,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_admin)
+):
+    """
+    Start a background CSV export (kind: tickets, emails, blocked_senders
+    or ticket_events, with that export's filters). An identical export of
+    unchanged data returns the existing job and file instead.
+    """
+    if payload.kind not in exports.EXPORTS:
+        raise HTTPException(
+            status_code=400, detail=f"Unknown export, use one of: {', '.join(exports.EXPORTS)}"
+        )
+
+    accepted = exports.EXPORTS[payload.kind][1]
+    filters = payload.model_dump(exclude_none=True, exclude={"kind", "gzip"})
+    unsupported = [name for name in filters if name not in accepted]
+    if unsupported:
+        raise HTTPException(
+            status_code=400, detail=f"Filters not supported by {payload.kind}: {', '.join(unsupported)}"
+        )
+
+    job, created = export_jobs.submit(db, payload.kind, filters, payload.gzip, current_user.id)
+    if created:
+        background_tasks.add_task(export_jobs.run_job, job.id)
+    return {**export_jobs.serialize_job(job), "reused": not created}
+
+
+@router.get("/jobs/{job_id}")
+async def get_export_job(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_admin)
+):
+    """Progress of a background export"""
+    return export_jobs.serialize_job(_get_job(db, job_id))
 
-    query = db.query(TicketEvent).options(
-        joinedload(TicketEvent.ticket)
-    )
 
-    # Filters
-    if ticket_id:
-        query = query.filter(TicketEvent.ticket_id == ticket_id)
-
-    if from_date:
-        query = query.filter(TicketEvent.created_at >= from_date)
-
-    if to_date:
-        query = query.filter(TicketEvent.created_at <= to_date)
-
-    query = query.order_by(TicketEvent.created_at.desc())
-
-    events = query.all()
-
-    # CSV
-    output = io.StringIO()
-    writer = csv.writer(output)
-
-    # Header
-    writer.writerow([
-        'Event ID',
-        'Ticket ID',
-        'Customer Email',
-        'Subject',
-        'Assigned To',
-        'Ticket Status',
-        'Ticket Created At',
-        'Ticket Updated At',
-        'Event Old Status',
-        'Event New Status',
-        'Event Type',
-        'Reopened At'
-    ])
-
-    # Data
-    for event in events:
-        ticket = event.ticket
-
-        writer.writerow([
-            event.id,
-            event.ticket_id,
-            ticket.customer_email if ticket else '',
-            ticket.subject if ticket else '',
-            ticket.assigned_user.name if ticket and ticket.assigned_user else '',
-            ticket.status.value if ticket and ticket.status else '',
-            ticket.created_at.strftime('%Y-%m-%d %H:%M:%S') if ticket and ticket.created_at else '',
-            ticket.updated_at.strftime('%Y-%m-%d %H:%M:%S') if ticket and ticket.updated_at else '',
-            event.old_value,
-            event.new_value,
-            event.event_type,
-            event.created_at.strftime('%Y-%m-%d %H:%M:%S')
-        ])
-
-    output.seek(0)
-
-    # Filename
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    filename = f"ticket_events_export_{timestamp}.csv"
-
-    return StreamingResponse(
-        iter([output.getvalue()]),
-        media_type="text/csv",
-        headers={"Content-Disposition": f"attachment; filename={filename}"}
-    )
\ No newline at end of file
+@router.get("/jobs/{job_id}/download")
+async def download_export_job(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_admin)
+):
+    """The result file of a completed background export"""
+    job = _get_job(db, job_id)
+    if job.status != export_jobs.JOB_COMPLETED:
+        raise HTTPException(status_code=400, detail=f"Export job is {job.status}")
+    if not job.file_path or not os.path.exists(job.file_path):
+        raise HTTPException(status_code=404, detail="Export file no longer available")
+
+    return FileResponse(
+        job.file_path,
+        media_type=GZIP_MEDIA_TYPE if job.compressed else CSV_MEDIA_TYPE,
+        filename=job.file_name
+    )
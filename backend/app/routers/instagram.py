@@ -1,5 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException, Request, Query
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from typing import Optional
 from datetime import datetime
@@ -308,7 +309,8 @@ async def send_instagram_message(
     service = InstagramService(config.access_token, config.instagram_business_account_id)
     recipient_id = ticket.channel_identifier
     
-    message_id = service.send_message(recipient_id, message_data.message)
+    # The Graph API client is blocking; keep it off the event loop
+    message_id = await run_in_threadpool(service.send_message, recipient_id, message_data.message)
     
     if not message_id:
         raise HTTPException(status_code=500, detail="Failed to send Instagram message")
@@ -1,10 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Response
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 from typing import List
 from ..db import get_db
 from ..deps import require_admin
 from ..models import EmailTemplate
+from ..services import etags
 
 router = APIRouter()
 
@@ -45,8 +46,14 @@ async def create_template(
     return template
 
 @router.get("/", response_model=List[TemplateResponse])
-async def list_templates(db: Session = Depends(get_db)):
+async def list_templates(request: Request, response: Response, db: Session = Depends(get_db)):
     """List all email templates"""
+    etag = etags.make_etag("templates", etags.get_version(db, etags.TEMPLATES))
+    cached = etags.not_modified(request, etag)
+    if cached:
+        return cached
+
+    etags.set_headers(response, etag)
     return db.query(EmailTemplate).order_by(EmailTemplate.name).all()
 
 @router.get("/{template_id}", response_model=TemplateResponse)
@@ -1,6 +1,6 @@
 import json
-from fastapi import APIRouter, Depends, HTTPException, status, Query, File, UploadFile, Form
-from sqlalchemy.orm import Session, joinedload
+from fastapi import APIRouter, Depends, HTTPException, status, Query, File, UploadFile, Form, Request
+from sqlalchemy.orm import Session, selectinload
 from pydantic import BaseModel
 from typing import List, Optional
 from datetime import datetime, timedelta
@@ -10,18 +10,31 @@ from ..db import get_db
 from ..deps import get_current_user, require_admin, require_role
 from ..models import (
     Ticket, TicketMessage, User, Role, TicketStatus, MsgDir,
-    CategoryLanguage, CategoryVOC, CategoryPriority, EmailTemplate, TicketEvent
+    CategoryLanguage, CategoryVOC, CategoryPriority, EmailTemplate, TicketEvent,
+    TicketListView, TicketNote, TicketFeedback, TicketSLA, AdviserStatsDaily
 )
-from ..services.mailer import send_mail
-from ..utils import get_pagination_params, apply_pagination
+from ..services.mailer import send_mail_async, MAX_ATTACHMENT_SIZE
+from ..utils import get_pagination_params, apply_pagination, fetch_page
 from ..workers.attachment_handler import AttachmentHandler
 from ..config import settings
-from sqlalchemy import or_, and_
-from ..services.feedback_mailer import create_and_send_feedback
+from sqlalchemy import or_, and_, literal
+from starlette.concurrency import run_in_threadpool
+from ..services.feedback_mailer import create_and_send_feedback_async, create_feedback
+from ..services import count_cache, etags, templating, ticket_list_view
+from ..serializers import (
+    TICKET_COLUMNS, MESSAGE_SUMMARY_COLUMNS, serialize_ticket_row, serialize_message,
+    serialize_message_summary, serialize_note, FastJSONResponse
+)
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+# Thread modes for message listings
+MESSAGES_FULL = "full"
+MESSAGES_SUMMARY = "summary"
+MESSAGE_MODES = (MESSAGES_FULL, MESSAGES_SUMMARY)
+MAX_BODY_BATCH = 50
+
 # Pydantic models
 class TicketResponse(BaseModel):
     id: int
@@ -42,6 +55,12 @@ class TicketResponse(BaseModel):
     voc: Optional[dict] = None
     priority: Optional[dict] = None
 
+    # Thread summary (from ticket_list_view, list endpoint only)
+    message_count: Optional[int] = None
+    last_message_snippet: Optional[str] = None
+    last_message_at: Optional[datetime] = None
+    last_inbound_at: Optional[datetime] = None
+
     class Config:
         from_attributes = True
 
@@ -73,38 +92,51 @@ class MessageResponse(BaseModel):
 
 class TicketListResponse(BaseModel):
     tickets: List[TicketResponse]
-    total: int
+    total: Optional[int]
     page: int
     page_size: int
+    total_is_estimate: bool = False
 
 
 
-def get_overdue_pending_tickets(db: Session):
-    cutoff_time = datetime.utcnow() - timedelta(hours=48)
+def load_ticket_row(db: Session, ticket_id: int):
+    """Fetch a ticket as a TICKET_COLUMNS row from the ticket_list_view projection"""
+    query = db.query(*TICKET_COLUMNS).filter(TicketListView.ticket_id == ticket_id)
+    row = query.first()
+    if row is None and db.query(Ticket.id).filter(Ticket.id == ticket_id).first():
+        # Ticket written by a process without the projection hooks
+        ticket_list_view.refresh_tickets(db.connection(), [ticket_id])
+        db.commit()
+        row = query.first()
+    return row
+
 
+def overdue_pending_query(db: Session):
+    """
+    Pending tickets past their reminder deadline. Indexed range read on
+    ticket_sla.pending_reminder_due_at (kept current by the SLA hooks)
+    instead of scanning tickets by status and updated_at.
+    """
     return (
-        db.query(Ticket)
+        db.query(Ticket.id, Ticket.subject, Ticket.updated_at)
+        .join(TicketSLA, TicketSLA.ticket_id == Ticket.id)
         .filter(
-            and_(
-                Ticket.status == TicketStatus.Pending,
-                Ticket.updated_at <= cutoff_time
-            )
+            TicketSLA.pending_reminder_due_at <= datetime.utcnow(),
+            Ticket.status == TicketStatus.Pending
         )
-        .all()
     )
 
 
+def get_overdue_pending_tickets(db: Session):
+    return overdue_pending_query(db).all()
+
+
 @router.get("/pending-reminders")
 async def pending_ticket_reminders(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    cutoff_time = datetime.utcnow() - timedelta(hours=48)
-
-    query = db.query(Ticket).filter(
-        Ticket.status == TicketStatus.Pending,
-        Ticket.updated_at <= cutoff_time
-    )
+    query = overdue_pending_query(db)
 
     # advisers only see their tickets
     if current_user.role == Role.adviser:
@@ -131,10 +163,12 @@ from sqlalchemy import func, case
 async def adviser_ticket_stats(
     from_date: Optional[str] = Query(None),
     to_date: Optional[str] = Query(None),
+    language_id: Optional[int] = Query(None),
+    voc_id: Optional[int] = Query(None),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Get adviser wise ticket status counts"""
+    """Get adviser wise ticket status counts (summed from the daily rollups)"""
 
     # Only admin allowed
     if current_user.role != Role.admin:
@@ -143,32 +177,43 @@ async def adviser_ticket_stats(
             detail="Not authorized"
         )
 
+    def status_sum(status):
+        return func.sum(case((AdviserStatsDaily.status == status, AdviserStatsDaily.ticket_count), else_=0))
+
     query = (
         db.query(
             User.id.label("adviser_id"),
             User.name.label("adviser_name"),
 
-            func.count(case((Ticket.status == TicketStatus.Open, 1))).label("open_count"),
-            func.count(case((Ticket.status == TicketStatus.Pending, 1))).label("pending_count"),
-            func.count(case((Ticket.status == TicketStatus.Closed, 1))).label("closed_count"),
-            func.count(Ticket.id).label("total_count")
+            status_sum(TicketStatus.Open).label("open_count"),
+            status_sum(TicketStatus.Pending).label("pending_count"),
+            status_sum(TicketStatus.Closed).label("closed_count"),
+            func.sum(AdviserStatsDaily.ticket_count).label("total_count")
         )
-        .join(Ticket, Ticket.assigned_to == User.id)
+        .join(AdviserStatsDaily, AdviserStatsDaily.adviser_id == User.id)
         .filter(User.role == Role.adviser)
     )
 
+    # Buckets are days of Ticket.updated_at, so date filters stay exact
     if from_date:
         from_dt = datetime.strptime(from_date, "%Y-%m-%d")
-        query = query.filter(Ticket.updated_at >= from_dt)
+        query = query.filter(AdviserStatsDaily.day >= from_dt.date())
 
     if to_date:
-        # include full day
-        to_dt = datetime.strptime(to_date, "%Y-%m-%d") + timedelta(days=1)
-        query = query.filter(Ticket.updated_at < to_dt)
+        to_dt = datetime.strptime(to_date, "%Y-%m-%d")
+        query = query.filter(AdviserStatsDaily.day <= to_dt.date())
+
+    if language_id:
+        query = query.filter(AdviserStatsDaily.language_id == language_id)
+
+    if voc_id:
+        query = query.filter(AdviserStatsDaily.voc_id == voc_id)
 
     results = (
         query
         .group_by(User.id, User.name)
+        # Buckets emptied by moves stay behind with a zero count
+        .having(func.sum(AdviserStatsDaily.ticket_count) > 0)
         .order_by(User.name)
         .all()
     )
@@ -177,10 +222,10 @@ async def adviser_ticket_stats(
         {
             "adviser_id": r.adviser_id,
             "adviser_name": r.adviser_name,
-            "open": r.open_count,
-            "pending": r.pending_count,
-            "closed": r.closed_count,
-            "total": r.total_count
+            "open": int(r.open_count),
+            "pending": int(r.pending_count),
+            "closed": int(r.closed_count),
+            "total": int(r.total_count)
         }
         for r in results
     ]
@@ -189,6 +234,7 @@ async def adviser_ticket_stats(
 # Ticket listing with filters
 @router.get("/", response_model=TicketListResponse)
 async def list_tickets(
+    request: Request,
     status: Optional[str] = Query(None),
     priority_id: Optional[int] = Query(None),
     assigned_to: Optional[int] = Query(None),
@@ -200,222 +246,196 @@ async def list_tickets(
     sort_order: Optional[str] = Query(None),
     page: Optional[int] = Query(1),
     page_size: Optional[int] = Query(25),
+    count: Optional[str] = Query(count_cache.COUNT_EXACT, description="exact, estimate or none"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """List tickets with filtering and pagination"""
-    query = db.query(Ticket).options(
-        joinedload(Ticket.assigned_user),
-        joinedload(Ticket.language),
-        joinedload(Ticket.voc),
-        joinedload(Ticket.priority)
+    if count not in count_cache.COUNT_MODES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid count mode: {count}. Must be one of: {list(count_cache.COUNT_MODES)}"
+        )
+
+    # Polling clients get a 304 until any ticket changes
+    etag = etags.make_etag(
+        etags.TICKETS,
+        etags.get_version(db, etags.TICKETS),
+        current_user.id,
+        current_user.role,
+        sorted(request.query_params.multi_items())
     )
+    cached = etags.not_modified(request, etag)
+    if cached:
+        return cached
+
+    # Read only the needed columns from the denormalized projection
+    # (see services/ticket_list_view.py)
+    query = db.query(*TICKET_COLUMNS)
     
     # Apply filters
     if status:
         # Convert string to TicketStatus enum if valid
         try:
             status_enum = TicketStatus(status)
-            query = query.filter(Ticket.status == status_enum)
+            query = query.filter(TicketListView.status == status_enum)
         except ValueError:
             raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
+                status_code=400,
                 detail=f"Invalid status: {status}. Must be one of: {[s.value for s in TicketStatus]}"
             )
     
     if priority_id:
-        query = query.filter(Ticket.priority_id == priority_id)
+        query = query.filter(TicketListView.priority_id == priority_id)
     
     if assigned_to:
-        query = query.filter(Ticket.assigned_to == assigned_to)
+        query = query.filter(TicketListView.assigned_to == assigned_to)
     
     if unassigned:
-        query = query.filter(Ticket.assigned_to.is_(None))
-    
-    # if search:
-    #     search_filter = f"%{search}%"
-    #     query = query.filter(
-    #         (Ticket.subject.contains(search_filter)) |
-    #         (Ticket.customer_email.contains(search_filter))
-    #     )
+        query = query.filter(TicketListView.assigned_to.is_(None))
 
     if search:
         search = search.strip()
         search_filter = f"%{search}%"
 
-        query = query.outerjoin(
-            TicketMessage,
-            TicketMessage.ticket_id == Ticket.id
-        ).filter(
-            or_(
-                Ticket.subject.ilike(search_filter),
-                Ticket.customer_email.ilike(search_filter),
+        # EXISTS instead of a join so no DISTINCT is needed
+        body_match = (
+            db.query(TicketMessage.id)
+            .filter(
+                TicketMessage.ticket_id == TicketListView.ticket_id,
                 TicketMessage.body.ilike(search_filter)
             )
-        ).distinct()
+            .exists()
+        )
+        query = query.filter(
+            or_(
+                TicketListView.subject.ilike(search_filter),
+                TicketListView.customer_email.ilike(search_filter),
+                body_match
+            )
+        )
 
     if from_date:
         from_dt = datetime.strptime(from_date, "%Y-%m-%d")
-        query = query.filter(Ticket.created_at >= from_dt)
+        query = query.filter(TicketListView.created_at >= from_dt)
 
     if to_date:
         # include full day
         to_dt = datetime.strptime(to_date, "%Y-%m-%d") + timedelta(days=1)
-        query = query.filter(Ticket.created_at < to_dt)
+        query = query.filter(TicketListView.created_at < to_dt)
 
     # Advisers can only see their assigned tickets (unless admin)
     if current_user.role == Role.adviser and not search:
-        query = query.filter(Ticket.assigned_to == current_user.id)
+        query = query.filter(TicketListView.assigned_to == current_user.id)
+        scope = ("adviser", current_user.id)
         logger.info(
             f"Filtering tickets for adviser {current_user.id} (no search)"
         )
     else:
+        scope = ("global",)
         logger.info(
             f"Global ticket view for user {current_user.id} (role: {current_user.role}, search={search})"
         )
     
     # Order by updated_at desc (must be before pagination)
-    if sort_by:
-        if sort_by == "created_at":
-            column = Ticket.created_at
-        elif sort_by == "updated_at":
-            column = Ticket.updated_at
-        else:
-            column = Ticket.updated_at
-
-        if sort_order == "asc":
-            query = query.order_by(column.asc())
-        else:
-            query = query.order_by(column.desc())
+    if sort_by == "created_at":
+        column = TicketListView.created_at
+    else:
+        column = TicketListView.updated_at
+
+    if sort_by and sort_order == "asc":
+        query = query.order_by(column.asc())
     else:
-        query = query.order_by(Ticket.updated_at.desc())
+        query = query.order_by(column.desc())
     
-    # Get total count
-    total = query.count()
+    # Get total count (cached per filter set and scope, see services/count_cache.py)
+    count_key = count_cache.make_key(
+        {
+            "status": status,
+            "priority_id": priority_id,
+            "assigned_to": assigned_to,
+            "unassigned": unassigned,
+            "search": search,
+            "from_date": from_date,
+            "to_date": to_date,
+        },
+        scope
+    )
+    total, total_is_estimate = count_cache.count_query(
+        query, count_key, count, id_column=TicketListView.ticket_id
+    )
     
     # Apply pagination
     page, page_size = get_pagination_params(page, page_size)
     query = apply_pagination(query, page, page_size)
     
     # Execute query
-    tickets = query.all()
-    logger.info(f"Found {len(tickets)} tickets for user {current_user.id} (role: {current_user.role})")
-    
-    # Convert SQLAlchemy objects to dictionaries for Pydantic
-    ticket_dicts = []
-    for ticket in tickets:
-        ticket_dict = {
-            "id": ticket.id,
-            "customer_email": ticket.customer_email,
-            "customer_name": ticket.customer_name,
-            "subject": ticket.subject,
-            "status": ticket.status,
-            "assigned_to": ticket.assigned_to,
-            "language_id": ticket.language_id,
-            "voc_id": ticket.voc_id,
-            "priority_id": ticket.priority_id,
-            "created_at": ticket.created_at,
-            "updated_at": ticket.updated_at,
-            "assigned_user": {
-                "id": ticket.assigned_user.id,
-                "name": ticket.assigned_user.name,
-                "email": ticket.assigned_user.email,
-                "role": ticket.assigned_user.role.value if ticket.assigned_user.role else None
-            } if ticket.assigned_user else None,
-            "language": {
-                "id": ticket.language.id,
-                "name": ticket.language.name
-            } if ticket.language else None,
-            "voc": {
-                "id": ticket.voc.id,
-                "name": ticket.voc.name
-            } if ticket.voc else None,
-            "priority": {
-                "id": ticket.priority.id,
-                "name": ticket.priority.name,
-                "weight": ticket.priority.weight
-            } if ticket.priority else None
-        }
-        ticket_dicts.append(ticket_dict)
-    
-    return TicketListResponse(
-        tickets=ticket_dicts,
-        total=total,
-        page=page,
-        page_size=page_size
-    )
+    rows = query.all()
+    logger.info(f"Found {len(rows)} tickets for user {current_user.id} (role: {current_user.role})")
+    
+    # Rows are already in response shape, so skip response_model validation
+    response = FastJSONResponse({
+        "tickets": [serialize_ticket_row(row) for row in rows],
+        "total": total,
+        "page": page,
+        "page_size": page_size,
+        "total_is_estimate": total_is_estimate
+    })
+    return etags.set_headers(response, etag)
 
 # Get ticket detail
 @router.get("/{ticket_id}", response_model=TicketResponse)
 async def get_ticket(
     ticket_id: int,
+    request: Request,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Get ticket detail"""
-    ticket = db.query(Ticket).options(
-        joinedload(Ticket.assigned_user),
-        joinedload(Ticket.language),
-        joinedload(Ticket.voc),
-        joinedload(Ticket.priority)
-    ).filter(Ticket.id == ticket_id).first()
+    row = load_ticket_row(db, ticket_id)
     
-    if not ticket:
+    if not row:
         raise HTTPException(status_code=404, detail="Ticket not found")
     
     # Check access permissions
     # if (current_user.role == Role.adviser and
-    #     ticket.assigned_to != current_user.id):
+    #     row.assigned_to != current_user.id):
     #     raise HTTPException(status_code=403, detail="Access denied")
-    
-    # Convert SQLAlchemy object to dictionary for Pydantic
-    ticket_dict = {
-        "id": ticket.id,
-        "customer_email": ticket.customer_email,
-        "customer_name": ticket.customer_name,
-        "subject": ticket.subject,
-        "status": ticket.status,
-        "assigned_to": ticket.assigned_to,
-        "language_id": ticket.language_id,
-        "voc_id": ticket.voc_id,
-        "priority_id": ticket.priority_id,
-        "created_at": ticket.created_at,
-        "updated_at": ticket.updated_at,
-        "assigned_user": {
-            "id": ticket.assigned_user.id,
-            "name": ticket.assigned_user.name,
-            "email": ticket.assigned_user.email,
-            "role": ticket.assigned_user.role.value if ticket.assigned_user.role else None
-        } if ticket.assigned_user else None,
-        "language": {
-            "id": ticket.language.id,
-            "name": ticket.language.name
-        } if ticket.language else None,
-        "voc": {
-            "id": ticket.voc.id,
-            "name": ticket.voc.name
-        } if ticket.voc else None,
-        "priority": {
-            "id": ticket.priority.id,
-            "name": ticket.priority.name,
-            "weight": ticket.priority.weight
-        } if ticket.priority else None
-    }
-    
-    return ticket_dict
+
+    # The projection row is the whole response, so it is its own version
+    etag = etags.make_etag("ticket", tuple(row))
+    cached = etags.not_modified(request, etag)
+    if cached:
+        return cached
+
+    return etags.set_headers(FastJSONResponse(serialize_ticket_row(row)), etag)
+
+def query_thread(db: Session, ticket_id: int, mode: str):
+    """Ordered message query for a ticket; summary mode leaves out the body blobs"""
+    if mode == MESSAGES_SUMMARY:
+        query = db.query(*MESSAGE_SUMMARY_COLUMNS)
+    else:
+        query = db.query(TicketMessage)
+    return query.filter(TicketMessage.ticket_id == ticket_id).order_by(TicketMessage.sent_at)
+
 
 # Get ticket messages
 @router.get("/{ticket_id}/messages", response_model=List[MessageResponse])
 async def get_ticket_messages(
     ticket_id: int,
+    request: Request,
     page: Optional[int] = Query(1),
     page_size: Optional[int] = Query(50),
+    mode: Optional[str] = Query(MESSAGES_FULL, description="full or summary (snippets and sizes only)"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Get ticket message thread"""
+    if mode not in MESSAGE_MODES:
+        raise HTTPException(status_code=400, detail=f"Invalid mode: {mode}. Must be one of: {list(MESSAGE_MODES)}")
+
     # Check ticket access
-    ticket = db.query(Ticket).filter(Ticket.id == ticket_id).first()
+    ticket = db.query(Ticket.id).filter(Ticket.id == ticket_id).first()
     if not ticket:
         raise HTTPException(status_code=404, detail="Ticket not found")
     
@@ -423,34 +443,186 @@ async def get_ticket_messages(
     #     ticket.assigned_to != current_user.id):
     #     raise HTTPException(status_code=403, detail="Access denied")
     
-    # Get messages
-    query = db.query(TicketMessage).filter(TicketMessage.ticket_id == ticket_id)
-    
-    # Order by sent_at (must be before pagination)
-    query = query.order_by(TicketMessage.sent_at)
-    
     page, page_size = get_pagination_params(page, page_size)
-    query = apply_pagination(query, page, page_size)
-    
-    messages = query.all()
+
+    # Messages are append-only, so count and max id version the thread
+    message_count, last_message_id = (
+        db.query(func.count(TicketMessage.id), func.max(TicketMessage.id))
+        .filter(TicketMessage.ticket_id == ticket_id)
+        .one()
+    )
+    etag = etags.make_etag("messages", ticket_id, message_count, last_message_id, mode, page, page_size)
+    cached = etags.not_modified(request, etag)
+    if cached:
+        return cached
+
+    messages = apply_pagination(query_thread(db, ticket_id, mode), page, page_size).all()
     
-    # Convert SQLAlchemy objects to dictionaries for Pydantic
-    message_dicts = []
-    for message in messages:
-        message_dict = {
-            "id": message.id,
-            "direction": message.direction,
-            "from_email": message.from_email,
-            "to_email": message.to_email,
-            "subject": message.subject,
-            "body": message.body,
-            "attachments_json": message.attachments_json,
-            "sent_at": message.sent_at,
-            "created_by": message.created_by
+    if mode == MESSAGES_SUMMARY:
+        response = FastJSONResponse([serialize_message_summary(row) for row in messages])
+    else:
+        response = FastJSONResponse([serialize_message(message) for message in messages])
+    return etags.set_headers(response, etag)
+
+
+# Get full message bodies on demand
+@router.get("/{ticket_id}/messages/bodies")
+async def get_ticket_message_bodies(
+    ticket_id: int,
+    ids: List[int] = Query(..., description="Message ids, at most 50 per request"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Get full body and attachments of selected messages in a ticket thread"""
+    if len(ids) > MAX_BODY_BATCH:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BODY_BATCH} message ids per request")
+
+    rows = db.query(
+        TicketMessage.id,
+        TicketMessage.body,
+        TicketMessage.attachments_json
+    ).filter(
+        TicketMessage.ticket_id == ticket_id,
+        TicketMessage.id.in_(ids)
+    ).order_by(TicketMessage.sent_at).all()
+
+    return FastJSONResponse([
+        {"id": row.id, "body": row.body, "attachments_json": row.attachments_json}
+        for row in rows
+    ])
+
+# Ticket workspace (everything TicketView needs in one round trip)
+@router.get("/{ticket_id}/workspace")
+async def get_ticket_workspace(
+    ticket_id: int,
+    request: Request,
+    messages_page: Optional[int] = Query(1),
+    messages_page_size: Optional[int] = Query(50),
+    messages_mode: Optional[str] = Query(MESSAGES_FULL, description="full or summary"),
+    notes_page: Optional[int] = Query(1),
+    notes_page_size: Optional[int] = Query(25),
+    events_page: Optional[int] = Query(1),
+    events_page_size: Optional[int] = Query(25),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Get ticket, paged messages, notes and status events, feedback and
+    reference data ids in a fixed number of queries. Notes and events
+    report has_more (one extra row per page) instead of a total.
+    """
+    if messages_mode not in MESSAGE_MODES:
+        raise HTTPException(status_code=400, detail=f"Invalid mode: {messages_mode}. Must be one of: {list(MESSAGE_MODES)}")
+
+    messages_page, messages_page_size = get_pagination_params(messages_page, messages_page_size)
+    notes_page, notes_page_size = get_pagination_params(notes_page, notes_page_size)
+    events_page, events_page_size = get_pagination_params(events_page, events_page_size)
+
+    # Every section is covered by one of these counters (notes and feedback
+    # bump tickets); the caller is part of the tag since notes depend on it
+    etag = etags.make_etag(
+        "workspace", ticket_id,
+        etags.get_versions(db, (etags.TICKETS, etags.TICKET_EVENTS, etags.CATEGORIES, etags.TEMPLATES)),
+        current_user.id, current_user.role.value,
+        messages_mode, messages_page, messages_page_size,
+        notes_page, notes_page_size, events_page, events_page_size,
+    )
+    cached = etags.not_modified(request, etag)
+    if cached:
+        return cached
+
+    ticket = (
+        db.query(Ticket)
+        .options(selectinload(Ticket.feedback))
+        .filter(Ticket.id == ticket_id)
+        .first()
+    )
+    row = load_ticket_row(db, ticket_id) if ticket else None
+    if not row:
+        raise HTTPException(status_code=404, detail="Ticket not found")
+
+    # Messages (total comes from the projection, no extra count)
+    messages = apply_pagination(
+        query_thread(db, ticket_id, messages_mode),
+        messages_page, messages_page_size
+    ).all()
+    serialize = serialize_message_summary if messages_mode == MESSAGES_SUMMARY else serialize_message
+
+    # Notes follow the same access rule as /ticket-notes
+    notes_section = None
+    if current_user.role != Role.adviser or ticket.assigned_to == current_user.id:
+        notes, notes_more = fetch_page(
+            db.query(TicketNote)
+            .options(selectinload(TicketNote.user))
+            .filter(TicketNote.ticket_id == ticket_id)
+            .order_by(TicketNote.created_at.desc(), TicketNote.id.desc()),
+            notes_page, notes_page_size
+        )
+        notes_section = {
+            "items": [serialize_note(note) for note in notes],
+            "has_more": notes_more,
+            "page": notes_page,
+            "page_size": notes_page_size
         }
-        message_dicts.append(message_dict)
-    
-    return message_dicts
+
+    events, events_more = fetch_page(
+        db.query(TicketEvent)
+        .filter(TicketEvent.ticket_id == ticket_id)
+        .order_by(TicketEvent.created_at.desc(), TicketEvent.id.desc()),
+        events_page, events_page_size
+    )
+
+    feedback = ticket.feedback
+
+    # Reference data ids so the client can tell whether its cached lists are current
+    reference = {"language_ids": [], "voc_ids": [], "priority_ids": [], "template_ids": []}
+    reference_ids = (
+        db.query(literal("language_ids").label("kind"), CategoryLanguage.id.label("id"))
+        .filter(CategoryLanguage.is_active.is_(True))
+        .union_all(
+            db.query(literal("voc_ids"), CategoryVOC.id).filter(CategoryVOC.is_active.is_(True)),
+            db.query(literal("priority_ids"), CategoryPriority.id).filter(CategoryPriority.is_active.is_(True)),
+            db.query(literal("template_ids"), EmailTemplate.id)
+        )
+    )
+    for kind, ref_id in reference_ids:
+        reference[kind].append(ref_id)
+
+    response = FastJSONResponse({
+        "ticket": serialize_ticket_row(row),
+        "messages": {
+            "items": [serialize(message) for message in messages],
+            "total": row.message_count,
+            "has_more": messages_page * messages_page_size < row.message_count,
+            "page": messages_page,
+            "page_size": messages_page_size
+        },
+        "notes": notes_section,
+        "events": {
+            "items": [
+                {
+                    "id": event.id,
+                    "event_type": event.event_type,
+                    "old_value": event.old_value,
+                    "new_value": event.new_value,
+                    "created_at": event.created_at
+                }
+                for event in events
+            ],
+            "has_more": events_more,
+            "page": events_page,
+            "page_size": events_page_size
+        },
+        "feedback": {
+            "support_rating": feedback.support_rating,
+            "delivery_rating": feedback.delivery_rating,
+            "product_rating": feedback.product_rating,
+            "submitted_at": feedback.submitted_at,
+            "created_at": feedback.created_at
+        } if feedback else None,
+        "reference": reference
+    })
+    return etags.set_headers(response, etag)
 
 # Update ticket
 @router.patch("/{ticket_id}", response_model=TicketResponse)
@@ -493,76 +665,25 @@ async def update_ticket(
 
     # Send feedback if status changed to closed
     if ticket.status == TicketStatus.Closed and not was_closed:
-        create_and_send_feedback(db, ticket)
-    
-    # Reload with relationships
-    ticket = db.query(Ticket).options(
-        joinedload(Ticket.assigned_user),
-        joinedload(Ticket.language),
-        joinedload(Ticket.voc),
-        joinedload(Ticket.priority)
-    ).filter(Ticket.id == ticket_id).first()
-    
-    # Convert SQLAlchemy object to dictionary for Pydantic
-    ticket_dict = {
-        "id": ticket.id,
-        "customer_email": ticket.customer_email,
-        "customer_name": ticket.customer_name,
-        "subject": ticket.subject,
-        "status": ticket.status,
-        "assigned_to": ticket.assigned_to,
-        "language_id": ticket.language_id,
-        "voc_id": ticket.voc_id,
-        "priority_id": ticket.priority_id,
-        "created_at": ticket.created_at,
-        "updated_at": ticket.updated_at,
-        "assigned_user": {
-            "id": ticket.assigned_user.id,
-            "name": ticket.assigned_user.name,
-            "email": ticket.assigned_user.email,
-            "role": ticket.assigned_user.role.value if ticket.assigned_user.role else None
-        } if ticket.assigned_user else None,
-        "language": {
-            "id": ticket.language.id,
-            "name": ticket.language.name
-        } if ticket.language else None,
-        "voc": {
-            "id": ticket.voc.id,
-            "name": ticket.voc.name
-        } if ticket.voc else None,
-        "priority": {
-            "id": ticket.priority.id,
-            "name": ticket.priority.name,
-            "weight": ticket.priority.weight
-        } if ticket.priority else None
-    }
+        await create_and_send_feedback_async(db, ticket)
     
-    return ticket_dict
-
-# Reply to ticket
-@router.post("/{ticket_id}/reply")
-async def reply_to_ticket(
-    ticket_id: int,
-    text: str = Form(...),
-    template_id: Optional[int] = Form(None),
-    close_after: Optional[bool] = Form(False),
-    attachments: List[UploadFile] = File(None),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
-):
+    return FastJSONResponse(serialize_ticket_row(load_ticket_row(db, ticket_id)))
 
-    reply_data = TicketReply(text=text, template_id=template_id, close_after=close_after)
+# Reply pipeline. The handler stays async but every blocking step runs off
+# the event loop: DB work and attachment writes on the request threadpool,
+# SMTP on the mailer's own bounded pool.
 
-    """Reply to ticket (adviser only)"""
+def _prepare_reply(db: Session, ticket_id: int, reply_data: TicketReply, current_user: User) -> dict:
+    """Validate the ticket and build subject, body and threading headers"""
     ticket = db.query(Ticket).filter(Ticket.id == ticket_id).first()
     if not ticket:
         raise HTTPException(status_code=404, detail="Ticket not found")
-    
+
     # Check permissions
     # if current_user.role == Role.adviser:
     #     if ticket.assigned_to != current_user.id:
     #         raise HTTPException(status_code=403, detail="Can only reply to assigned tickets")
-    
+
     # Rule: Cannot reply without tags (priority, language, VOC)
     missing_tags = []
     if not ticket.priority_id:
@@ -571,120 +692,116 @@ async def reply_to_ticket(
         missing_tags.append("Language")
     if not ticket.voc_id:
         missing_tags.append("VOC")
-    
+
     if missing_tags:
         raise HTTPException(
             status_code=400,
             detail=f"Cannot reply without tags. Please set: {', '.join(missing_tags)}"
         )
-    
-    # Get template if specified and replace variables
-    subject = f"[TKT-{ticket_id}] {ticket.subject}"
-    body = reply_data.text
-    
-    if reply_data.template_id:
-        template = db.query(EmailTemplate).filter(EmailTemplate.id == reply_data.template_id).first()
-        if template:
-            # Start with template body
-            body = template.body
-            
-            # Replace all template variables
-            body = body.replace("{ticket_id}", str(ticket_id))
-            body = body.replace("{TICKET_ID}", str(ticket_id))
-            body = body.replace("{customer_name}", ticket.customer_name or ticket.customer_email.split('@')[0])
-            body = body.replace("{CUSTOMER_NAME}", ticket.customer_name or ticket.customer_email.split('@')[0])
-            body = body.replace("{subject}", ticket.subject)
-            body = body.replace("{SUBJECT}", ticket.subject)
-            body = body.replace("{adviser_name}", current_user.name)
-            body = body.replace("{ADVISER_NAME}", current_user.name)
-            body = body.replace("{customer_email}", ticket.customer_email)
-            body = body.replace("{CUSTOMER_EMAIL}", ticket.customer_email)
-    else:
-        # If no template, still replace variables in the text
-        body = body.replace("{ticket_id}", str(ticket_id))
-        body = body.replace("{TICKET_ID}", str(ticket_id))
-        body = body.replace("{customer_name}", ticket.customer_name or ticket.customer_email.split('@')[0])
-        body = body.replace("{CUSTOMER_NAME}", ticket.customer_name or ticket.customer_email.split('@')[0])
-        body = body.replace("{subject}", ticket.subject)
-        body = body.replace("{SUBJECT}", ticket.subject)
-        body = body.replace("{adviser_name}", current_user.name)
-        body = body.replace("{ADVISER_NAME}", current_user.name)
-    
+
+    # Template body if one is given, otherwise the adviser's text; both are rendered
+    compiled = templating.get_template(db, reply_data.template_id) if reply_data.template_id else None
+    # One-off reply text is parsed uncached, keeping the cache for stored templates
+    body = compiled[1] if compiled else templating.CompiledTemplate(reply_data.text or "")
+
     # Determine in_reply_to from last message
-    last_message = db.query(TicketMessage).filter(
-        TicketMessage.ticket_id == ticket_id
-    ).order_by(TicketMessage.sent_at.desc()).first()
-    
-    in_reply_to = None
-    if last_message and last_message.smtp_message_id:
-        in_reply_to = last_message.smtp_message_id
-    
-    # Send email
-    message_id = send_mail(
-        to_email=ticket.customer_email,
-        subject=subject,
-        body=body,
-        attachments=attachments,
-        in_reply_to=in_reply_to
+    last_message_id = (
+        db.query(TicketMessage.smtp_message_id)
+        .filter(TicketMessage.ticket_id == ticket_id)
+        .order_by(TicketMessage.sent_at.desc())
+        .limit(1)
+        .scalar()
     )
-    
-    if not message_id:
-        raise HTTPException(status_code=500, detail="Failed to send email")
-    
+
+    return {
+        "to_email": ticket.customer_email,
+        "subject": f"[TKT-{ticket_id}] {ticket.subject}",
+        "body": body.render(templating.ticket_variables(ticket, current_user)),
+        "in_reply_to": last_message_id or None,
+    }
+
+
+def _discard_reply_attachments(db: Session, ticket_id: int, created: List[str]) -> None:
+    """
+    Remove the files written for a reply that was not sent. Files are
+    deduplicated by content within the ticket's directory, so a file a
+    concurrent reply has stored a message for is kept.
+    """
+    if not created:
+        return
+
+    referenced = set()
+    for (attachments_json,) in db.query(TicketMessage.attachments_json).filter(
+        TicketMessage.ticket_id == ticket_id,
+        TicketMessage.attachments_json.isnot(None)
+    ):
+        referenced.update(info.get("file_path") for info in json.loads(attachments_json))
+
+    AttachmentHandler(settings.ATTACHMENTS_ROOT).remove_files(
+        [path for path in created if path not in referenced]
+    )
+
+
+def _save_reply_attachments(db: Session, ticket_id: int, attachments: Optional[List[UploadFile]]) -> tuple:
+    """Stream uploads to disk. Returns (attachment metadata, paths of newly written files)."""
+    saved_attachments = []
+    created = []
+    if not attachments:
+        return saved_attachments, created
+
+    handler = AttachmentHandler(settings.ATTACHMENTS_ROOT)
+    try:
+        for file in attachments:
+            info, is_new = handler.save_upload(file, f"msg_{ticket_id}", MAX_ATTACHMENT_SIZE)
+            saved_attachments.append(info)
+            if is_new:
+                created.append(info["file_path"])
+    except ValueError as e:
+        _discard_reply_attachments(db, ticket_id, created)
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return saved_attachments, created
+
+
+def _record_reply(
+    db: Session,
+    ticket_id: int,
+    reply_data: TicketReply,
+    current_user: User,
+    prepared: dict,
+    message_id: str,
+    saved_attachments: list
+) -> Optional[dict]:
+    """Store the sent message and apply status rules; returns the feedback mail to send when closing"""
+    ticket = db.query(Ticket).filter(Ticket.id == ticket_id).first()
+
     # Rule: If ticket is closed and has previous reply, reopen it when replying again
     should_reopen = False
     if ticket.status == TicketStatus.Closed:
         # Check if ticket has any previous outbound messages (replies)
-        has_previous_reply = db.query(TicketMessage).filter(
+        has_previous_reply = db.query(TicketMessage.id).filter(
             TicketMessage.ticket_id == ticket_id,
             TicketMessage.direction == MsgDir.outbound
         ).first()
-        
+
         if has_previous_reply:
             # Reopen ticket when replying to a closed ticket
             should_reopen = True
 
-
-    saved_attachments = []
-    if attachments:
-        handler = AttachmentHandler(settings.ATTACHMENTS_ROOT)
-
-        msg_dir = f"msg_{ticket_id}"
-        dir_path = handler.attachment_dir / msg_dir
-        dir_path.mkdir(parents=True, exist_ok=True)
-
-        for file in attachments:
-            raw = await file.read()
-            await file.seek(0)
-
-            safe = handler._sanitize_filename(file.filename)
-            file_path = dir_path / safe
-
-            with open(file_path, "wb") as f:
-                f.write(raw)
-
-            saved_attachments.append({
-                "filename": file.filename,
-                "mime_type": file.content_type,
-                "file_path": f"{msg_dir}/{safe}",
-                "size": file_path.stat().st_size
-            })
-
-    
     # Create outbound message record
     outbound_message = TicketMessage(
         ticket_id=ticket_id,
         direction=MsgDir.outbound,
         from_email=current_user.email,
-        to_email=ticket.customer_email,
-        subject=subject,
-        body=body,
+        to_email=prepared["to_email"],
+        subject=prepared["subject"],
+        body=prepared["body"],
         smtp_message_id=message_id,
-        in_reply_to=in_reply_to,
+        in_reply_to=prepared["in_reply_to"],
         created_by=current_user.id,
         attachments_json=json.dumps(saved_attachments)
     )
-    
+
     db.add(outbound_message)
 
     # Close ticket if explicitly requested via close_after flag
@@ -703,20 +820,58 @@ async def reply_to_ticket(
             new_value=TicketStatus.Open.value
         ))
 
-
     if reply_data.close_after:
         ticket.status = TicketStatus.Closed
-    
+
     # Update ticket timestamp
     ticket.updated_at = datetime.utcnow()
-    
+
     db.commit()
 
     if reply_data.close_after and not was_closed:
-        create_and_send_feedback(db, ticket)
-    
-    return {"message": "Reply sent successfully", "message_id": message_id}
+        return create_feedback(db, ticket)
+    return None
+
+
+# Reply to ticket
+@router.post("/{ticket_id}/reply")
+async def reply_to_ticket(
+    ticket_id: int,
+    text: str = Form(...),
+    template_id: Optional[int] = Form(None),
+    close_after: Optional[bool] = Form(False),
+    attachments: List[UploadFile] = File(None),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Reply to ticket (adviser only)"""
+    reply_data = TicketReply(text=text, template_id=template_id, close_after=close_after)
 
+    prepared = await run_in_threadpool(_prepare_reply, db, ticket_id, reply_data, current_user)
+
+    # Uploads go to disk first; the mail is encoded from those files
+    saved_attachments, created = await run_in_threadpool(_save_reply_attachments, db, ticket_id, attachments)
+
+    # Send email
+    message_id = await send_mail_async(
+        to_email=prepared["to_email"],
+        subject=prepared["subject"],
+        body=prepared["body"],
+        attachments=saved_attachments,
+        in_reply_to=prepared["in_reply_to"]
+    )
+
+    if not message_id:
+        await run_in_threadpool(_discard_reply_attachments, db, ticket_id, created)
+        raise HTTPException(status_code=500, detail="Failed to send email")
+
+    feedback_mail = await run_in_threadpool(
+        _record_reply, db, ticket_id, reply_data, current_user, prepared, message_id, saved_attachments
+    )
+    if feedback_mail:
+        await send_mail_async(**feedback_mail)
+
+    return {"message": "Reply sent successfully", "message_id": message_id}
 
 
 class ReassignRequest(BaseModel):
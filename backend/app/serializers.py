@@ -0,0 +1,165 @@
+import json
+from datetime import date, datetime
+from enum import Enum
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+from .models import TicketListView, TicketMessage
+
+try:
+    import orjson
+except ImportError:  # optional, falls back to the standard json module
+    orjson = None
+
+
+# Columns selected for ticket responses. Selecting these directly returns
+# plain row tuples instead of hydrated ORM objects.
+TICKET_COLUMNS = (
+    TicketListView.ticket_id,
+    TicketListView.customer_email,
+    TicketListView.customer_name,
+    TicketListView.subject,
+    TicketListView.status,
+    TicketListView.assigned_to,
+    TicketListView.assigned_user_name,
+    TicketListView.assigned_user_email,
+    TicketListView.assigned_user_role,
+    TicketListView.language_id,
+    TicketListView.language_name,
+    TicketListView.voc_id,
+    TicketListView.voc_name,
+    TicketListView.priority_id,
+    TicketListView.priority_name,
+    TicketListView.priority_weight,
+    TicketListView.message_count,
+    TicketListView.last_message_snippet,
+    TicketListView.last_message_at,
+    TicketListView.last_inbound_at,
+    TicketListView.created_at,
+    TicketListView.updated_at,
+)
+
+
+def serialize_ticket_row(row) -> dict:
+    """Build a TicketResponse-shaped dict from a TICKET_COLUMNS row"""
+    return {
+        "id": row.ticket_id,
+        "customer_email": row.customer_email,
+        "customer_name": row.customer_name,
+        "subject": row.subject,
+        "status": row.status,
+        "assigned_to": row.assigned_to,
+        "language_id": row.language_id,
+        "voc_id": row.voc_id,
+        "priority_id": row.priority_id,
+        "created_at": row.created_at,
+        "updated_at": row.updated_at,
+        "assigned_user": {
+            "id": row.assigned_to,
+            "name": row.assigned_user_name,
+            "email": row.assigned_user_email,
+            "role": row.assigned_user_role.value if row.assigned_user_role else None
+        } if row.assigned_user_name is not None else None,
+        "language": {
+            "id": row.language_id,
+            "name": row.language_name
+        } if row.language_name is not None else None,
+        "voc": {
+            "id": row.voc_id,
+            "name": row.voc_name
+        } if row.voc_name is not None else None,
+        "priority": {
+            "id": row.priority_id,
+            "name": row.priority_name,
+            "weight": row.priority_weight
+        } if row.priority_name is not None else None,
+        "message_count": row.message_count,
+        "last_message_snippet": row.last_message_snippet,
+        "last_message_at": row.last_message_at,
+        "last_inbound_at": row.last_inbound_at
+    }
+
+
+def _json_default(value: Any):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response for content that is already in response shape.
+    Skips FastAPI's response_model validation (the handler returns the
+    Response directly) and uses orjson when it is installed.
+    """
+
+    def render(self, content: Any) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(content, default=_json_default)
+        return json.dumps(
+            content,
+            default=_json_default,
+            ensure_ascii=False,
+            separators=(",", ":"),
+        ).encode("utf-8")
+
+
+def serialize_message(message) -> dict:
+    """Build a MessageResponse-shaped dict from a TicketMessage"""
+    return {
+        "id": message.id,
+        "direction": message.direction,
+        "from_email": message.from_email,
+        "to_email": message.to_email,
+        "subject": message.subject,
+        "body": message.body,
+        "attachments_json": message.attachments_json,
+        "sent_at": message.sent_at,
+        "created_by": message.created_by
+    }
+
+
+# Thread listing columns without the body/attachments blobs
+MESSAGE_SUMMARY_COLUMNS = (
+    TicketMessage.id,
+    TicketMessage.direction,
+    TicketMessage.from_email,
+    TicketMessage.to_email,
+    TicketMessage.subject,
+    TicketMessage.snippet,
+    TicketMessage.body_size,
+    TicketMessage.attachment_count,
+    TicketMessage.sent_at,
+    TicketMessage.created_by,
+)
+
+
+def serialize_message_summary(row) -> dict:
+    """Build a collapsed-message dict from a MESSAGE_SUMMARY_COLUMNS row"""
+    return {
+        "id": row.id,
+        "direction": row.direction,
+        "from_email": row.from_email,
+        "to_email": row.to_email,
+        "subject": row.subject,
+        "snippet": row.snippet,
+        "body_size": row.body_size,
+        "attachment_count": row.attachment_count,
+        "sent_at": row.sent_at,
+        "created_by": row.created_by
+    }
+
+
+def serialize_note(note) -> dict:
+    """Build a TicketNoteResponse-shaped dict, plus the author's name when loaded"""
+    return {
+        "id": note.id,
+        "ticket_id": note.ticket_id,
+        "user_id": note.user_id,
+        "user_name": note.user.name if note.user else None,
+        "note": note.note,
+        "created_at": note.created_at
+    }
@@ -0,0 +1,229 @@
+"""
+Adviser statistics rollups.
+
+adviser_stats_daily holds ticket counts per (day of last update, adviser,
+status, language, VOC). Every assigned ticket is counted in exactly one
+bucket; adviser_stats_tickets remembers which, so a change moves the
+ticket with a -1 / +1 pair instead of recounting. The flush hook and
+the bulk paths only stage the changed ticket ids; the tickets are moved
+after commit in a short transaction of their own, so writers never hold
+the shared daily rows for the length of their transaction. The stats
+endpoint only sums pre-aggregated rows.
+"""
+import logging
+from collections import Counter
+from typing import Dict, Iterable, Tuple
+
+from sqlalchemy import bindparam, delete, event, func, insert, select, tuple_, update
+from sqlalchemy.orm import Session
+
+from ..models import AdviserStatsDaily, AdviserStatsTicket, Ticket
+
+logger = logging.getLogger(__name__)
+
+KEY_COLUMNS = ("day", "adviser_id", "status", "language_id", "voc_id")
+
+# session.info key of the tickets to move once the session commits
+_PENDING_KEY = "pending_adviser_stats_tickets"
+
+
+def _key(row) -> Tuple:
+    return (
+        row.updated_at.date(),
+        row.assigned_to,
+        row.status,
+        row.language_id or 0,
+        row.voc_id or 0,
+    )
+
+
+def _add_counts(connection, deltas: Dict[Tuple, int]) -> None:
+    """Add deltas to the daily buckets, creating missing ones"""
+    # Same lock order in every transaction
+    rows = [dict(zip(KEY_COLUMNS, key), ticket_count=delta) for key, delta in sorted(deltas.items()) if delta]
+    if not rows:
+        return
+
+    if connection.dialect.name == "mysql":
+        from sqlalchemy.dialects.mysql import insert as mysql_insert
+
+        stmt = mysql_insert(AdviserStatsDaily)
+        stmt = stmt.on_duplicate_key_update(
+            ticket_count=AdviserStatsDaily.ticket_count + stmt.inserted.ticket_count
+        )
+        connection.execute(stmt, rows)
+        return
+
+    key_columns = [getattr(AdviserStatsDaily, name) for name in KEY_COLUMNS]
+    existing = set(connection.execute(
+        select(*key_columns).where(tuple_(*key_columns).in_([
+            tuple(row[name] for name in KEY_COLUMNS) for row in rows
+        ]))
+    ).all())
+
+    updates = [row for row in rows if tuple(row[name] for name in KEY_COLUMNS) in existing]
+    inserts = [row for row in rows if tuple(row[name] for name in KEY_COLUMNS) not in existing]
+
+    if updates:
+        connection.execute(
+            update(AdviserStatsDaily)
+            .where(*[column == bindparam(f"b_{name}") for name, column in zip(KEY_COLUMNS, key_columns)])
+            .values(ticket_count=AdviserStatsDaily.ticket_count + bindparam("b_ticket_count")),
+            [{f"b_{name}": value for name, value in row.items()} for row in updates]
+        )
+    if inserts:
+        connection.execute(insert(AdviserStatsDaily), inserts)
+
+
+def apply_tickets(connection, ticket_ids: Iterable[int]) -> None:
+    """Move the given tickets to their current buckets on `connection`"""
+    ticket_ids = sorted({tid for tid in ticket_ids if tid is not None})
+    if not ticket_ids:
+        return
+
+    # Lock the tickets' buckets so two processes can't move the same ticket twice
+    old_keys = {
+        row.ticket_id: tuple(getattr(row, name) for name in KEY_COLUMNS)
+        for row in connection.execute(
+            select(AdviserStatsTicket)
+            .where(AdviserStatsTicket.ticket_id.in_(ticket_ids))
+            .order_by(AdviserStatsTicket.ticket_id)
+            .with_for_update()
+        ).all()
+    }
+    new_keys = {
+        row.id: _key(row)
+        for row in connection.execute(
+            select(
+                Ticket.id, Ticket.updated_at, Ticket.assigned_to,
+                Ticket.status, Ticket.language_id, Ticket.voc_id
+            )
+            .where(
+                Ticket.id.in_(ticket_ids),
+                Ticket.assigned_to.isnot(None),
+                Ticket.updated_at.isnot(None)
+            )
+        ).all()
+    }
+
+    deltas: Counter = Counter()
+    removed, moved, added = [], [], []
+    for ticket_id in ticket_ids:
+        old, new = old_keys.get(ticket_id), new_keys.get(ticket_id)
+        if old == new:
+            continue
+        if old is not None:
+            deltas[old] -= 1
+        if new is not None:
+            deltas[new] += 1
+
+        if new is None:
+            removed.append(ticket_id)
+        elif old is None:
+            added.append({"ticket_id": ticket_id, **dict(zip(KEY_COLUMNS, new))})
+        else:
+            moved.append({"b_ticket_id": ticket_id, **{f"b_{k}": v for k, v in zip(KEY_COLUMNS, new)}})
+
+    if not deltas:
+        return
+
+    if removed:
+        connection.execute(delete(AdviserStatsTicket).where(AdviserStatsTicket.ticket_id.in_(removed)))
+    if moved:
+        connection.execute(
+            update(AdviserStatsTicket)
+            .where(AdviserStatsTicket.ticket_id == bindparam("b_ticket_id"))
+            .values({name: bindparam(f"b_{name}") for name in KEY_COLUMNS}),
+            moved
+        )
+    if added:
+        connection.execute(insert(AdviserStatsTicket), added)
+
+    _add_counts(connection, deltas)
+
+
+def stage(session: Session, ticket_ids: Iterable[int]) -> None:
+    """Move the given tickets to their current buckets after `session` commits"""
+    session.info.setdefault(_PENDING_KEY, set()).update(ticket_ids)
+
+
+def rebuild_all(db: Session) -> int:
+    """Recompute both rollup tables from tickets with set-based INSERT ... SELECTs"""
+    db.execute(delete(AdviserStatsDaily))
+    db.execute(delete(AdviserStatsTicket))
+
+    db.execute(
+        insert(AdviserStatsTicket).from_select(
+            ["ticket_id", *KEY_COLUMNS],
+            select(
+                Ticket.id,
+                func.date(Ticket.updated_at),
+                Ticket.assigned_to,
+                Ticket.status,
+                func.coalesce(Ticket.language_id, 0),
+                func.coalesce(Ticket.voc_id, 0),
+            ).where(Ticket.assigned_to.isnot(None), Ticket.updated_at.isnot(None))
+        )
+    )
+
+    key_columns = [getattr(AdviserStatsTicket, name) for name in KEY_COLUMNS]
+    db.execute(
+        insert(AdviserStatsDaily).from_select(
+            [*KEY_COLUMNS, "ticket_count"],
+            select(*key_columns, func.count()).group_by(*key_columns)
+        )
+    )
+    db.commit()
+
+    total = db.query(func.count(AdviserStatsTicket.ticket_id)).scalar()
+    logger.info(f"Adviser stats rebuilt for {total} tickets")
+    return total
+
+
+def ensure_populated(db: Session) -> None:
+    """Backfill the rollups if they are empty but assigned tickets exist"""
+    has_rows = db.query(AdviserStatsTicket.ticket_id).limit(1).first()
+    has_tickets = db.query(Ticket.id).filter(Ticket.assigned_to.isnot(None)).limit(1).first()
+    if has_tickets and not has_rows:
+        logger.info("Adviser stats rollups are empty, rebuilding from tickets")
+        rebuild_all(db)
+
+
+@event.listens_for(Session, "after_flush")
+def _stage_adviser_stats(session, flush_context):
+    ticket_ids = {obj.id for obj in session.new | session.deleted if isinstance(obj, Ticket)}
+    ticket_ids.update(
+        obj.id for obj in session.dirty
+        if isinstance(obj, Ticket) and session.is_modified(obj, include_collections=False)
+    )
+    if ticket_ids:
+        stage(session, ticket_ids)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_adviser_stats(session):
+    ticket_ids = session.info.pop(_PENDING_KEY, None)
+    if not ticket_ids:
+        return
+    try:
+        with session.get_bind().begin() as connection:
+            apply_tickets(connection, ticket_ids)
+    except Exception as e:
+        logger.error(f"Could not update adviser stats for {len(ticket_ids)} tickets "
+                     f"(run python -m app.services.adviser_stats to rebuild): {str(e)}")
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_adviser_stats(session):
+    session.info.pop(_PENDING_KEY, None)
+
+
+if __name__ == "__main__":
+    from ..db import SessionLocal
+
+    db = SessionLocal()
+    try:
+        total = rebuild_all(db)
+        print("Adviser stats rebuilt for", total, "tickets")
+    finally:
+        db.close()
@@ -0,0 +1,222 @@
+"""
+Minimal asyncio SMTP client.
+
+Speaks just what the mailer needs (EHLO/HELO, STARTTLS, AUTH PLAIN/LOGIN,
+MAIL/RCPT/DATA, NOOP, RSET, QUIT) over asyncio streams, so API handlers can
+send mail without a thread per SMTP conversation. Failures raise the same
+smtplib exception classes as the blocking client, so both transports are
+handled alike by callers and the connection pool.
+"""
+import asyncio
+import base64
+import hmac
+import smtplib
+import socket
+import ssl
+from typing import AsyncIterable, Dict, Optional, Tuple
+
+from .smtp_pool import DISCONNECT_ERRORS, SMTPDataInterrupted
+
+SMTP_LINE_LIMIT = 8192
+
+
+class AsyncSMTP:
+    def __init__(self, host: str, port: int, timeout: float = 30, local_hostname: Optional[str] = None):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.local_hostname = local_hostname or socket.getfqdn()
+        self.esmtp_features: Dict[str, str] = {}
+        self.does_esmtp = False
+        self._helo_done = False
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+
+    async def connect(self) -> Tuple[int, bytes]:
+        self._reader, self._writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port, limit=SMTP_LINE_LIMIT), self.timeout
+        )
+        code, msg = await self.getreply()
+        if code != 220:
+            self.close()
+            raise smtplib.SMTPConnectError(code, msg)
+        return code, msg
+
+    async def send(self, data: bytes) -> None:
+        if self._writer is None:
+            raise smtplib.SMTPServerDisconnected("please run connect() first")
+        try:
+            self._writer.write(data)
+            await asyncio.wait_for(self._writer.drain(), self.timeout)
+        except (ConnectionError, OSError) as e:
+            self.close()
+            raise smtplib.SMTPServerDisconnected(f"Server not connected: {e}")
+
+    async def getreply(self) -> Tuple[int, bytes]:
+        """Read a (possibly multi-line) reply, like smtplib.SMTP.getreply"""
+        if self._reader is None:
+            raise smtplib.SMTPServerDisconnected("please run connect() first")
+
+        lines = []
+        code = -1
+        while True:
+            try:
+                line = await asyncio.wait_for(self._reader.readline(), self.timeout)
+            except (ConnectionError, OSError, ValueError) as e:
+                self.close()
+                raise smtplib.SMTPServerDisconnected(f"Connection unexpectedly closed: {e}")
+            if not line:
+                self.close()
+                raise smtplib.SMTPServerDisconnected("Connection unexpectedly closed")
+
+            lines.append(line[4:].strip(b" \t\r\n"))
+            try:
+                code = int(line[:3])
+            except ValueError:
+                code = -1
+                break
+            if line[3:4] != b"-":
+                break
+        return code, b"\n".join(lines)
+
+    async def docmd(self, cmd: str, args: str = "") -> Tuple[int, bytes]:
+        line = f"{cmd} {args}".strip() if args else cmd
+        await self.send(line.encode("ascii") + b"\r\n")
+        return await self.getreply()
+
+    async def helo(self) -> Tuple[int, bytes]:
+        code, msg = await self.docmd("helo", self.local_hostname)
+        self._helo_done = code == 250
+        return code, msg
+
+    async def ehlo(self) -> Tuple[int, bytes]:
+        self.esmtp_features = {}
+        code, msg = await self.docmd("ehlo", self.local_hostname)
+        if code != 250:
+            return code, msg
+
+        self.does_esmtp = True
+        self._helo_done = True
+        for line in msg.decode("latin-1").split("\n")[1:]:
+            feature, _, params = line.partition(" ")
+            self.esmtp_features[feature.lower()] = params.strip()
+        return code, msg
+
+    async def ehlo_or_helo_if_needed(self) -> None:
+        if self._helo_done:
+            return
+        code, msg = await self.ehlo()
+        if code != 250:
+            code, msg = await self.helo()
+            if code != 250:
+                raise smtplib.SMTPHeloError(code, msg)
+
+    def has_extn(self, name: str) -> bool:
+        return name.lower() in self.esmtp_features
+
+    async def starttls(self, context: Optional[ssl.SSLContext] = None) -> Tuple[int, bytes]:
+        await self.ehlo_or_helo_if_needed()
+        if not self.has_extn("starttls"):
+            raise smtplib.SMTPNotSupportedError("STARTTLS extension not supported by server.")
+
+        code, msg = await self.docmd("STARTTLS")
+        if code == 220:
+            await asyncio.wait_for(
+                self._writer.start_tls(context or ssl.create_default_context(), server_hostname=self.host),
+                self.timeout
+            )
+            # RFC 3207: forget everything learned before TLS
+            self.esmtp_features = {}
+            self.does_esmtp = False
+            self._helo_done = False
+        else:
+            raise smtplib.SMTPResponseException(code, msg)
+        return code, msg
+
+    async def login(self, user: str, password: str) -> Tuple[int, bytes]:
+        await self.ehlo_or_helo_if_needed()
+        if not self.has_extn("auth"):
+            raise smtplib.SMTPNotSupportedError("SMTP AUTH extension not supported by server.")
+
+        mechanisms = self.esmtp_features["auth"].upper().split()
+        if "PLAIN" in mechanisms:
+            token = base64.b64encode(f"\0{user}\0{password}".encode("utf-8")).decode("ascii")
+            code, msg = await self.docmd("AUTH", f"PLAIN {token}")
+        elif "LOGIN" in mechanisms:
+            code, msg = await self.docmd("AUTH", "LOGIN")
+            for value in (user, password):
+                if code != 334:
+                    break
+                code, msg = await self.docmd(base64.b64encode(value.encode("utf-8")).decode("ascii"))
+        elif "CRAM-MD5" in mechanisms:
+            code, msg = await self.docmd("AUTH", "CRAM-MD5")
+            if code == 334:
+                digest = hmac.HMAC(password.encode("utf-8"), base64.b64decode(msg), "md5").hexdigest()
+                code, msg = await self.docmd(base64.b64encode(f"{user} {digest}".encode("utf-8")).decode("ascii"))
+        else:
+            raise smtplib.SMTPException("No suitable authentication method found.")
+
+        if code not in (235, 503):
+            raise smtplib.SMTPAuthenticationError(code, msg)
+        return code, msg
+
+    async def noop(self) -> Tuple[int, bytes]:
+        return await self.docmd("noop")
+
+    async def rset(self) -> Tuple[int, bytes]:
+        return await self.docmd("rset")
+
+    async def mail(self, from_addr: str) -> Tuple[int, bytes]:
+        return await self.docmd("mail", f"FROM:{smtplib.quoteaddr(from_addr)}")
+
+    async def rcpt(self, recipient: str) -> Tuple[int, bytes]:
+        return await self.docmd("rcpt", f"TO:{smtplib.quoteaddr(recipient)}")
+
+    async def sendmail_chunks(self, from_addr: str, recipients: list, chunks: AsyncIterable[bytes]) -> dict:
+        """
+        MAIL / RCPT / DATA with an already dot-stuffed DATA section given as
+        an async iterable of byte chunks (ending with the ".\\r\\n"
+        terminator). Returns refused recipients like smtplib.SMTP.sendmail().
+        """
+        await self.ehlo_or_helo_if_needed()
+
+        code, resp = await self.mail(from_addr)
+        if code != 250:
+            await self.rset()
+            raise smtplib.SMTPSenderRefused(code, resp, from_addr)
+
+        refused = {}
+        for recipient in recipients:
+            code, resp = await self.rcpt(recipient)
+            if code not in (250, 251):
+                refused[recipient] = (code, resp)
+        if len(refused) == len(recipients):
+            await self.rset()
+            raise smtplib.SMTPRecipientsRefused(refused)
+
+        code, resp = await self.docmd("data")
+        if code != 354:
+            await self.rset()
+            raise smtplib.SMTPDataError(code, resp)
+
+        try:
+            async for chunk in chunks:
+                await self.send(chunk)
+            code, resp = await self.getreply()
+        except DISCONNECT_ERRORS as e:
+            raise SMTPDataInterrupted(f"Connection lost during DATA: {e!r}") from e
+        if code != 250:
+            raise smtplib.SMTPDataError(code, resp)
+        return refused
+
+    async def quit(self) -> Tuple[int, bytes]:
+        try:
+            return await self.docmd("quit")
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+        self._reader = self._writer = None
+        self._helo_done = False
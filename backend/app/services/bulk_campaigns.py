@@ -0,0 +1,191 @@
+"""
+Bulk email campaigns.
+
+A campaign groups bulk_emails rows under one subject template and an
+optional start time. Its counters are kept up to date with increments
+from the import (queued) and from the sender's batched result writes
+(sent / failed / cancelled), so progress never recounts bulk_emails.
+Each counter matches the rows in that state: a row counts as failed once
+it is marked failed after its last attempt, not on earlier failed sends.
+
+Pausing or cancelling only flips the campaign status: the sender stops
+claiming its rows at once and skips the rest of an in-flight batch at
+its next result flush. Cancelling also marks every unclaimed pending row
+cancelled in one UPDATE.
+"""
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from sqlalchemy import case, func, or_, select, update
+from sqlalchemy.orm import Session
+
+from ..models import BulkCampaign, BulkEmail, BulkEmailStatus
+
+RUNNING = "running"
+PAUSED = "paused"
+CANCELLED = "cancelled"
+COMPLETED = "completed"
+
+DEFAULT_SUBJECT = "Bulk Mail Delivery"
+
+# send_rate is an exponential moving average over result flushes
+RATE_SMOOTHING = 0.3
+# A rate older than this is reported as 0 (nothing is being sent)
+RATE_STALE_SECONDS = 120
+
+
+def create_campaign(
+    db: Session, name: str, subject: Optional[str], scheduled_at: Optional[datetime], user_id: Optional[int]
+) -> BulkCampaign:
+    campaign = BulkCampaign(
+        name=name,
+        subject=subject or DEFAULT_SUBJECT,
+        status=RUNNING,
+        scheduled_at=scheduled_at,
+        created_by=user_id
+    )
+    db.add(campaign)
+    db.commit()
+    db.refresh(campaign)
+    return campaign
+
+
+def add_queued(connection, campaign_id: int, count: int) -> None:
+    """Count newly imported rows; a completed campaign runs again"""
+    connection.execute(
+        update(BulkCampaign)
+        .where(BulkCampaign.id == campaign_id)
+        .values(
+            queued_count=BulkCampaign.queued_count + count,
+            status=case((BulkCampaign.status == COMPLETED, RUNNING), else_=BulkCampaign.status),
+            finished_at=None
+        )
+    )
+
+
+def record_results(
+    connection,
+    counts: Dict[int, Dict[str, int]],
+    rates: Dict[int, float],
+    now: datetime
+) -> None:
+    """
+    Apply one flush of sender results: counts maps campaign id to sent /
+    failed / cancelled increments, rates to the measured mails per second.
+    Campaigns left with nothing queued are completed.
+    """
+    for campaign_id in set(counts) | set(rates):
+        delta = counts.get(campaign_id, {})
+        finished = delta.get("sent", 0) + delta.get("failed", 0) + delta.get("cancelled", 0)
+        values = {
+            "queued_count": BulkCampaign.queued_count - finished,
+            "sent_count": BulkCampaign.sent_count + delta.get("sent", 0),
+            "failed_count": BulkCampaign.failed_count + delta.get("failed", 0),
+            "cancelled_count": BulkCampaign.cancelled_count + delta.get("cancelled", 0),
+        }
+        if campaign_id in rates:
+            values["send_rate"] = (
+                RATE_SMOOTHING * rates[campaign_id] + (1 - RATE_SMOOTHING) * BulkCampaign.send_rate
+            )
+            values["started_at"] = func.coalesce(BulkCampaign.started_at, now)
+            values["last_sent_at"] = now
+        connection.execute(update(BulkCampaign).where(BulkCampaign.id == campaign_id).values(values))
+
+    if counts or rates:
+        connection.execute(
+            update(BulkCampaign)
+            .where(
+                BulkCampaign.id.in_(set(counts) | set(rates)),
+                BulkCampaign.status == RUNNING,
+                BulkCampaign.queued_count <= 0
+            )
+            .values(status=COMPLETED, finished_at=now, send_rate=0)
+        )
+
+
+def set_status(db: Session, campaign: BulkCampaign, status: str) -> BulkCampaign:
+    """Pause, resume or cancel. Raises ValueError for a transition that isn't allowed."""
+    db.refresh(campaign, with_for_update=True)
+    allowed = {
+        PAUSED: (RUNNING,),
+        RUNNING: (PAUSED,),
+        CANCELLED: (RUNNING, PAUSED),
+    }[status]
+    if campaign.status not in allowed:
+        raise ValueError(f"Campaign is {campaign.status}")
+
+    now = datetime.utcnow()
+    campaign.status = status
+    if status == CANCELLED:
+        # Rows held by a live sender are cancelled by it at its next flush
+        result = db.execute(
+            update(BulkEmail)
+            .where(
+                BulkEmail.campaign_id == campaign.id,
+                BulkEmail.status == BulkEmailStatus.pending,
+                or_(BulkEmail.claimed_by.is_(None), BulkEmail.claimed_until < now)
+            )
+            .values(status=BulkEmailStatus.cancelled, claimed_by=None, claimed_until=None)
+        )
+        campaign.queued_count = BulkCampaign.queued_count - result.rowcount
+        campaign.cancelled_count = BulkCampaign.cancelled_count + result.rowcount
+        campaign.finished_at = now
+    if status != RUNNING:
+        campaign.send_rate = 0
+    db.commit()
+    db.refresh(campaign)
+    return campaign
+
+
+def claimable_condition(now: datetime):
+    """Rows the sender may claim: no campaign, or a running campaign whose start time has passed"""
+    return or_(
+        BulkEmail.campaign_id.is_(None),
+        BulkEmail.campaign_id.in_(
+            select(BulkCampaign.id).where(
+                BulkCampaign.status == RUNNING,
+                or_(BulkCampaign.scheduled_at.is_(None), BulkCampaign.scheduled_at <= now)
+            )
+        )
+    )
+
+
+def serialize_campaign(campaign: BulkCampaign, now: Optional[datetime] = None) -> dict:
+    now = now or datetime.utcnow()
+    total = campaign.queued_count + campaign.sent_count + campaign.failed_count + campaign.cancelled_count
+
+    rate = campaign.send_rate or 0.0
+    if (
+        campaign.status != RUNNING
+        or campaign.last_sent_at is None
+        or _naive(campaign.last_sent_at) < now - timedelta(seconds=RATE_STALE_SECONDS)
+    ):
+        rate = 0.0
+
+    state = campaign.status
+    if state == RUNNING and campaign.scheduled_at and _naive(campaign.scheduled_at) > now:
+        state = "scheduled"
+
+    return {
+        "id": campaign.id,
+        "name": campaign.name,
+        "subject": campaign.subject,
+        "status": state,
+        "scheduled_at": campaign.scheduled_at,
+        "total": total,
+        "queued": campaign.queued_count,
+        "sent": campaign.sent_count,
+        "failed": campaign.failed_count,
+        "cancelled": campaign.cancelled_count,
+        "progress": round(100 * (total - campaign.queued_count) / total, 1) if total else 0.0,
+        "messages_per_second": round(rate, 2),
+        "eta_seconds": int(campaign.queued_count / rate) if rate > 0 and campaign.queued_count > 0 else None,
+        "started_at": campaign.started_at,
+        "last_sent_at": campaign.last_sent_at,
+        "finished_at": campaign.finished_at,
+        "created_at": campaign.created_at,
+    }
+
+
+def _naive(value: datetime) -> datetime:
+    return value.replace(tzinfo=None) if value.tzinfo else value
@@ -0,0 +1,255 @@
+"""
+Set-based bulk ticket operations (reassign, status change, re-tag).
+
+Tickets are processed in id-ordered chunks of BULK_TICKET_CHUNK_SIZE.
+Each chunk is one transaction: lock the rows, one UPDATE, one batched
+TicketEvent insert. These writes bypass the ORM, so the flush hooks that
+normally keep ticket_list_view, SLA timers, adviser stats, data versions,
+count caches and realtime events current are done here explicitly.
+"""
+import json
+import logging
+from datetime import datetime, timedelta
+from typing import Iterator, List, Optional
+
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..models import BulkTicketJob, Ticket, TicketEvent, TicketStatus
+from . import adviser_stats, etags, realtime, sla, ticket_list_view
+from .feedback_mailer import create_and_send_feedback
+
+logger = logging.getLogger(__name__)
+
+# Operations
+REASSIGN = "reassign"
+STATUS = "status"
+RETAG = "retag"
+
+# Job states
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+
+# Ticket field -> TicketEvent.event_type
+FIELD_EVENT_TYPES = {
+    "assigned_to": "reassign",
+    "status": "status_change",
+    "language_id": "language_change",
+    "voc_id": "voc_change",
+    "priority_id": "priority_change",
+}
+
+
+def _text(value) -> Optional[str]:
+    if value is None:
+        return None
+    return value.value if hasattr(value, "value") else str(value)
+
+
+def filter_conditions(filters: dict) -> list:
+    """Ticket conditions for a bulk filter (same meaning as the list filters)"""
+    conditions = []
+    if filters.get("status"):
+        conditions.append(Ticket.status == TicketStatus(filters["status"]))
+    if filters.get("priority_id"):
+        conditions.append(Ticket.priority_id == filters["priority_id"])
+    if filters.get("assigned_to"):
+        conditions.append(Ticket.assigned_to == filters["assigned_to"])
+    if filters.get("unassigned"):
+        conditions.append(Ticket.assigned_to.is_(None))
+    if filters.get("from_date"):
+        conditions.append(Ticket.created_at >= datetime.strptime(filters["from_date"], "%Y-%m-%d"))
+    if filters.get("to_date"):
+        # include full day
+        to_dt = datetime.strptime(filters["to_date"], "%Y-%m-%d") + timedelta(days=1)
+        conditions.append(Ticket.created_at < to_dt)
+    return conditions
+
+
+def create_job(
+    db: Session,
+    operation: str,
+    changes: dict,
+    ticket_ids: Optional[List[int]],
+    filters: Optional[dict],
+    created_by: int,
+    send_feedback: bool = False
+) -> BulkTicketJob:
+    """Record a queued job; run it with run_job(job.id)"""
+    if ticket_ids:
+        ticket_ids = sorted(set(ticket_ids))
+        total = len(ticket_ids)
+    else:
+        total = db.query(func.count(Ticket.id)).filter(*filter_conditions(filters)).scalar()
+
+    job = BulkTicketJob(
+        operation=operation,
+        params_json=json.dumps({
+            "changes": changes,
+            "ticket_ids": ticket_ids,
+            "filter": filters,
+            "send_feedback": send_feedback,
+        }),
+        status=JOB_QUEUED,
+        total=total,
+        created_by=created_by
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def _iter_chunks(db: Session, params: dict, columns) -> Iterator[list]:
+    """Yield locked row chunks; the caller commits between chunks"""
+    size = settings.BULK_TICKET_CHUNK_SIZE
+    ticket_ids = params.get("ticket_ids")
+
+    if ticket_ids:
+        for start in range(0, len(ticket_ids), size):
+            yield db.execute(
+                select(*columns)
+                .where(Ticket.id.in_(ticket_ids[start:start + size]))
+                .order_by(Ticket.id)
+                .with_for_update()
+            ).all()
+        return
+
+    conditions = filter_conditions(params["filter"])
+    last_id = 0
+    while True:
+        rows = db.execute(
+            select(*columns)
+            .where(*conditions, Ticket.id > last_id)
+            .order_by(Ticket.id)
+            .limit(size)
+            .with_for_update()
+        ).all()
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1].id
+
+
+def _apply_chunk(db: Session, rows: list, changes: dict) -> List[int]:
+    """UPDATE the rows that actually change and record their events. Returns updated ids."""
+    events = []
+    push = []
+    updated_ids = []
+
+    for row in rows:
+        changed = False
+        for field, value in changes.items():
+            old = getattr(row, field)
+            if _text(old) == _text(value):
+                continue
+            changed = True
+            events.append({
+                "ticket_id": row.id,
+                "event_type": FIELD_EVENT_TYPES[field],
+                "old_value": _text(old),
+                "new_value": _text(value),
+            })
+            if field == "assigned_to":
+                push.append({
+                    "type": realtime.TICKET_ASSIGNED,
+                    "ticket_id": row.id,
+                    "assigned_to": value,
+                    "previous_assigned_to": old,
+                    "data": {},
+                })
+            elif field == "status":
+                push.append({
+                    "type": realtime.STATUS_CHANGED,
+                    "ticket_id": row.id,
+                    "assigned_to": changes.get("assigned_to", row.assigned_to),
+                    "data": {"old": _text(old), "new": _text(value)},
+                })
+        if changed:
+            updated_ids.append(row.id)
+
+    if not updated_ids:
+        return updated_ids
+
+    connection = db.connection()
+    connection.execute(
+        update(Ticket)
+        .where(Ticket.id.in_(updated_ids))
+        .values(changes)
+    )
+    connection.execute(insert(TicketEvent), events)
+
+    ticket_list_view.refresh_tickets(connection, updated_ids)
+    sla.refresh_tickets(connection, updated_ids)
+    adviser_stats.stage(db, updated_ids)
+    etags.stage(db, [etags.TICKETS, etags.TICKET_EVENTS])
+    realtime.publish(db, push)
+    db.info["ticket_counts_dirty"] = True
+    return updated_ids
+
+
+def run_job(job_id: int) -> None:
+    """Run a queued job to completion (called from a background task)"""
+    from ..db import SessionLocal
+
+    db = SessionLocal()
+    job = db.query(BulkTicketJob).filter(BulkTicketJob.id == job_id).first()
+    if not job:
+        db.close()
+        return
+
+    try:
+        job.status = JOB_RUNNING
+        db.commit()
+
+        params = json.loads(job.params_json)
+        changes = params["changes"]
+        if "status" in changes:
+            changes["status"] = TicketStatus(changes["status"])
+
+        columns = [Ticket.id, Ticket.assigned_to] + [
+            getattr(Ticket, field) for field in changes if field != "assigned_to"
+        ]
+
+        for rows in _iter_chunks(db, params, columns):
+            updated_ids = _apply_chunk(db, rows, changes)
+            job.processed += len(rows)
+            job.updated += len(updated_ids)
+            db.commit()
+
+            if params.get("send_feedback") and changes.get("status") == TicketStatus.Closed:
+                for ticket in db.query(Ticket).filter(Ticket.id.in_(updated_ids)).all():
+                    create_and_send_feedback(db, ticket)
+
+            logger.info(f"Bulk job {job.id}: {job.processed}/{job.total} processed, {job.updated} updated")
+
+        job.status = JOB_COMPLETED
+        job.finished_at = datetime.utcnow()
+        db.commit()
+
+    except Exception as e:
+        logger.error(f"Bulk job {job_id} failed: {str(e)}")
+        db.rollback()
+        job.status = JOB_FAILED
+        job.error = str(e)
+        job.finished_at = datetime.utcnow()
+        db.commit()
+    finally:
+        db.close()
+
+
+def serialize_job(job: BulkTicketJob) -> dict:
+    return {
+        "job_id": job.id,
+        "operation": job.operation,
+        "status": job.status,
+        "total": job.total,
+        "processed": job.processed,
+        "updated": job.updated,
+        "error": job.error,
+        "created_at": job.created_at,
+        "finished_at": job.finished_at
+    }
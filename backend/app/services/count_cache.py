@@ -0,0 +1,135 @@
+import threading
+import time
+import logging
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import event, func
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..models import Ticket, TicketMessage
+
+logger = logging.getLogger(__name__)
+
+# Count modes accepted by list endpoints
+COUNT_EXACT = "exact"
+COUNT_ESTIMATE = "estimate"
+COUNT_NONE = "none"
+COUNT_MODES = (COUNT_EXACT, COUNT_ESTIMATE, COUNT_NONE)
+
+_lock = threading.Lock()
+_cache: Dict[Tuple, Tuple[int, int, float]] = {}
+_generation = 0
+
+
+def make_key(filters: dict, scope: tuple) -> tuple:
+    """
+    Build a cache key from a filter dict and the caller's visibility scope.
+    Empty filters are dropped and strings are normalized so that
+    equivalent requests share one entry.
+    """
+    normalized = []
+    for name, value in filters.items():
+        if value is None or value == "" or value is False:
+            continue
+        if isinstance(value, str):
+            value = value.strip().lower()
+        normalized.append((name, value))
+    return tuple(sorted(normalized)), scope
+
+
+def get_cached_count(key: tuple) -> Optional[int]:
+    """Return a cached exact count if it is still valid"""
+    with _lock:
+        entry = _cache.get(key)
+        if not entry:
+            return None
+        total, generation, stored_at = entry
+        if generation != _generation or time.monotonic() - stored_at > settings.TICKET_COUNT_CACHE_TTL:
+            _cache.pop(key, None)
+            return None
+        return total
+
+
+def store_count(key: tuple, total: int, generation: int) -> None:
+    """Store an exact count computed while `generation` was current"""
+    with _lock:
+        # A write landed while we were counting - the result may be stale
+        if generation != _generation:
+            return
+        if len(_cache) >= settings.TICKET_COUNT_CACHE_SIZE:
+            _cache.clear()
+        _cache[key] = (total, generation, time.monotonic())
+
+
+def current_generation() -> int:
+    return _generation
+
+
+def invalidate() -> None:
+    """Drop all cached counts (called after ticket writes)"""
+    global _generation
+    with _lock:
+        _generation += 1
+        _cache.clear()
+
+
+def count_query(query, key: tuple, mode: str = COUNT_EXACT, id_column=Ticket.id) -> Tuple[Optional[int], bool]:
+    """
+    Count rows of a filtered ticket query according to `mode`.
+
+    Returns (total, is_estimate). In estimate mode the count is capped at
+    TICKET_COUNT_ESTIMATE_CAP rows so the UI can show "1,000+" without
+    scanning the full result set; a cached exact count is preferred when
+    one is available.
+    """
+    if mode == COUNT_NONE:
+        return None, False
+
+    cached = get_cached_count(key)
+    if cached is not None:
+        return cached, False
+
+    query = query.order_by(None)
+
+    # Read before counting: a write committed during the count bumps the
+    # generation, so that count is never stored as current
+    generation = current_generation()
+
+    if mode == COUNT_ESTIMATE:
+        cap = settings.TICKET_COUNT_ESTIMATE_CAP
+        capped = query.with_entities(id_column).limit(cap + 1).subquery()
+        total = query.session.query(func.count()).select_from(capped).scalar()
+        if total > cap:
+            return cap, True
+        # Under the cap the capped count is exact, so it can be cached too
+        store_count(key, total, generation)
+        return total, False
+
+    total = query.count()
+    store_count(key, total, generation)
+    return total, False
+
+
+# Invalidate on ticket writes. Messages are tracked as well because the
+# search filter matches message bodies.
+_WATCHED = (Ticket, TicketMessage)
+
+
+@event.listens_for(Session, "after_flush")
+def _track_ticket_writes(session, flush_context):
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, _WATCHED):
+            session.info["ticket_counts_dirty"] = True
+            return
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session):
+    if session.info.pop("ticket_counts_dirty", False):
+        invalidate()
+
+
+@event.listens_for(Session, "after_rollback")
+def _reset_after_rollback(session):
+    session.info.pop("ticket_counts_dirty", None)
@@ -0,0 +1,173 @@
+import hashlib
+import logging
+from typing import Iterable, Optional
+
+from fastapi import Request, Response
+from sqlalchemy import event, insert, inspect, select, update
+from sqlalchemy.orm import Session
+
+from ..models import (
+    DataVersion, Ticket, TicketMessage, TicketEvent, TicketNote, TicketFeedback, User, BlockedSender,
+    CategoryLanguage, CategoryVOC, CategoryPriority, EmailTemplate
+)
+
+logger = logging.getLogger(__name__)
+
+# Versioned resources
+TICKETS = "tickets"
+CATEGORIES = "categories"
+TEMPLATES = "templates"
+BLOCKED_SENDERS = "blocked_senders"
+TICKET_EVENTS = "ticket_events"
+
+# Models whose writes change each resource, and the columns a response
+# depends on (None: any column). Users and categories are copied into
+# ticket_list_view, so renaming them changes ticket lists too, while
+# presence updates (is_online, last_login) change nothing cached. Notes
+# and feedback are part of the ticket workspace.
+# The same counters are the data watermark of cached export files
+# (services/export_jobs.py).
+VERSIONED_MODELS = (
+    (Ticket, (TICKETS,), None),
+    (TicketMessage, (TICKETS,), None),
+    (TicketNote, (TICKETS,), None),
+    (TicketFeedback, (TICKETS,), None),
+    (TicketEvent, (TICKET_EVENTS,), None),
+    (User, (TICKETS,), ("name", "email", "role")),
+    (CategoryLanguage, (TICKETS, CATEGORIES), None),
+    (CategoryVOC, (TICKETS, CATEGORIES), None),
+    (CategoryPriority, (TICKETS, CATEGORIES), None),
+    (EmailTemplate, (TEMPLATES,), None),
+    (BlockedSender, (BLOCKED_SENDERS,), None),
+)
+
+# session.info key of the counters to bump once the session commits
+_PENDING_KEY = "pending_version_bumps"
+
+# Clients must revalidate every time; responses depend on the caller
+CACHE_CONTROL = "private, no-cache"
+
+
+def get_version(db: Session, name: str) -> int:
+    version = db.query(DataVersion.version).filter(DataVersion.name == name).scalar()
+    return version or 0
+
+
+def get_versions(db: Session, names: Iterable[str]) -> tuple:
+    """Versions of several counters in one query, in the order given"""
+    names = list(names)
+    versions = dict(db.query(DataVersion.name, DataVersion.version).filter(DataVersion.name.in_(names)).all())
+    return tuple(versions.get(name, 0) for name in names)
+
+
+def bump(connection, names: Iterable[str]) -> None:
+    """Increment the given counters on `connection`"""
+    names = sorted(set(names))
+    if not names:
+        return
+
+    result = connection.execute(
+        update(DataVersion)
+        .where(DataVersion.name.in_(names))
+        .values(version=DataVersion.version + 1)
+    )
+    if result.rowcount < len(names):
+        existing = set(connection.execute(
+            select(DataVersion.name).where(DataVersion.name.in_(names))
+        ).scalars())
+        connection.execute(
+            insert(DataVersion),
+            [{"name": name, "version": 1} for name in names if name not in existing]
+        )
+
+
+def stage(session: Session, names: Iterable[str]) -> None:
+    """
+    Bump the given counters after `session` commits. The counters are
+    bumped in a short transaction of their own, so writers never queue on
+    the data_versions rows for the length of their transaction.
+    """
+    session.info.setdefault(_PENDING_KEY, set()).update(names)
+
+
+def ensure_versions(db: Session) -> None:
+    """Create missing counter rows (fresh create_all setups)"""
+    existing = {name for (name,) in db.query(DataVersion.name).all()}
+    missing = [name for name in (TICKETS, CATEGORIES, TEMPLATES, BLOCKED_SENDERS, TICKET_EVENTS) if name not in existing]
+    if missing:
+        db.execute(insert(DataVersion), [{"name": name, "version": 1} for name in missing])
+        db.commit()
+
+
+def make_etag(*parts) -> str:
+    """Strong ETag from the version signals a response is derived from"""
+    digest = hashlib.sha1(repr(parts).encode("utf-8")).hexdigest()[:24]
+    return f'"{digest}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == "*" or candidate == etag:
+            return True
+    return False
+
+
+def set_headers(response: Response, etag: str) -> Response:
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
+    return response
+
+
+def not_modified(request: Request, etag: str) -> Optional[Response]:
+    """Return a 304 response if the request already holds `etag`, else None"""
+    if etag_matches(request, etag):
+        return set_headers(Response(status_code=304), etag)
+    return None
+
+
+def _changed(session, obj, columns) -> bool:
+    if columns is None:
+        return session.is_modified(obj)
+    attrs = inspect(obj).attrs
+    return any(attrs[column].history.has_changes() for column in columns)
+
+
+@event.listens_for(Session, "after_flush")
+def _stage_versions(session, flush_context):
+    names = set()
+
+    for obj in session.new | session.deleted:
+        for model, resources, _ in VERSIONED_MODELS:
+            if isinstance(obj, model):
+                names.update(resources)
+
+    for obj in session.dirty:
+        for model, resources, columns in VERSIONED_MODELS:
+            if isinstance(obj, model) and _changed(session, obj, columns):
+                names.update(resources)
+
+    if names:
+        stage(session, names)
+
+
+@event.listens_for(Session, "after_commit")
+def _bump_versions(session):
+    names = session.info.pop(_PENDING_KEY, None)
+    if not names:
+        return
+    try:
+        with session.get_bind().begin() as connection:
+            bump(connection, names)
+    except Exception as e:
+        logger.error(f"Could not bump data versions {sorted(names)}: {str(e)}")
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_versions(session):
+    session.info.pop(_PENDING_KEY, None)
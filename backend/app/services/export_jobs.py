@@ -0,0 +1,225 @@
+"""
+Background export jobs.
+
+A submitted export is written by a background task to a file under
+EXPORTS_ROOT, recording its progress on the job row, and downloads are
+served from that file.
+
+Each job has a cache key (export kind, filters and compression) and a
+watermark: the data versions (services/etags.py) its output depends on,
+read before the export query runs. Submitting an export whose key and
+current watermark match a queued, running or completed job returns that
+job, so identical requests share one file until the data changes. Files
+are deleted when a newer one supersedes them or after
+EXPORT_RETENTION_HOURS.
+"""
+import hashlib
+import json
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Iterator, Optional, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..models import ExportJob
+from . import etags
+from .exports import EXPORTS
+from .streaming_export import csv_chunks, gzip_chunks
+
+logger = logging.getLogger(__name__)
+
+# Job states
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+JOB_EXPIRED = "expired"
+
+# Progress is written every PROGRESS_ROWS rows
+PROGRESS_ROWS = 5000
+# A queued or running job without progress for this long is not reused
+STALE_JOB_MINUTES = 10
+
+
+def cache_key(kind: str, params: dict, compressed: bool) -> str:
+    payload = json.dumps({"kind": kind, "params": params, "gzip": compressed}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def watermark(db: Session, kind: str) -> str:
+    """Current versions of the data an export kind reads"""
+    return ",".join(f"{name}:{etags.get_version(db, name)}" for name in EXPORTS[kind][2])
+
+
+def _file_exists(job: ExportJob) -> bool:
+    return bool(job.file_path) and os.path.exists(job.file_path)
+
+
+def _remove_file(job: ExportJob) -> None:
+    if job.file_path:
+        try:
+            os.remove(job.file_path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"Could not remove export file {job.file_path}: {str(e)}")
+
+
+def _expire(db: Session, jobs) -> None:
+    for job in jobs:
+        _remove_file(job)
+        job.status = JOB_EXPIRED
+    db.commit()
+
+
+def expire_old(db: Session) -> None:
+    """Delete result files past EXPORT_RETENTION_HOURS"""
+    cutoff = datetime.utcnow() - timedelta(hours=settings.EXPORT_RETENTION_HOURS)
+    _expire(db, db.query(ExportJob).filter(
+        ExportJob.status == JOB_COMPLETED,
+        ExportJob.finished_at < cutoff
+    ).all())
+
+
+def submit(
+    db: Session, kind: str, params: dict, compressed: bool, user_id: Optional[int]
+) -> Tuple[ExportJob, bool]:
+    """
+    Return (job, created): a job that already covers this export at the
+    current data watermark, or a new queued one to run with run_job(job.id).
+    """
+    expire_old(db)
+
+    key = cache_key(kind, params, compressed)
+    mark = watermark(db, kind)
+    stale = datetime.utcnow() - timedelta(minutes=STALE_JOB_MINUTES)
+
+    candidates = (
+        db.query(ExportJob)
+        .filter(
+            ExportJob.cache_key == key,
+            ExportJob.watermark == mark,
+            ExportJob.status.in_((JOB_QUEUED, JOB_RUNNING, JOB_COMPLETED))
+        )
+        .order_by(ExportJob.id.desc())
+        .all()
+    )
+    for job in candidates:
+        if job.status == JOB_COMPLETED and _file_exists(job):
+            return job, False
+        if job.status != JOB_COMPLETED and job.updated_at and _naive(job.updated_at) >= stale:
+            return job, False
+
+    job = ExportJob(
+        kind=kind,
+        params_json=json.dumps(params, sort_keys=True),
+        compressed=compressed,
+        cache_key=key,
+        watermark=mark,
+        status=JOB_QUEUED,
+        created_by=user_id,
+        updated_at=datetime.utcnow()
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    return job, True
+
+
+def run_job(job_id: int) -> None:
+    """Build the export file of a queued job (called from a background task)"""
+    from ..db import SessionLocal
+
+    db = SessionLocal()
+    job = db.query(ExportJob).filter(ExportJob.id == job_id).first()
+    if not job:
+        db.close()
+        return
+
+    part_path = None
+    try:
+        job.status = JOB_RUNNING
+        job.updated_at = datetime.utcnow()
+        db.commit()
+
+        builder = EXPORTS[job.kind][0]
+        export = builder(**json.loads(job.params_json))
+        job.total = db.execute(
+            select(func.count()).select_from(export.statement.order_by(None).subquery())
+        ).scalar()
+        db.commit()
+
+        def counted(rows: Iterator[list]) -> Iterator[list]:
+            for row in rows:
+                yield row
+                job.processed += 1
+                if job.processed % PROGRESS_ROWS == 0:
+                    job.updated_at = datetime.utcnow()
+                    db.commit()
+
+        chunks = csv_chunks(export.header, counted(export.rows()))
+        if job.compressed:
+            chunks = gzip_chunks(chunks)
+
+        file_name = export.filename("csv.gz" if job.compressed else "csv")
+        os.makedirs(settings.EXPORTS_ROOT, exist_ok=True)
+        path = os.path.join(settings.EXPORTS_ROOT, f"{job.id}_{file_name}")
+        part_path = f"{path}.part"
+        with open(part_path, "wb") as output:
+            for chunk in chunks:
+                output.write(chunk)
+        os.replace(part_path, path)
+        part_path = None
+
+        job.status = JOB_COMPLETED
+        job.total = job.processed
+        job.file_path = path
+        job.file_name = file_name
+        job.file_size = os.path.getsize(path)
+        job.finished_at = job.updated_at = datetime.utcnow()
+        db.commit()
+        logger.info(f"Export job {job.id} ({job.kind}): {job.processed} rows, {job.file_size} bytes")
+
+        # Older files of the same export are superseded by this one
+        _expire(db, db.query(ExportJob).filter(
+            ExportJob.cache_key == job.cache_key,
+            ExportJob.id != job.id,
+            ExportJob.status == JOB_COMPLETED
+        ).all())
+
+    except Exception as e:
+        logger.error(f"Export job {job_id} failed: {str(e)}")
+        db.rollback()
+        if part_path and os.path.exists(part_path):
+            os.remove(part_path)
+        job.status = JOB_FAILED
+        job.error = str(e)
+        job.finished_at = job.updated_at = datetime.utcnow()
+        db.commit()
+    finally:
+        db.close()
+
+
+def _naive(value: datetime) -> datetime:
+    return value.replace(tzinfo=None) if value.tzinfo else value
+
+
+def serialize_job(job: ExportJob) -> dict:
+    return {
+        "job_id": job.id,
+        "kind": job.kind,
+        "params": json.loads(job.params_json),
+        "gzip": job.compressed,
+        "status": job.status,
+        "total": job.total,
+        "processed": job.processed,
+        "progress": min(100.0, round(100 * job.processed / job.total, 1)) if job.total else 0.0,
+        "file_name": job.file_name,
+        "file_size": job.file_size,
+        "error": job.error,
+        "created_at": job.created_at,
+        "finished_at": job.finished_at
+    }
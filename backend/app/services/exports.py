@@ -0,0 +1,450 @@
+"""
+Export definitions: the CSV exports shared by the streaming endpoints in
+routers/exports.py and the background export jobs (services/export_jobs.py),
+and the sheets of the ticket feedback workbook.
+
+Each export is a Core select plus a function formatting one result row,
+so it can be counted (job progress) and read with yield_per without ever
+holding the whole result.
+
+Tickets and ticket events also have delta exports: only the rows changed
+since a position, in (change time, id) order, with a continuation token
+for the next pull. Positions are keyset bounds, so a page costs an index
+range scan however long the history is. Ticket rows are matched on the
+ticket's updated_at; renaming a user or category changes exported names
+without touching it, so those changes only show up in a full export.
+"""
+import base64
+import hashlib
+import json
+from datetime import datetime, timedelta
+from typing import Callable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..models import (
+    BlockedSender, Ticket, TicketEvent, TicketFeedback, TicketListView, TicketMessage, User
+)
+from . import etags
+from .streaming_export import iter_rows
+
+TICKETS = "tickets"
+EMAILS = "emails"
+BLOCKED_SENDERS = "blocked_senders"
+TICKET_EVENTS = "ticket_events"
+
+
+class CsvExport:
+    """One export: file name stem, header, select statement and row formatter"""
+
+    def __init__(self, name: str, header: List[str], statement, row: Callable):
+        self.name = name
+        self.header = header
+        self.statement = statement
+        self.row = row
+
+    def rows(self) -> Iterator[list]:
+        for record in iter_rows(self.statement):
+            yield self.row(record)
+
+    def filename(self, extension: str = "csv") -> str:
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        return f"{self.name}_{timestamp}.{extension}"
+
+
+def _timestamp(value: Optional[datetime]) -> str:
+    return value.strftime('%Y-%m-%d %H:%M:%S') if value else ''
+
+
+def tickets_export(
+    status: Optional[str] = None,
+    assigned_to: Optional[int] = None,
+    priority_id: Optional[int] = None,
+    from_date: Optional[str] = None,
+    to_date: Optional[str] = None
+) -> CsvExport:
+    # Read from the denormalized projection (see services/ticket_list_view.py)
+    statement = select(
+        TicketListView.ticket_id,
+        TicketListView.customer_email,
+        TicketListView.customer_name,
+        TicketListView.subject,
+        TicketListView.status,
+        TicketListView.assigned_user_name,
+        TicketListView.language_name,
+        TicketListView.voc_name,
+        TicketListView.priority_name,
+        TicketListView.created_at,
+        TicketListView.updated_at
+    )
+
+    if status:
+        statement = statement.where(TicketListView.status == status)
+    if assigned_to:
+        statement = statement.where(TicketListView.assigned_to == assigned_to)
+    if priority_id:
+        statement = statement.where(TicketListView.priority_id == priority_id)
+    if from_date:
+        statement = statement.where(TicketListView.created_at >= from_date)
+    if to_date:
+        statement = statement.where(TicketListView.created_at <= to_date)
+
+    def row(ticket) -> list:
+        return [
+            ticket.ticket_id,
+            ticket.customer_email,
+            ticket.customer_name or '',
+            ticket.subject,
+            ticket.status.value,
+            ticket.assigned_user_name or '',
+            ticket.language_name or '',
+            ticket.voc_name or '',
+            ticket.priority_name or '',
+            _timestamp(ticket.created_at),
+            _timestamp(ticket.updated_at)
+        ]
+
+    header = [
+        'Ticket ID',
+        'Customer Email',
+        'Customer Name',
+        'Subject',
+        'Status',
+        'Assigned To',
+        'Language',
+        'VOC',
+        'Priority',
+        'Created At',
+        'Updated At'
+    ]
+    return CsvExport(
+        "tickets_export", header, statement.order_by(TicketListView.created_at.desc()), row
+    )
+
+
+def emails_export(
+    spam_status: Optional[str] = None,
+    from_date: Optional[str] = None,
+    to_date: Optional[str] = None
+) -> CsvExport:
+    # A message is spam when its sender is blocked; checked (and filtered) in SQL
+    is_spam = func.lower(TicketMessage.from_email).in_(select(func.lower(BlockedSender.email)))
+
+    # The precomputed snippet and attachment count spare reading the body blobs
+    statement = select(
+        TicketMessage.id,
+        TicketMessage.ticket_id,
+        TicketMessage.direction,
+        TicketMessage.from_email,
+        TicketMessage.to_email,
+        TicketMessage.subject,
+        TicketMessage.snippet,
+        is_spam.label("is_spam"),
+        TicketMessage.sent_at,
+        TicketMessage.attachment_count
+    )
+
+    if from_date:
+        statement = statement.where(TicketMessage.sent_at >= from_date)
+    if to_date:
+        statement = statement.where(TicketMessage.sent_at <= to_date)
+    if spam_status == 'spam':
+        statement = statement.where(is_spam)
+    elif spam_status == 'not_spam':
+        statement = statement.where(~is_spam)
+
+    def row(message) -> list:
+        return [
+            message.id,
+            message.ticket_id,
+            message.direction.value,
+            message.from_email,
+            message.to_email,
+            message.subject,
+            # Body preview (first 100 chars)
+            (message.snippet or '')[:100],
+            'Spam' if message.is_spam else 'Not Spam',
+            _timestamp(message.sent_at),
+            'Yes' if message.attachment_count else 'No'
+        ]
+
+    header = [
+        'Message ID',
+        'Ticket ID',
+        'Direction',
+        'From Email',
+        'To Email',
+        'Subject',
+        'Body Preview',
+        'Spam Status',
+        'Sent At',
+        'Has Attachments'
+    ]
+    spam_suffix = f"_{spam_status}" if spam_status and spam_status != 'all' else ""
+    return CsvExport(
+        f"emails_export{spam_suffix}", header, statement.order_by(TicketMessage.sent_at.desc()), row
+    )
+
+
+def blocked_senders_export() -> CsvExport:
+    statement = select(BlockedSender.id, BlockedSender.email, BlockedSender.reason).order_by(BlockedSender.id)
+    return CsvExport(
+        "blocked_senders",
+        ['ID', 'Email', 'Reason'],
+        statement,
+        lambda sender: [sender.id, sender.email, sender.reason or '']
+    )
+
+
+def ticket_events_export(
+    ticket_id: Optional[int] = None,
+    from_date: Optional[str] = None,
+    to_date: Optional[str] = None
+) -> CsvExport:
+    statement = (
+        select(
+            TicketEvent.id,
+            TicketEvent.ticket_id,
+            Ticket.customer_email,
+            Ticket.subject,
+            User.name.label("assigned_user_name"),
+            Ticket.status,
+            Ticket.created_at.label("ticket_created_at"),
+            Ticket.updated_at.label("ticket_updated_at"),
+            TicketEvent.old_value,
+            TicketEvent.new_value,
+            TicketEvent.event_type,
+            TicketEvent.created_at
+        )
+        .outerjoin(Ticket, TicketEvent.ticket_id == Ticket.id)
+        .outerjoin(User, Ticket.assigned_to == User.id)
+    )
+
+    if ticket_id:
+        statement = statement.where(TicketEvent.ticket_id == ticket_id)
+    if from_date:
+        statement = statement.where(TicketEvent.created_at >= from_date)
+    if to_date:
+        statement = statement.where(TicketEvent.created_at <= to_date)
+
+    def row(event) -> list:
+        return [
+            event.id,
+            event.ticket_id,
+            event.customer_email or '',
+            event.subject or '',
+            event.assigned_user_name or '',
+            event.status.value if event.status else '',
+            _timestamp(event.ticket_created_at),
+            _timestamp(event.ticket_updated_at),
+            event.old_value,
+            event.new_value,
+            event.event_type,
+            _timestamp(event.created_at)
+        ]
+
+    header = [
+        'Event ID',
+        'Ticket ID',
+        'Customer Email',
+        'Subject',
+        'Assigned To',
+        'Ticket Status',
+        'Ticket Created At',
+        'Ticket Updated At',
+        'Event Old Status',
+        'Event New Status',
+        'Event Type',
+        'Reopened At'
+    ]
+    return CsvExport(
+        "ticket_events_export", header, statement.order_by(TicketEvent.created_at.desc()), row
+    )
+
+
+def _week_start(column, dialect_name: str):
+    """Monday of the column's week"""
+    if dialect_name == "mysql":
+        return func.subdate(func.date(column), func.weekday(column))
+    # SQLite
+    return func.date(column, "-6 days", "weekday 1")
+
+
+def feedback_sheets(
+    dialect_name: str, from_dt: Optional[datetime] = None, to_dt: Optional[datetime] = None
+) -> list:
+    """
+    (title, header, rows) sheets of the ticket feedback workbook: every
+    feedback row, and average ratings per adviser per week of submission,
+    aggregated in SQL.
+    """
+    conditions = []
+    if from_dt:
+        conditions.append(TicketFeedback.created_at >= from_dt)
+    if to_dt:
+        conditions.append(TicketFeedback.created_at <= to_dt)
+
+    feedback = (
+        select(
+            TicketFeedback.ticket_id,
+            Ticket.customer_email,
+            TicketFeedback.support_rating,
+            TicketFeedback.delivery_rating,
+            TicketFeedback.product_rating,
+            TicketFeedback.submitted_at,
+            TicketFeedback.created_at
+        )
+        .join(Ticket, TicketFeedback.ticket_id == Ticket.id)
+        .where(*conditions)
+        .order_by(TicketFeedback.id)
+    )
+
+    week = _week_start(TicketFeedback.submitted_at, dialect_name).label("week")
+    adviser = func.coalesce(User.name, "Unassigned").label("adviser")
+    summary = (
+        select(
+            week,
+            adviser,
+            func.count().label("responses"),
+            func.round(func.avg(TicketFeedback.support_rating), 2).label("support"),
+            func.round(func.avg(TicketFeedback.delivery_rating), 2).label("delivery"),
+            func.round(func.avg(TicketFeedback.product_rating), 2).label("product")
+        )
+        .join(Ticket, TicketFeedback.ticket_id == Ticket.id)
+        .outerjoin(User, Ticket.assigned_to == User.id)
+        .where(*conditions, TicketFeedback.submitted_at.isnot(None))
+        .group_by(week, Ticket.assigned_to, User.name)
+        .order_by(week, adviser)
+    )
+
+    feedback_header = [
+        "Ticket ID",
+        "Customer Email",
+        "Support Rating",
+        "Delivery Rating",
+        "Product Rating",
+        "Submitted At",
+        "Created At",
+    ]
+    summary_header = [
+        "Week Starting",
+        "Adviser",
+        "Responses",
+        "Avg Support Rating",
+        "Avg Delivery Rating",
+        "Avg Product Rating",
+    ]
+    return [
+        ("Ticket Feedback", feedback_header, iter_rows(feedback)),
+        ("Summary by Adviser", summary_header, iter_rows(summary)),
+    ]
+
+
+# Export kind -> (builder, accepted filters, data versions the output depends on)
+EXPORTS = {
+    TICKETS: (
+        tickets_export,
+        ("status", "assigned_to", "priority_id", "from_date", "to_date"),
+        (etags.TICKETS,)
+    ),
+    EMAILS: (
+        emails_export,
+        ("spam_status", "from_date", "to_date"),
+        (etags.TICKETS, etags.BLOCKED_SENDERS)
+    ),
+    BLOCKED_SENDERS: (blocked_senders_export, (), (etags.BLOCKED_SENDERS,)),
+    TICKET_EVENTS: (
+        ticket_events_export,
+        ("ticket_id", "from_date", "to_date"),
+        (etags.TICKETS, etags.TICKET_EVENTS)
+    ),
+}
+
+
+# Delta exports: kind -> (change time column, id column)
+DELTA_KEYS = {
+    TICKETS: (TicketListView.updated_at, TicketListView.ticket_id),
+    TICKET_EVENTS: (TicketEvent.created_at, TicketEvent.id),
+}
+
+
+def _filters_digest(kind: str, filters: dict) -> str:
+    payload = json.dumps({"kind": kind, "filters": filters}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def encode_token(kind: str, filters: dict, changed_at: datetime, row_id: Optional[int]) -> str:
+    """Continuation token: the position after the last exported row, bound to the export and filters"""
+    payload = {"f": _filters_digest(kind, filters), "t": changed_at.isoformat(), "i": row_id}
+    return base64.urlsafe_b64encode(json.dumps(payload).encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_token(kind: str, filters: dict, token: str) -> Tuple[datetime, Optional[int]]:
+    """(change time, id) of a token. Raises ValueError if it is malformed or from another export."""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        changed_at = datetime.fromisoformat(payload["t"])
+        row_id = payload["i"]
+        digest = payload["f"]
+    except Exception:
+        raise ValueError("Invalid continuation token")
+    if digest != _filters_digest(kind, filters):
+        raise ValueError("Continuation token belongs to a different export or filters")
+    if row_id is not None and not isinstance(row_id, int):
+        raise ValueError("Invalid continuation token")
+    return changed_at, row_id
+
+
+def delta_export(
+    db: Session,
+    kind: str,
+    export: CsvExport,
+    filters: dict,
+    token: Optional[str] = None,
+    since: Optional[datetime] = None,
+    limit: Optional[int] = None
+) -> Tuple[CsvExport, str, bool]:
+    """
+    Restrict an export to rows changed after the token's position (or
+    after `since`, or from the beginning), at most `limit` of them.
+    Returns the export, the token for the next pull and whether more rows
+    are already waiting. Both are known before any row is streamed.
+    """
+    changed, row_id = DELTA_KEYS[kind]
+
+    after_id = None
+    if token:
+        since, after_id = decode_token(kind, filters, token)
+
+    statement = export.statement.order_by(None)
+    if since is not None:
+        if after_id is None:
+            statement = statement.where(changed > since)
+        else:
+            statement = statement.where(
+                or_(changed > since, and_(changed == since, row_id > after_id))
+            )
+
+    # Rows newer than the cutoff are left to the next pull. Timestamps have
+    # one-second precision, so the cutoff is at least a second back: a row
+    # written later in the cutoff's own second would otherwise be skipped.
+    lag = max(settings.EXPORT_DELTA_LAG_SECONDS, 1)
+    cutoff = db.execute(select(func.now())).scalar() - timedelta(seconds=lag)
+    statement = statement.where(changed <= cutoff).order_by(changed, row_id)
+
+    end_at, end_id, has_more = cutoff, None, False
+    if limit:
+        # The page's last row, and whether one follows it
+        bounds = db.execute(
+            statement.with_only_columns(changed, row_id).offset(limit - 1).limit(2)
+        ).all()
+        if len(bounds) == 2:
+            end_at, end_id = bounds[0]
+            has_more = True
+            statement = statement.limit(limit)
+
+    next_token = encode_token(kind, filters, end_at, end_id)
+    return CsvExport(f"{export.name}_delta", export.header, statement, export.row), next_token, has_more
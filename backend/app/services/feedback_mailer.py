@@ -1,51 +1,74 @@
-from ..services.mailer import send_mail
+from starlette.concurrency import run_in_threadpool
 
-def send_feedback_email(ticket, token):
-    base_url = "http://localhost:8000/feedback"
+from ..services.mailer import send_mail, send_mail_async
+from ..services import templating
 
-    def stars(field):
-        STAR = "&#11088;"
-        return " ".join([
-            f'<a style="text-decoration:none;font-size:22px;" '
-            f'href="{base_url}?token={token}&field={field}&rating={i}">{STAR}</a>'
-            for i in range(1, 6)
-        ])
+FEEDBACK_URL = "http://localhost:8000/feedback"
+STAR = "&#11088;"
+
+FEEDBACK_SUBJECT = templating.compile_template("Rate your experience for Ticket #{ticket_id}")
+
+FEEDBACK_STAR = templating.compile_template(
+    '<a style="text-decoration:none;font-size:22px;" '
+    'href="{feedback_url}?token={token}&field={field}&rating={rating}">{star}</a>'
+)
 
-    body = f"""
+FEEDBACK_BODY = templating.compile_template("""
     <h3>We value your feedback &#11088;</h3>
     <p>Please rate your experience:</p>
 
     <p><b>Customer Support</b><br/>
-    {stars("support")}
+    {support_stars}
     </p>
 
     <p><b>Delivery Experience</b><br/>
-    {stars("delivery")}
+    {delivery_stars}
     </p>
 
     <p><b>Product Experience</b><br/>
-    {stars("product")}
+    {product_stars}
     </p>
 
     <p>Thank you for choosing us!</p>
-    """
+    """)
 
-    send_mail(
-        to_email=ticket.customer_email,
-        subject=f"Rate your experience for Ticket #{ticket.id}",
-        body=body
+
+def feedback_mail(ticket, token) -> dict:
+    """send_mail arguments of the feedback request for a ticket"""
+    def stars(field):
+        return " ".join(templating.render_batch(FEEDBACK_STAR, [
+            {"feedback_url": FEEDBACK_URL, "token": token, "field": field, "rating": i, "star": STAR}
+            for i in range(1, 6)
+        ]))
+
+    variables = templating.ticket_variables(ticket)
+    variables.update(
+        support_stars=stars("support"),
+        delivery_stars=stars("delivery"),
+        product_stars=stars("product"),
     )
 
+    return {
+        "to_email": ticket.customer_email,
+        "subject": FEEDBACK_SUBJECT.render(variables),
+        "body": FEEDBACK_BODY.render(variables),
+    }
+
+
+def send_feedback_email(ticket, token):
+    send_mail(**feedback_mail(ticket, token))
+
 
 import uuid
 from ..models import TicketFeedback
 
 
-def create_and_send_feedback(db, ticket):
+def create_feedback(db, ticket):
+    """Create the feedback row and return the feedback mail, or None if it already exists"""
     # Prevent duplicate feedback creation
     existing = db.query(TicketFeedback).filter_by(ticket_id=ticket.id).first()
     if existing:
-        return
+        return None
 
     token = str(uuid.uuid4())
 
@@ -58,4 +81,17 @@ def create_and_send_feedback(db, ticket):
     db.commit()  # ensures feedback row exists before email
     db.refresh(feedback)
 
-    send_feedback_email(ticket, feedback.token)
+    return feedback_mail(ticket, feedback.token)
+
+
+def create_and_send_feedback(db, ticket):
+    mail = create_feedback(db, ticket)
+    if mail:
+        send_mail(**mail)
+
+
+async def create_and_send_feedback_async(db, ticket):
+    """create_and_send_feedback for async handlers: DB work in the threadpool, mail over asyncio SMTP"""
+    mail = await run_in_threadpool(create_feedback, db, ticket)
+    if mail:
+        await send_mail_async(**mail)
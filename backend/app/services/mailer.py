@@ -1,16 +1,22 @@
+import asyncio
+import base64
+import functools
 import smtplib
-from email.mime.application import MIMEApplication
+import tempfile
+import threading
+import uuid
+from contextlib import nullcontext
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.utils import formataddr, make_msgid
-
-from fastapi import File, UploadFile
+from pathlib import Path
 
 from ..config import settings
+from .async_smtp import AsyncSMTP
+from .smtp_pool import DISCONNECT_ERRORS, AsyncSMTPConnectionPool, SMTPConnectionPool, SMTPDataInterrupted
 from typing import Optional, List
 import logging
 from email.mime.base import MIMEBase
-from email import encoders
 
 
 logger = logging.getLogger(__name__)
@@ -19,6 +25,13 @@ logger = logging.getLogger(__name__)
 MAX_ATTACHMENT_SIZE_MB = 25
 MAX_ATTACHMENT_SIZE = MAX_ATTACHMENT_SIZE_MB * 1024 * 1024
 
+# Messages up to this size stay in memory while being built, larger ones spill to disk
+MESSAGE_SPOOL_SIZE = 1024 * 1024
+# Multiple of 57 bytes, so every base64 line is full except the last
+ENCODE_CHUNK_SIZE = 57 * 1024
+SEND_CHUNK_SIZE = 64 * 1024
+# Socket timeout for SMTP commands (seconds)
+SMTP_TIMEOUT = 30
 
 def send_mail(
     to_email: str, 
@@ -26,93 +39,360 @@ def send_mail(
     body: str, 
     cc_emails: Optional[list] = None,
     bcc_emails: Optional[list] = None,
-    attachments: Optional[List[UploadFile]] = None,
+    attachments: Optional[list] = None,
     in_reply_to: Optional[str] = None
 ) -> Optional[str]:
     """
     Send email via SMTP and return Message-ID.
     Supports threading with In-Reply-To and References headers.
+    Attachments are saved uploads (AttachmentHandler.save_upload dicts) or
+    UploadFiles; they are streamed from disk, never held in memory whole.
     """
     try:
-        # Create message
-        msg = MIMEMultipart()
-        msg['From'] = formataddr(("Support", settings.SMTP_FROM))
-        msg['To'] = to_email
-        msg['Subject'] = subject
-        
-        # Add CC if provided
+        message_id, message_file = build_message(
+            to_email, subject, body, cc_emails, in_reply_to, attachments
+        )
+
+        # Prepare all recipients (To + CC + BCC)
+        all_recipients = [to_email]
         if cc_emails:
-            msg['Cc'] = ', '.join(cc_emails)
-        
-        # Generate Message-ID
-        message_id = make_msgid()
-        msg['Message-ID'] = message_id
-        
-        # Set threading headers if replying
-        if in_reply_to:
-            msg['In-Reply-To'] = in_reply_to
-            msg['References'] = in_reply_to
-        
-        # Add body
-        body_part = MIMEMultipart("alternative")
-
-        # Plain fallback
-        body_part.attach(MIMEText("Please view this email in HTML format.", "plain", "utf-8"))
-
-        # HTML content
-        html_body = body.replace("\n", "<br>")
-        body_part.attach(MIMEText(html_body, "html", "utf-8"))
-
-        msg.attach(body_part)
-
-        # Attach files
-        if attachments and isinstance(attachments, list):
-            for file in attachments:
-
-                file_data = file.file.read()
-                file.file.seek(0)
-
-                # Validate size under 25MB
-                if len(file_data) > MAX_ATTACHMENT_SIZE:
-                    raise Exception(f"Attachment {file.filename} exceeds 25MB limit")
-
-                # Detect file type
-                maintype, subtype = file.content_type.split("/", 1)
-
-                part = MIMEBase(maintype, subtype)
-                part.set_payload(file_data)
-                encoders.encode_base64(part)
-                part.add_header(
-                    "Content-Disposition",
-                    f'attachment; filename="{file.filename}"'
+            all_recipients.extend(cc_emails)
+        if bcc_emails:
+            all_recipients.extend(bcc_emails)
+
+        # Send email
+        with message_file:
+            send_with_connection(
+                lambda server: send_message_file(server, settings.SMTP_FROM, all_recipients, message_file)
+            )
+
+        logger.info(f"Email sent successfully to {to_email} (CC: {cc_emails}, BCC: {bcc_emails})")
+        return message_id.strip('<>')  # Remove angle brackets
+
+    except Exception as e:
+        logger.error(f"Failed to send email to {to_email}: {str(e)}")
+        return None
+
+
+def connect() -> smtplib.SMTP:
+    """Open a logged-in SMTP connection"""
+    if settings.SMTP_USER:
+        # Use STARTTLS if credentials provided
+        server = smtplib.SMTP(settings.SMTP_HOST, settings.SMTP_PORT, timeout=SMTP_TIMEOUT)
+        server.starttls()
+        server.login(settings.SMTP_USER, settings.SMTP_PASS)
+    else:
+        # No authentication (for Mailhog)
+        server = smtplib.SMTP(settings.SMTP_HOST, settings.SMTP_PORT, timeout=SMTP_TIMEOUT)
+    return server
+
+
+_pool: Optional[SMTPConnectionPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> Optional[SMTPConnectionPool]:
+    """The process-wide SMTP connection pool (None when pooling is disabled)"""
+    global _pool
+    if settings.SMTP_POOL_SIZE <= 0:
+        return None
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = SMTPConnectionPool(
+                    connect,
+                    size=settings.SMTP_POOL_SIZE,
+                    idle_timeout=settings.SMTP_POOL_IDLE_TIMEOUT,
+                    max_messages=settings.SMTP_POOL_MAX_MESSAGES,
+                    check_after=settings.SMTP_POOL_CHECK_AFTER,
+                    acquire_timeout=SMTP_TIMEOUT * 4
                 )
-                msg.attach(part)
-        
-        # Connect to SMTP server
+    return _pool
+
+
+def send_with_connection(send):
+    """Run send(server) on a pooled connection, or a fresh one if pooling is off"""
+    pool = get_pool()
+    if pool is not None:
+        return pool.send(send)
+
+    server = connect()
+    try:
+        return send(server)
+    finally:
+        server.quit()
+
+
+def _attachment_source(attachment):
+    """(filename, mime type, context manager yielding a binary file) of an attachment"""
+    if isinstance(attachment, dict):
+        path = Path(settings.ATTACHMENTS_ROOT) / attachment["file_path"]
+        return attachment["filename"], attachment.get("mime_type"), open(path, "rb")
+
+    # UploadFile: its spooled temp file is read in place
+    attachment.file.seek(0)
+    return attachment.filename, attachment.content_type, nullcontext(attachment.file)
+
+
+def build_message(
+    to_email: str,
+    subject: str,
+    body: str,
+    cc_emails: Optional[list] = None,
+    in_reply_to: Optional[str] = None,
+    attachments: Optional[list] = None
+):
+    """
+    Render the full MIME message into a spooled temp file and return
+    (Message-ID, file). Attachment parts are generated with placeholder
+    payloads, which are then replaced by base64 streamed from each file,
+    so memory use does not grow with attachment size.
+    """
+    # Create message
+    msg = MIMEMultipart()
+    msg['From'] = formataddr(("Support", settings.SMTP_FROM))
+    msg['To'] = to_email
+    msg['Subject'] = subject
+
+    # Add CC if provided
+    if cc_emails:
+        msg['Cc'] = ', '.join(cc_emails)
+
+    # Generate Message-ID
+    message_id = make_msgid()
+    msg['Message-ID'] = message_id
+
+    # Set threading headers if replying
+    if in_reply_to:
+        msg['In-Reply-To'] = in_reply_to
+        msg['References'] = in_reply_to
+
+    # Add body
+    body_part = MIMEMultipart("alternative")
+
+    # Plain fallback
+    body_part.attach(MIMEText("Please view this email in HTML format.", "plain", "utf-8"))
+
+    # HTML content
+    html_body = body.replace("\n", "<br>")
+    body_part.attach(MIMEText(html_body, "html", "utf-8"))
+
+    msg.attach(body_part)
+
+    # Attach files (payloads filled in below)
+    sources = []
+    token = uuid.uuid4().hex
+    for index, attachment in enumerate(attachments or []):
+        filename, mime_type, source = _attachment_source(attachment)
+
+        # Detect file type
+        maintype, subtype = (mime_type or "application/octet-stream").split("/", 1)
+
+        placeholder = f"{token}-{index}"
+        part = MIMEBase(maintype, subtype)
+        part.set_payload(placeholder)
+        part['Content-Transfer-Encoding'] = 'base64'
+        part.add_header("Content-Disposition", "attachment", filename=filename)
+        msg.attach(part)
+        sources.append((placeholder.encode("ascii"), filename, source))
+
+    message_file = tempfile.SpooledTemporaryFile(max_size=MESSAGE_SPOOL_SIZE, mode="w+b")
+    try:
+        skeleton = msg.as_bytes()
+        position = 0
+        for placeholder, filename, source in sources:
+            start = skeleton.index(placeholder, position)
+            message_file.write(skeleton[position:start])
+            with source as f:
+                _write_base64(f, message_file, filename)
+            position = start + len(placeholder)
+        message_file.write(skeleton[position:])
+    except Exception:
+        message_file.close()
+        raise
+
+    message_file.seek(0)
+    return message_id, message_file
+
+
+def _write_base64(source, target, filename: str) -> None:
+    """Base64-encode `source` into `target` in 76-column lines, chunk by chunk"""
+    size = 0
+    while True:
+        chunk = source.read(ENCODE_CHUNK_SIZE)
+        if not chunk:
+            break
+        size += len(chunk)
+        # Validate size under 25MB
+        if size > MAX_ATTACHMENT_SIZE:
+            raise Exception(f"Attachment {filename} exceeds {MAX_ATTACHMENT_SIZE_MB}MB limit")
+        target.write(base64.encodebytes(chunk))
+
+
+def send_message_file(server: smtplib.SMTP, from_addr: str, recipients: list, message_file) -> dict:
+    """
+    sendmail() for a message stored in a file: the DATA section is
+    dot-stuffed and written to the socket in chunks instead of being
+    built as one string. Returns refused recipients like sendmail().
+    """
+    server.ehlo_or_helo_if_needed()
+
+    code, resp = server.mail(from_addr)
+    if code != 250:
+        server.rset()
+        raise smtplib.SMTPSenderRefused(code, resp, from_addr)
+
+    refused = {}
+    for recipient in recipients:
+        code, resp = server.rcpt(recipient)
+        if code not in (250, 251):
+            refused[recipient] = (code, resp)
+    if len(refused) == len(recipients):
+        server.rset()
+        raise smtplib.SMTPRecipientsRefused(refused)
+
+    code, resp = server.docmd("data")
+    if code != 354:
+        server.rset()
+        raise smtplib.SMTPDataError(code, resp)
+
+    try:
+        for chunk in _data_chunks(message_file):
+            server.send(chunk)
+        code, resp = server.getreply()
+    except DISCONNECT_ERRORS as e:
+        raise SMTPDataInterrupted(f"Connection lost during DATA: {e!r}") from e
+    if code != 250:
+        raise smtplib.SMTPDataError(code, resp)
+    return refused
+
+
+def _data_chunks(message_file):
+    """The DATA section of a message file: dot-stuffed, CRLF, terminated, in chunks"""
+    message_file.seek(0)
+    buffer = bytearray()
+    for line in message_file:
+        line = line.rstrip(b"\r\n")
+        if line.startswith(b"."):
+            line = b"." + line
+        buffer += line + b"\r\n"
+        if len(buffer) >= SEND_CHUNK_SIZE:
+            yield bytes(buffer)
+            buffer.clear()
+    buffer += b".\r\n"
+    yield bytes(buffer)
+
+
+async def _data_chunks_async(message_file):
+    """_data_chunks with each chunk read and dot-stuffed in a worker thread"""
+    chunks = _data_chunks(message_file)
+    while True:
+        # StopIteration can't cross the thread boundary, hence the default
+        chunk = await asyncio.to_thread(next, chunks, None)
+        if chunk is None:
+            return
+        yield chunk
+
+
+async def connect_async() -> AsyncSMTP:
+    """Open a logged-in asyncio SMTP connection"""
+    server = AsyncSMTP(settings.SMTP_HOST, settings.SMTP_PORT, timeout=SMTP_TIMEOUT)
+    await server.connect()
+    try:
         if settings.SMTP_USER:
             # Use STARTTLS if credentials provided
-            server = smtplib.SMTP(settings.SMTP_HOST, settings.SMTP_PORT)
-            server.starttls()
-            server.login(settings.SMTP_USER, settings.SMTP_PASS)
+            await server.starttls()
+            await server.login(settings.SMTP_USER, settings.SMTP_PASS)
+    except BaseException:
+        server.close()
+        raise
+    return server
+
+
+_async_pool: Optional[AsyncSMTPConnectionPool] = None
+
+
+def get_async_pool() -> Optional[AsyncSMTPConnectionPool]:
+    """The asyncio SMTP connection pool of the running event loop (None when pooling is disabled)"""
+    global _async_pool
+    if settings.SMTP_POOL_SIZE <= 0:
+        return None
+    if _async_pool is None or _async_pool.loop is not asyncio.get_running_loop():
+        _async_pool = AsyncSMTPConnectionPool(
+            connect_async,
+            size=settings.SMTP_POOL_SIZE,
+            idle_timeout=settings.SMTP_POOL_IDLE_TIMEOUT,
+            max_messages=settings.SMTP_POOL_MAX_MESSAGES,
+            check_after=settings.SMTP_POOL_CHECK_AFTER,
+            acquire_timeout=SMTP_TIMEOUT * 4
+        )
+    return _async_pool
+
+
+async def close_async_pool() -> None:
+    global _async_pool
+    if _async_pool is not None and _async_pool.loop is asyncio.get_running_loop():
+        await _async_pool.close()
+    _async_pool = None
+
+
+async def send_with_connection_async(send):
+    """Await send(server) on a pooled asyncio connection, or a fresh one if pooling is off"""
+    pool = get_async_pool()
+    if pool is not None:
+        return await pool.send(send)
+
+    server = await connect_async()
+    try:
+        return await send(server)
+    finally:
+        try:
+            await server.quit()
+        except smtplib.SMTPException:
+            server.close()
+
+
+async def send_mail_async(
+    to_email: str,
+    subject: str,
+    body: str,
+    cc_emails: Optional[list] = None,
+    bcc_emails: Optional[list] = None,
+    attachments: Optional[list] = None,
+    in_reply_to: Optional[str] = None
+) -> Optional[str]:
+    """
+    send_mail over asyncio SMTP, for async handlers: same arguments and
+    result (Message-ID, or None on failure). Messages with attachments
+    are built in a worker thread since that reads and encodes the files.
+    """
+    try:
+        build = functools.partial(
+            build_message, to_email, subject, body, cc_emails, in_reply_to, attachments
+        )
+        if attachments:
+            message_id, message_file = await asyncio.to_thread(build)
         else:
-            # No authentication (for Mailhog)
-            server = smtplib.SMTP(settings.SMTP_HOST, settings.SMTP_PORT)
-        
+            message_id, message_file = build()
+
         # Prepare all recipients (To + CC + BCC)
         all_recipients = [to_email]
         if cc_emails:
             all_recipients.extend(cc_emails)
         if bcc_emails:
             all_recipients.extend(bcc_emails)
-        
+
         # Send email
-        text = msg.as_string()
-        server.sendmail(settings.SMTP_FROM, all_recipients, text)
-        server.quit()
-        
+        with message_file:
+            await send_with_connection_async(
+                lambda server: server.sendmail_chunks(
+                    settings.SMTP_FROM, all_recipients, _data_chunks_async(message_file)
+                )
+            )
+
         logger.info(f"Email sent successfully to {to_email} (CC: {cc_emails}, BCC: {bcc_emails})")
         return message_id.strip('<>')  # Remove angle brackets
-        
+
     except Exception as e:
         logger.error(f"Failed to send email to {to_email}: {str(e)}")
-        return None 
\ No newline at end of file
+        return None
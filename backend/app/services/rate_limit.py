@@ -0,0 +1,134 @@
+"""
+Thread-safe token bucket rate limits for outgoing mail.
+
+TokenBucket keeps its state in memory and only limits one process.
+SharedTokenBucket keeps it in rate_limit_buckets, so every process
+drawing from the same key shares one limit.
+"""
+import threading
+import time
+from typing import Dict
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+from ..models import RateLimitBucket
+
+
+class TokenBucket:
+    """
+    `per_minute` tokens per minute with bursts of up to one second's worth.
+    reserve() books the next token and returns how long to wait for it, so
+    concurrent callers are spread out instead of all retrying at once.
+    """
+
+    def __init__(self, per_minute: float):
+        self.rate = per_minute / 60.0
+        self.capacity = max(1.0, self.rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+
+class SharedTokenBucket:
+    """
+    TokenBucket whose state is a rate_limit_buckets row. Each reservation
+    is one short transaction that locks the row, refills it and books a
+    token, so the limit holds across processes and process restarts.
+    """
+
+    def __init__(self, key: str, per_minute: float):
+        self.key = key
+        self.rate = per_minute / 60.0
+        self.capacity = max(1.0, self.rate)
+
+    def reserve(self) -> float:
+        from ..db import SessionLocal
+
+        db = SessionLocal()
+        try:
+            while True:
+                connection = db.connection()
+                row = connection.execute(
+                    select(RateLimitBucket.tokens, RateLimitBucket.refilled_at)
+                    .where(RateLimitBucket.key == self.key)
+                    .with_for_update()
+                ).first()
+                now = time.time()
+
+                if row is None:
+                    tokens = self.capacity - 1
+                    try:
+                        connection.execute(insert(RateLimitBucket).values(
+                            key=self.key, tokens=tokens, refilled_at=now
+                        ))
+                        db.commit()
+                    except IntegrityError:
+                        # Another process created the row first: lock theirs
+                        db.rollback()
+                        continue
+                else:
+                    # Clocks of different hosts may disagree slightly; never refill backwards
+                    elapsed = max(0.0, now - row.refilled_at)
+                    tokens = min(self.capacity, row.tokens + elapsed * self.rate) - 1
+                    connection.execute(
+                        update(RateLimitBucket)
+                        .where(RateLimitBucket.key == self.key)
+                        .values(tokens=tokens, refilled_at=now)
+                    )
+                    db.commit()
+
+                return 0.0 if tokens >= 0 else -tokens / self.rate
+        finally:
+            db.close()
+
+
+class RateLimiter:
+    """
+    A global limit plus a separate limit per key (0 = unlimited). With a
+    `shared_name` the buckets live in the database under that name and
+    are shared by every process; otherwise they are per process.
+    """
+
+    def __init__(self, per_minute: float = 0, per_key_per_minute: float = 0, shared_name: str = None):
+        self.shared_name = shared_name
+        self._global = self._make_bucket("*", per_minute) if per_minute > 0 else None
+        self.per_key_per_minute = per_key_per_minute
+        self._buckets: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def _make_bucket(self, key: str, per_minute: float):
+        if self.shared_name:
+            return SharedTokenBucket(f"{self.shared_name}:{key}", per_minute)
+        return TokenBucket(per_minute)
+
+    def _bucket(self, key: str):
+        if self.per_key_per_minute <= 0:
+            return None
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = self._make_bucket(key, self.per_key_per_minute)
+            return bucket
+
+    def wait(self, key: str) -> float:
+        """Block until a send for `key` is allowed; returns the time waited"""
+        delay = 0.0
+        bucket = self._bucket(key)
+        if bucket is not None:
+            delay = bucket.reserve()
+        if self._global is not None:
+            delay = max(delay, self._global.reserve())
+        if delay > 0:
+            time.sleep(delay)
+        return delay
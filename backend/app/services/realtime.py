@@ -0,0 +1,368 @@
+"""
+Realtime push of inbox changes.
+
+Ticket writes are turned into events by a session hook, so every write
+path (process_email, reply, update, reassign, auto-assign) publishes
+without extra calls. Events reach connected clients through a fan-out:
+
+- "local": delivered in-process after commit. Only suitable when all
+  writers run in the API process.
+- "database": written to realtime_events in the writing transaction and
+  relayed by one poller per API process. Works across the IMAP worker
+  and several API workers.
+
+Other fan-outs (e.g. Redis pub/sub) only need stage/committed/rolled_back
+and an async run() loop.
+"""
+import asyncio
+import json
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import delete, event, func, insert, inspect, select
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..models import RealtimeEvent, Ticket, TicketMessage
+
+logger = logging.getLogger(__name__)
+
+# Event types
+TICKET_CREATED = "ticket_created"
+TICKET_ASSIGNED = "ticket_assigned"
+STATUS_CHANGED = "status_changed"
+NEW_MESSAGE = "new_message"
+SLA_BREACH = "sla_breach"
+PENDING_REMINDER = "pending_reminder"
+# Sent to a client whose queue overflowed; it should refetch
+RESYNC = "resync"
+
+SUBSCRIBER_QUEUE_SIZE = 100
+POLL_BATCH_SIZE = 500
+# How long the poller waits for a missing id (uncommitted or rolled back)
+GAP_TIMEOUT_SECONDS = 5.0
+CLEANUP_EVERY_POLLS = 60
+
+_PENDING_KEY = "realtime_pending_events"
+
+
+def _value(value):
+    return value.value if hasattr(value, "value") else value
+
+
+class Subscriber:
+    """One connected client and the events it is allowed to see"""
+
+    def __init__(self, user_id: int, is_admin: bool):
+        self.user_id = user_id
+        self.is_admin = is_admin
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.loop = asyncio.get_running_loop()
+
+    def wants(self, event: dict) -> bool:
+        if self.is_admin:
+            return True
+        return self.user_id in (event.get("assigned_to"), event.get("previous_assigned_to"))
+
+    def _put(self, event: dict) -> None:
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Slow client: drop what is queued and tell it to refetch
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait({"type": RESYNC})
+
+
+class Broker:
+    """In-process registry of subscribers. Safe to call from any thread."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers: set = set()
+
+    def subscribe(self, user_id: int, is_admin: bool) -> Subscriber:
+        subscriber = Subscriber(user_id, is_admin)
+        with self._lock:
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return len(self._subscribers)
+
+    def dispatch(self, events: List[dict]) -> None:
+        if not events:
+            return
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            for item in events:
+                if subscriber.wants(item):
+                    try:
+                        subscriber.loop.call_soon_threadsafe(subscriber._put, item)
+                    except RuntimeError:
+                        # Event loop already closed
+                        self.unsubscribe(subscriber)
+                        break
+
+
+broker = Broker()
+
+
+class LocalFanOut:
+    """Deliver events in-process once the writing transaction commits"""
+
+    def stage(self, session: Session, events: List[dict]) -> None:
+        session.info.setdefault(_PENDING_KEY, []).extend(events)
+
+    def committed(self, session: Session) -> None:
+        broker.dispatch(session.info.pop(_PENDING_KEY, []))
+
+    def rolled_back(self, session: Session) -> None:
+        session.info.pop(_PENDING_KEY, None)
+
+    async def run(self) -> None:
+        return None
+
+
+class DatabaseFanOut:
+    """Write events to the realtime_events outbox and poll it from each API process"""
+
+    def __init__(self):
+        self._floor: Optional[int] = None
+        self._seen: set = set()
+        self._gap_since: Optional[float] = None
+        self._polls = 0
+
+    def stage(self, session: Session, events: List[dict]) -> None:
+        session.connection().execute(insert(RealtimeEvent), [
+            {
+                "event_type": item["type"],
+                "ticket_id": item["ticket_id"],
+                "assigned_to": item.get("assigned_to"),
+                "previous_assigned_to": item.get("previous_assigned_to"),
+                "payload": json.dumps(item.get("data") or {}),
+            }
+            for item in events
+        ])
+
+    def committed(self, session: Session) -> None:
+        pass
+
+    def rolled_back(self, session: Session) -> None:
+        pass
+
+    async def run(self) -> None:
+        self._floor = await asyncio.to_thread(self._max_id)
+        logger.info(f"Realtime poller started after event {self._floor}")
+
+        while True:
+            await asyncio.sleep(settings.REALTIME_POLL_INTERVAL)
+            try:
+                events = await asyncio.to_thread(self._poll)
+                broker.dispatch(events)
+            except Exception as e:
+                logger.error(f"Realtime poll failed: {str(e)}")
+
+    def _max_id(self) -> int:
+        from ..db import SessionLocal
+
+        db = SessionLocal()
+        try:
+            return db.query(func.max(RealtimeEvent.id)).scalar() or 0
+        finally:
+            db.close()
+
+    def _poll(self) -> List[dict]:
+        from ..db import SessionLocal
+
+        events = []
+        db = SessionLocal()
+        try:
+            rows = db.execute(
+                select(RealtimeEvent)
+                .where(RealtimeEvent.id > self._floor)
+                .order_by(RealtimeEvent.id)
+                .limit(POLL_BATCH_SIZE)
+            ).scalars().all()
+
+            for row in rows:
+                if row.id in self._seen:
+                    continue
+                self._seen.add(row.id)
+                events.append({
+                    "id": row.id,
+                    "type": row.event_type,
+                    "ticket_id": row.ticket_id,
+                    "assigned_to": row.assigned_to,
+                    "previous_assigned_to": row.previous_assigned_to,
+                    "data": json.loads(row.payload) if row.payload else {},
+                    "at": row.created_at.isoformat() if row.created_at else None,
+                })
+
+            self._polls += 1
+            if self._polls % CLEANUP_EVERY_POLLS == 0:
+                cutoff = datetime.utcnow() - timedelta(minutes=settings.REALTIME_RETENTION_MINUTES)
+                db.execute(delete(RealtimeEvent).where(RealtimeEvent.created_at < cutoff))
+                db.commit()
+        finally:
+            db.close()
+
+        self._advance_floor()
+        return events
+
+    def _advance_floor(self) -> None:
+        """
+        Ids can commit out of order, so only move past ids that were
+        delivered. A missing id is given GAP_TIMEOUT_SECONDS to show up
+        before it is treated as rolled back.
+        """
+        while self._floor + 1 in self._seen:
+            self._floor += 1
+            self._seen.discard(self._floor)
+
+        if not self._seen:
+            self._gap_since = None
+            return
+
+        now = time.monotonic()
+        if self._gap_since is None:
+            self._gap_since = now
+        elif now - self._gap_since > GAP_TIMEOUT_SECONDS:
+            self._floor = min(self._seen) - 1
+            self._gap_since = None
+            self._advance_floor()
+
+
+FANOUTS = {
+    "local": LocalFanOut,
+    "database": DatabaseFanOut,
+}
+
+fanout = FANOUTS.get(settings.REALTIME_FANOUT, DatabaseFanOut)()
+
+_poller_task: Optional[asyncio.Task] = None
+
+
+def start() -> None:
+    """Start the fan-out loop (call from the API startup event)"""
+    global _poller_task
+    if _poller_task is None:
+        _poller_task = asyncio.get_running_loop().create_task(fanout.run())
+
+
+def stop() -> None:
+    global _poller_task
+    if _poller_task is not None:
+        _poller_task.cancel()
+        _poller_task = None
+
+
+def publish(session: Session, events: List[dict]) -> None:
+    """Publish events for writes that bypass the ORM (bulk UPDATEs)"""
+    if events:
+        fanout.stage(session, events)
+
+
+def format_sse(item: dict) -> str:
+    """Serialize an event as a Server-Sent Events frame"""
+    lines = []
+    if item.get("id") is not None:
+        lines.append(f"id: {item['id']}")
+    lines.append(f"event: {item['type']}")
+    lines.append(f"data: {json.dumps(item, default=str)}")
+    return "\n".join(lines) + "\n\n"
+
+
+def _collect_events(session: Session) -> List[dict]:
+    events = []
+    message_ticket_ids: Dict[int, TicketMessage] = {}
+
+    for obj in session.new:
+        if isinstance(obj, Ticket):
+            events.append({
+                "type": TICKET_CREATED,
+                "ticket_id": obj.id,
+                "assigned_to": obj.assigned_to,
+                "data": {
+                    "subject": obj.subject,
+                    "customer_email": obj.customer_email,
+                    "status": _value(obj.status),
+                },
+            })
+        elif isinstance(obj, TicketMessage):
+            message_ticket_ids[obj.id] = obj
+
+    for obj in session.dirty:
+        if not isinstance(obj, Ticket):
+            continue
+        state = inspect(obj)
+
+        history = state.attrs.assigned_to.history
+        if history.has_changes():
+            previous = history.deleted[0] if history.deleted else None
+            events.append({
+                "type": TICKET_ASSIGNED,
+                "ticket_id": obj.id,
+                "assigned_to": obj.assigned_to,
+                "previous_assigned_to": previous,
+                "data": {},
+            })
+
+        history = state.attrs.status.history
+        if history.has_changes():
+            previous = history.deleted[0] if history.deleted else None
+            events.append({
+                "type": STATUS_CHANGED,
+                "ticket_id": obj.id,
+                "assigned_to": obj.assigned_to,
+                "data": {"old": _value(previous), "new": _value(obj.status)},
+            })
+
+    if message_ticket_ids:
+        ticket_ids = {message.ticket_id for message in message_ticket_ids.values()}
+        assignees = dict(session.connection().execute(
+            select(Ticket.id, Ticket.assigned_to).where(Ticket.id.in_(ticket_ids))
+        ).all())
+        for message in message_ticket_ids.values():
+            events.append({
+                "type": NEW_MESSAGE,
+                "ticket_id": message.ticket_id,
+                "assigned_to": assignees.get(message.ticket_id),
+                "data": {"message_id": message.id, "direction": _value(message.direction)},
+            })
+
+    return events
+
+
+# Load the old value on set even when the attribute was expired, so
+# events can report the previous assignee and status
+@event.listens_for(Ticket.assigned_to, "set", active_history=True)
+@event.listens_for(Ticket.status, "set", active_history=True)
+def _keep_previous_value(target, value, oldvalue, initiator):
+    return value
+
+
+@event.listens_for(Session, "after_flush")
+def _stage_events(session, flush_context):
+    events = _collect_events(session)
+    if events:
+        fanout.stage(session, events)
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_events(session):
+    fanout.committed(session)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_events(session):
+    fanout.rolled_back(session)
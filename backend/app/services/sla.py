@@ -0,0 +1,375 @@
+"""
+SLA timers per ticket.
+
+Deadlines are stored in ticket_sla and recomputed from a flush hook
+whenever a ticket or its messages change:
+
+- first response: SLA_FIRST_RESPONSE_HOURS after creation, met by the
+  first outbound message
+- resolution: SLA_RESOLUTION_HOURS after creation, met by closing
+- pending reminder: SLA_PENDING_REMINDER_HOURS after the last update of
+  a Pending ticket
+
+SLAScheduler loads upcoming deadlines (indexed range read on
+next_due_at) into a timer wheel and fires breach / reminder events when
+their slot comes up. Firing claims the timer with a locked conditional
+UPDATE, so each timer fires once even with several API processes.
+"""
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import and_, bindparam, event, func, insert, select, update
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..models import Ticket, TicketMessage, TicketSLA, TicketEvent, TicketStatus, MsgDir
+from . import etags, realtime
+
+logger = logging.getLogger(__name__)
+
+REBUILD_CHUNK_SIZE = 500
+FIRE_CHUNK_SIZE = 500
+REFILL_HORIZON = timedelta(minutes=10)
+REFILL_LIMIT = 5000
+WHEEL_SLOTS = 64
+
+# Timer kinds
+FIRST_RESPONSE = "first_response"
+RESOLUTION = "resolution"
+PENDING_REMINDER = "pending_reminder"
+
+# TicketEvent.event_type / realtime event type per kind
+KIND_EVENT_TYPES = {
+    FIRST_RESPONSE: realtime.SLA_BREACH,
+    RESOLUTION: realtime.SLA_BREACH,
+    PENDING_REMINDER: realtime.PENDING_REMINDER,
+}
+
+_COMPUTED_COLUMNS = (
+    "first_response_due_at", "first_responded_at", "resolution_due_at", "resolved_at",
+    "pending_reminder_due_at", "pending_reminded_at", "next_due_at",
+)
+
+
+def _compute(row) -> dict:
+    """Deadlines for one ticket, keeping timers that already fired"""
+    first_response_due_at = resolution_due_at = None
+    if row.created_at:
+        first_response_due_at = row.created_at + timedelta(hours=settings.SLA_FIRST_RESPONSE_HOURS)
+        resolution_due_at = row.created_at + timedelta(hours=settings.SLA_RESOLUTION_HOURS)
+
+    resolved_at = row.updated_at if row.status == TicketStatus.Closed else None
+
+    pending_reminder_due_at = None
+    if row.status == TicketStatus.Pending and row.updated_at:
+        pending_reminder_due_at = row.updated_at + timedelta(hours=settings.SLA_PENDING_REMINDER_HOURS)
+    # A new pending period gets its own reminder
+    pending_reminded_at = (
+        row.pending_reminded_at if pending_reminder_due_at == row.old_reminder_due_at else None
+    )
+
+    candidates = []
+    if first_response_due_at and row.first_outbound_at is None and row.first_response_breached_at is None:
+        candidates.append(first_response_due_at)
+    if resolution_due_at and resolved_at is None and row.resolution_breached_at is None:
+        candidates.append(resolution_due_at)
+    if pending_reminder_due_at and pending_reminded_at is None:
+        candidates.append(pending_reminder_due_at)
+
+    return {
+        "first_response_due_at": first_response_due_at,
+        "first_responded_at": row.first_outbound_at,
+        "resolution_due_at": resolution_due_at,
+        "resolved_at": resolved_at,
+        "pending_reminder_due_at": pending_reminder_due_at,
+        "pending_reminded_at": pending_reminded_at,
+        "next_due_at": min(candidates) if candidates else None,
+    }
+
+
+def refresh_tickets(connection, ticket_ids: Iterable[int]) -> None:
+    """Recompute ticket_sla rows for the given tickets on `connection`"""
+    ticket_ids = sorted({tid for tid in ticket_ids if tid is not None})
+    if not ticket_ids:
+        return
+
+    first_outbound_at = (
+        select(func.min(TicketMessage.sent_at))
+        .where(TicketMessage.ticket_id == Ticket.id, TicketMessage.direction == MsgDir.outbound)
+        .scalar_subquery()
+    )
+    rows = connection.execute(
+        select(
+            Ticket.id,
+            Ticket.status,
+            Ticket.created_at,
+            Ticket.updated_at,
+            first_outbound_at.label("first_outbound_at"),
+            TicketSLA.ticket_id.label("sla_ticket_id"),
+            TicketSLA.first_response_breached_at,
+            TicketSLA.resolution_breached_at,
+            TicketSLA.pending_reminder_due_at.label("old_reminder_due_at"),
+            TicketSLA.pending_reminded_at,
+        )
+        .outerjoin(TicketSLA, TicketSLA.ticket_id == Ticket.id)
+        .where(Ticket.id.in_(ticket_ids))
+    ).all()
+
+    inserts, updates = [], []
+    for row in rows:
+        values = _compute(row)
+        if row.sla_ticket_id is None:
+            inserts.append({"ticket_id": row.id, **values})
+        else:
+            updates.append({"b_ticket_id": row.id, **{f"b_{k}": v for k, v in values.items()}})
+
+    if inserts:
+        connection.execute(insert(TicketSLA), inserts)
+    if updates:
+        connection.execute(
+            update(TicketSLA)
+            .where(TicketSLA.ticket_id == bindparam("b_ticket_id"))
+            .values({column: bindparam(f"b_{column}") for column in _COMPUTED_COLUMNS}),
+            updates
+        )
+
+
+def rebuild_all(db: Session) -> int:
+    """Recompute SLA rows for every ticket in chunks. Returns number of tickets processed."""
+    processed = 0
+    last_id = 0
+
+    while True:
+        ids = [
+            tid for (tid,) in db.query(Ticket.id)
+            .filter(Ticket.id > last_id)
+            .order_by(Ticket.id)
+            .limit(REBUILD_CHUNK_SIZE)
+            .all()
+        ]
+        if not ids:
+            break
+
+        refresh_tickets(db.connection(), ids)
+        db.commit()
+
+        processed += len(ids)
+        last_id = ids[-1]
+        logger.info(f"ticket_sla rebuilt up to ticket {last_id} ({processed} tickets)")
+
+    return processed
+
+
+def ensure_populated(db: Session) -> None:
+    """Backfill SLA rows if the table is empty but tickets exist"""
+    has_rows = db.query(TicketSLA.ticket_id).limit(1).first()
+    has_tickets = db.query(Ticket.id).limit(1).first()
+    if has_tickets and not has_rows:
+        logger.info("ticket_sla is empty, rebuilding from tickets")
+        rebuild_all(db)
+
+
+def _due_conditions(now: datetime) -> Dict[str, tuple]:
+    """kind -> (fired-at column, condition for an unfired timer that is due)"""
+    return {
+        FIRST_RESPONSE: (TicketSLA.first_response_breached_at, and_(
+            TicketSLA.first_response_due_at <= now,
+            TicketSLA.first_responded_at.is_(None),
+            TicketSLA.first_response_breached_at.is_(None),
+        )),
+        RESOLUTION: (TicketSLA.resolution_breached_at, and_(
+            TicketSLA.resolution_due_at <= now,
+            TicketSLA.resolved_at.is_(None),
+            TicketSLA.resolution_breached_at.is_(None),
+        )),
+        PENDING_REMINDER: (TicketSLA.pending_reminded_at, and_(
+            TicketSLA.pending_reminder_due_at <= now,
+            TicketSLA.pending_reminded_at.is_(None),
+        )),
+    }
+
+
+def fire_due(db: Session, ticket_ids: List[int], now: datetime) -> int:
+    """
+    Fire every due, unfired timer of the given tickets. The locking read
+    makes concurrent schedulers skip timers another one already claimed.
+    Returns the number of timers fired; the caller commits.
+    """
+    connection = db.connection()
+    ticket_events = []
+    push = []
+
+    for kind, (fired_column, condition) in _due_conditions(now).items():
+        claimed = connection.execute(
+            select(TicketSLA.ticket_id, Ticket.assigned_to)
+            .join(Ticket, Ticket.id == TicketSLA.ticket_id)
+            .where(TicketSLA.ticket_id.in_(ticket_ids), condition)
+            .with_for_update(of=TicketSLA)
+        ).all()
+        if not claimed:
+            continue
+
+        connection.execute(
+            update(TicketSLA)
+            .where(TicketSLA.ticket_id.in_([row.ticket_id for row in claimed]))
+            .values({fired_column: now})
+        )
+
+        event_type = KIND_EVENT_TYPES[kind]
+        for row in claimed:
+            ticket_events.append({
+                "ticket_id": row.ticket_id,
+                "event_type": event_type,
+                "old_value": None,
+                "new_value": kind,
+            })
+            push.append({
+                "type": event_type,
+                "ticket_id": row.ticket_id,
+                "assigned_to": row.assigned_to,
+                "data": {"kind": kind},
+            })
+
+    if ticket_events:
+        connection.execute(insert(TicketEvent), ticket_events)
+        etags.stage(db, [etags.TICKET_EVENTS])
+        realtime.publish(db, push)
+
+    # Move next_due_at past the timers that fired (or went stale)
+    refresh_tickets(connection, ticket_ids)
+    return len(ticket_events)
+
+
+class TimerWheel:
+    """
+    Hashed timer wheel: keys sit in slot (due_tick % slots) and fire when
+    the wheel's current tick reaches their due tick. Scheduling and firing
+    are O(1) per key; keys more than one revolution out stay in their slot
+    until their own tick comes around.
+    """
+
+    EPOCH = datetime(1970, 1, 1)
+
+    def __init__(self, tick_seconds: int, slots: int = WHEEL_SLOTS):
+        self.tick_seconds = tick_seconds
+        self.slots = slots
+        self._buckets: List[Dict[int, int]] = [{} for _ in range(slots)]
+        self._scheduled: Dict[int, int] = {}
+        self._current_tick: Optional[int] = None
+
+    def _tick_of(self, when: datetime) -> int:
+        if when.tzinfo is not None:
+            when = when.replace(tzinfo=None)
+        return int((when - self.EPOCH).total_seconds() // self.tick_seconds)
+
+    def __len__(self) -> int:
+        return len(self._scheduled)
+
+    def schedule(self, key: int, when: datetime) -> None:
+        tick = self._tick_of(when)
+        if self._current_tick is not None:
+            tick = max(tick, self._current_tick)
+        if self._scheduled.get(key) == tick:
+            return
+        self.cancel(key)
+        self._scheduled[key] = tick
+        self._buckets[tick % self.slots][key] = tick
+
+    def cancel(self, key: int) -> None:
+        tick = self._scheduled.pop(key, None)
+        if tick is not None:
+            self._buckets[tick % self.slots].pop(key, None)
+
+    def advance(self, now: datetime) -> List[int]:
+        """Move the wheel up to `now` and return the keys that are due"""
+        target = self._tick_of(now)
+        if self._current_tick is None:
+            self._current_tick = min([target] + list(self._scheduled.values()))
+
+        fired = []
+        # A full revolution visits every slot; further ticks add nothing
+        start = max(self._current_tick, target - self.slots + 1)
+        for tick in range(start, target + 1):
+            bucket = self._buckets[tick % self.slots]
+            for key, due_tick in list(bucket.items()):
+                if due_tick <= target:
+                    fired.append(key)
+                    del bucket[key]
+                    del self._scheduled[key]
+        self._current_tick = target + 1
+        return fired
+
+
+class SLAScheduler:
+    """Feeds the timer wheel from ticket_sla.next_due_at and fires due timers"""
+
+    def __init__(self, tick_seconds: int = None):
+        self.wheel = TimerWheel(tick_seconds or settings.SLA_TICK_SECONDS)
+        self._next_refill: Optional[datetime] = None
+
+    def _refill(self, db: Session, now: datetime) -> None:
+        rows = db.execute(
+            select(TicketSLA.ticket_id, TicketSLA.next_due_at)
+            .where(TicketSLA.next_due_at <= now + REFILL_HORIZON)
+            .order_by(TicketSLA.next_due_at)
+            .limit(REFILL_LIMIT)
+        ).all()
+        for ticket_id, due_at in rows:
+            self.wheel.schedule(ticket_id, due_at)
+
+        # A full batch means a backlog (e.g. after downtime): refill again next tick
+        self._next_refill = now if len(rows) == REFILL_LIMIT else now + REFILL_HORIZON / 2
+
+    def tick(self, now: datetime = None) -> int:
+        """Run one scheduler step. Returns the number of timers fired."""
+        from ..db import SessionLocal
+
+        now = now or datetime.utcnow()
+        fired = 0
+        db = SessionLocal()
+        try:
+            if self._next_refill is None or now >= self._next_refill:
+                self._refill(db, now)
+                db.commit()
+
+            due = self.wheel.advance(now)
+            for start in range(0, len(due), FIRE_CHUNK_SIZE):
+                fired += fire_due(db, due[start:start + FIRE_CHUNK_SIZE], now)
+                db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"SLA tick failed: {str(e)}")
+            # Reload from the table next tick instead of losing the popped timers
+            self._next_refill = None
+        finally:
+            db.close()
+
+        if fired:
+            logger.info(f"SLA timers fired: {fired}")
+        return fired
+
+
+@event.listens_for(Session, "after_flush")
+def _sync_ticket_sla(session, flush_context):
+    ticket_ids = set()
+
+    for obj in session.new | session.dirty:
+        if isinstance(obj, Ticket) and obj not in session.deleted:
+            ticket_ids.add(obj.id)
+        elif isinstance(obj, TicketMessage):
+            ticket_ids.add(obj.ticket_id)
+
+    if ticket_ids:
+        refresh_tickets(session.connection(), ticket_ids)
+
+
+if __name__ == "__main__":
+    from ..db import SessionLocal
+
+    db = SessionLocal()
+    try:
+        total = rebuild_all(db)
+        print("ticket_sla rebuilt for", total, "tickets")
+    finally:
+        db.close()
@@ -0,0 +1,291 @@
+"""
+Pools of logged-in SMTP connections: SMTPConnectionPool (thread-safe, for
+smtplib) and AsyncSMTPConnectionPool (asyncio, for AsyncSMTP).
+
+Connecting, STARTTLS and LOGIN cost more than sending a typical mail, so
+connections are kept open and reused:
+
+- at most `size` connections exist at once; callers wait for a free one
+- idle connections are reused most-recently-used first and closed after
+  `idle_timeout` seconds
+- a connection idle for more than `check_after` seconds is checked with
+  NOOP before reuse
+- a connection is closed after `max_messages` mails
+- if a reused connection turns out to be dead before the message data
+  was sent, the send is retried once on a fresh connection. Send
+  callables raise SMTPDataInterrupted for failures after DATA, since the
+  relay may already have accepted the message.
+"""
+import asyncio
+import logging
+import smtplib
+import threading
+import time
+from typing import Awaitable, Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Errors after which the connection is unusable and the send may be retried
+DISCONNECT_ERRORS = (smtplib.SMTPServerDisconnected, ConnectionError, TimeoutError)
+# Errors that leave the connection usable (the transaction was reset)
+TRANSACTION_ERRORS = (smtplib.SMTPSenderRefused, smtplib.SMTPRecipientsRefused)
+
+
+class SMTPDataInterrupted(smtplib.SMTPException):
+    """
+    The connection failed after DATA was accepted. The message may have
+    been delivered, so it is not retried (that could send it twice).
+    """
+
+
+class PooledConnection:
+    def __init__(self, server):
+        self.server = server
+        self.messages = 0
+        self.last_used = time.monotonic()
+
+    def close(self) -> None:
+        try:
+            self.server.quit()
+        except Exception:
+            try:
+                self.server.close()
+            except Exception:
+                pass
+
+    async def aclose(self) -> None:
+        try:
+            await asyncio.wait_for(self.server.quit(), 5)
+        except Exception:
+            self.server.close()
+
+
+class SMTPConnectionPool:
+    def __init__(
+        self,
+        connect: Callable[[], smtplib.SMTP],
+        size: int,
+        idle_timeout: float,
+        max_messages: int,
+        check_after: float,
+        acquire_timeout: Optional[float] = None
+    ):
+        self._connect = connect
+        self.size = size
+        self.idle_timeout = idle_timeout
+        self.max_messages = max_messages
+        self.check_after = check_after
+        self.acquire_timeout = acquire_timeout
+
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(size)
+        self._idle: List[PooledConnection] = []
+        self.stats = {"connects": 0, "reuses": 0, "reconnects": 0, "noop_failures": 0}
+
+    def _take_idle(self) -> Optional[PooledConnection]:
+        """Pop the most recently used idle connection that is still healthy"""
+        while True:
+            with self._lock:
+                expired = self._expire_idle()
+                conn = self._idle.pop() if self._idle else None
+            for old in expired:
+                old.close()
+            if conn is None:
+                return None
+
+            if time.monotonic() - conn.last_used > self.check_after:
+                try:
+                    code, _ = conn.server.noop()
+                except Exception:
+                    code = None
+                if code != 250:
+                    self._count("noop_failures")
+                    conn.close()
+                    continue
+
+            self._count("reuses")
+            return conn
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self.stats[name] += 1
+
+    def _expire_idle(self) -> List[PooledConnection]:
+        """Remove idle connections past idle_timeout (caller holds the lock)"""
+        cutoff = time.monotonic() - self.idle_timeout
+        expired = [conn for conn in self._idle if conn.last_used < cutoff]
+        if expired:
+            self._idle = [conn for conn in self._idle if conn.last_used >= cutoff]
+        return expired
+
+    def _new_connection(self) -> PooledConnection:
+        self._count("connects")
+        return PooledConnection(self._connect())
+
+    def _release(self, conn: PooledConnection) -> None:
+        conn.messages += 1
+        conn.last_used = time.monotonic()
+        if conn.messages >= self.max_messages:
+            conn.close()
+            return
+        with self._lock:
+            self._idle.append(conn)
+
+    def send(self, send: Callable[[smtplib.SMTP], object]):
+        """
+        Run `send(server)` on a pooled connection and return its result.
+        If a reused connection was dropped by the server, `send` is retried
+        on a fresh one, so it must raise SMTPDataInterrupted instead of a
+        disconnect error once DATA has been accepted.
+        """
+        if not self._slots.acquire(timeout=self.acquire_timeout):
+            raise TimeoutError("No SMTP connection available")
+        try:
+            conn = self._take_idle()
+            reused = conn is not None
+            if conn is None:
+                conn = self._new_connection()
+
+            try:
+                result = send(conn.server)
+            except DISCONNECT_ERRORS as e:
+                conn.close()
+                if not reused:
+                    raise
+                logger.info(f"Pooled SMTP connection dropped ({e.__class__.__name__}), reconnecting")
+                self._count("reconnects")
+                conn = self._new_connection()
+                try:
+                    result = send(conn.server)
+                except TRANSACTION_ERRORS:
+                    self._release(conn)
+                    raise
+                except Exception:
+                    conn.close()
+                    raise
+            except TRANSACTION_ERRORS:
+                self._release(conn)
+                raise
+            except Exception:
+                conn.close()
+                raise
+
+            self._release(conn)
+            return result
+        finally:
+            self._slots.release()
+
+    def close(self) -> None:
+        """Close all idle connections"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+
+class AsyncSMTPConnectionPool:
+    """
+    SMTPConnectionPool for AsyncSMTP connections. Same limits and
+    behaviour; bound to the event loop it was created on.
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], Awaitable],
+        size: int,
+        idle_timeout: float,
+        max_messages: int,
+        check_after: float,
+        acquire_timeout: Optional[float] = None
+    ):
+        self._connect = connect
+        self.size = size
+        self.idle_timeout = idle_timeout
+        self.max_messages = max_messages
+        self.check_after = check_after
+        self.acquire_timeout = acquire_timeout
+
+        self.loop = asyncio.get_running_loop()
+        self._slots = asyncio.Semaphore(size)
+        self._idle: List[PooledConnection] = []
+        self.stats = {"connects": 0, "reuses": 0, "reconnects": 0, "noop_failures": 0}
+
+    async def _take_idle(self) -> Optional[PooledConnection]:
+        """Pop the most recently used idle connection that is still healthy"""
+        cutoff = time.monotonic() - self.idle_timeout
+        expired = [conn for conn in self._idle if conn.last_used < cutoff]
+        if expired:
+            self._idle = [conn for conn in self._idle if conn.last_used >= cutoff]
+            for old in expired:
+                await old.aclose()
+
+        while self._idle:
+            conn = self._idle.pop()
+            if time.monotonic() - conn.last_used > self.check_after:
+                try:
+                    code, _ = await conn.server.noop()
+                except Exception:
+                    code = None
+                if code != 250:
+                    self.stats["noop_failures"] += 1
+                    await conn.aclose()
+                    continue
+
+            self.stats["reuses"] += 1
+            return conn
+        return None
+
+    async def _new_connection(self) -> PooledConnection:
+        self.stats["connects"] += 1
+        return PooledConnection(await self._connect())
+
+    async def _release(self, conn: PooledConnection) -> None:
+        conn.messages += 1
+        conn.last_used = time.monotonic()
+        if conn.messages >= self.max_messages:
+            await conn.aclose()
+            return
+        self._idle.append(conn)
+
+    async def _send_once(self, conn: PooledConnection, send):
+        try:
+            result = await send(conn.server)
+        except TRANSACTION_ERRORS:
+            await self._release(conn)
+            raise
+        except BaseException:
+            # Includes cancellation: the conversation state is unknown
+            conn.server.close()
+            raise
+        await self._release(conn)
+        return result
+
+    async def send(self, send: Callable[[object], Awaitable]):
+        """
+        Await `send(server)` on a pooled connection and return its result,
+        retrying once on a fresh connection if a reused one was dropped
+        before DATA (see SMTPConnectionPool.send).
+        """
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.acquire_timeout)
+        except asyncio.TimeoutError:
+            raise TimeoutError("No SMTP connection available")
+        try:
+            conn = await self._take_idle()
+            if conn is None:
+                return await self._send_once(await self._new_connection(), send)
+
+            try:
+                return await self._send_once(conn, send)
+            except DISCONNECT_ERRORS as e:
+                logger.info(f"Pooled SMTP connection dropped ({e.__class__.__name__}), reconnecting")
+                self.stats["reconnects"] += 1
+                return await self._send_once(await self._new_connection(), send)
+        finally:
+            self._slots.release()
+
+    async def close(self) -> None:
+        """Close all idle connections"""
+        idle, self._idle = self._idle, []
+        for conn in idle:
+            await conn.aclose()
@@ -0,0 +1,177 @@
+"""
+Email template rendering.
+
+Templates use {variable} placeholders; names are case-insensitive, so
+{customer_name} and {CUSTOMER_NAME} are the same variable. Unknown
+placeholders are left as they are. A template is parsed once into
+literal / variable parts and rendered in a single pass.
+
+Parsed EmailTemplate rows are cached by (id, updated_at), so a template
+edited by another process is picked up on the next render. Edits in this
+process also drop the entry directly (updated_at has second resolution).
+"""
+import re
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from ..models import EmailTemplate
+
+PLACEHOLDER_RE = re.compile(r"\{([A-Za-z_][A-Za-z0-9_]*)\}")
+
+TEMPLATE_CACHE_SIZE = 256
+
+
+class CompiledTemplate:
+    """
+    A template split once into literal parts and placeholder slots.
+    Rendering looks up each distinct variable once, fills the slots and
+    joins the parts in one pass.
+    """
+
+    __slots__ = ("source", "variables", "_parts", "_slots", "_names")
+
+    def __init__(self, source: str):
+        self.source = source
+        self._parts: List[str] = []
+        # (index in _parts, index in _names) for each placeholder
+        self._slots: List[Tuple[int, int]] = []
+
+        names: Dict[str, int] = {}
+        position = 0
+        for match in PLACEHOLDER_RE.finditer(source):
+            self._parts.append(source[position:match.start()])
+            index = names.setdefault(match.group(1), len(names))
+            self._slots.append((len(self._parts), index))
+            self._parts.append(match.group(0))
+            position = match.end()
+        self._parts.append(source[position:])
+
+        # (name as written, lookup name) for each distinct placeholder
+        self._names = tuple((written, written.lower()) for written in names)
+        self.variables = {name for _, name in self._names}
+
+    def render(self, variables: Dict[str, object]) -> str:
+        if not self._slots:
+            return self.source
+
+        values = []
+        for written, name in self._names:
+            value = variables.get(name)
+            values.append("{" + written + "}" if value is None else str(value))
+
+        parts = self._parts[:]
+        for position, index in self._slots:
+            parts[position] = values[index]
+        return "".join(parts)
+
+
+@lru_cache(maxsize=1024)
+def compile_template(source: str) -> CompiledTemplate:
+    """Parse template text (cached by the text itself; for fixed or shared texts)"""
+    return CompiledTemplate(source or "")
+
+
+def render(source: str, variables: Dict[str, object]) -> str:
+    """Render one-off text without caching its parse"""
+    return CompiledTemplate(source or "").render(variables)
+
+
+def render_batch(template, variables_list: Iterable[Dict[str, object]]) -> List[str]:
+    """Render one template (text or compiled) for many variable sets"""
+    if not isinstance(template, CompiledTemplate):
+        template = compile_template(template)
+    return [template.render(variables) for variables in variables_list]
+
+
+class _TemplateCache:
+    """LRU of (subject, body) CompiledTemplates keyed by template id and updated_at"""
+
+    def __init__(self, size: int):
+        self.size = size
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[int, tuple]" = OrderedDict()
+
+    def get(self, template_id: int, updated_at) -> Optional[tuple]:
+        with self._lock:
+            entry = self._entries.get(template_id)
+            if entry is None or entry[0] != updated_at:
+                return None
+            self._entries.move_to_end(template_id)
+            return entry[1]
+
+    def discard(self, template_id: int) -> None:
+        with self._lock:
+            self._entries.pop(template_id, None)
+
+    def put(self, template_id: int, updated_at, compiled: tuple) -> None:
+        with self._lock:
+            self._entries[template_id] = (updated_at, compiled)
+            self._entries.move_to_end(template_id)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+
+_cache = _TemplateCache(TEMPLATE_CACHE_SIZE)
+
+
+def get_template(db: Session, template_id: int) -> Optional[Tuple[CompiledTemplate, CompiledTemplate]]:
+    """
+    Compiled (subject, body) of an EmailTemplate, or None if it doesn't
+    exist. A cache hit costs one primary key lookup of updated_at; the
+    body is only loaded and parsed when the template changed.
+    """
+    updated_at = (
+        db.query(EmailTemplate.updated_at)
+        .filter(EmailTemplate.id == template_id)
+        .first()
+    )
+    if updated_at is None:
+        return None
+    updated_at = updated_at[0]
+
+    compiled = _cache.get(template_id, updated_at)
+    if compiled is None:
+        row = (
+            db.query(EmailTemplate.subject, EmailTemplate.body)
+            .filter(EmailTemplate.id == template_id)
+            .first()
+        )
+        if row is None:
+            return None
+        compiled = (CompiledTemplate(row.subject or ""), CompiledTemplate(row.body or ""))
+        _cache.put(template_id, updated_at, compiled)
+    return compiled
+
+
+@event.listens_for(Session, "after_flush")
+def _invalidate_templates(session, flush_context):
+    for obj in session.dirty | session.deleted:
+        if isinstance(obj, EmailTemplate):
+            _cache.discard(obj.id)
+
+
+def ticket_variables(ticket, adviser=None) -> Dict[str, object]:
+    """Standard variables for mails about a ticket"""
+    variables = {
+        "ticket_id": ticket.id,
+        "customer_name": ticket.customer_name or ticket.customer_email.split('@')[0],
+        "customer_email": ticket.customer_email,
+        "subject": ticket.subject,
+    }
+    if adviser is not None:
+        variables["adviser_name"] = adviser.name
+    return variables
+
+
+def recipient_variables(email: str) -> Dict[str, object]:
+    """Variables for mails that only know the recipient (bulk mail)"""
+    return {
+        "email": email,
+        "customer_email": email,
+        "customer_name": email.split('@')[0],
+    }
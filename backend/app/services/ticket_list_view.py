@@ -0,0 +1,205 @@
+import logging
+from typing import Iterable
+
+from sqlalchemy import delete, event, func, insert, inspect, select, update
+from sqlalchemy.orm import Session
+
+from ..models import (
+    Ticket, TicketMessage, TicketListView, User, MsgDir,
+    CategoryLanguage, CategoryVOC, CategoryPriority
+)
+
+logger = logging.getLogger(__name__)
+
+REBUILD_CHUNK_SIZE = 500
+
+
+def _projection_select():
+    """Build the SELECT that computes ticket_list_view rows from the base tables"""
+    message_count = (
+        select(func.count(TicketMessage.id))
+        .where(TicketMessage.ticket_id == Ticket.id)
+        .scalar_subquery()
+    )
+    last_message_at = (
+        select(func.max(TicketMessage.sent_at))
+        .where(TicketMessage.ticket_id == Ticket.id)
+        .scalar_subquery()
+    )
+    last_inbound_at = (
+        select(func.max(TicketMessage.sent_at))
+        .where(
+            TicketMessage.ticket_id == Ticket.id,
+            TicketMessage.direction == MsgDir.inbound
+        )
+        .scalar_subquery()
+    )
+    # Precomputed per message, so the body blob is never read here
+    last_message_snippet = (
+        select(TicketMessage.snippet)
+        .where(TicketMessage.ticket_id == Ticket.id)
+        .order_by(TicketMessage.sent_at.desc(), TicketMessage.id.desc())
+        .limit(1)
+        .scalar_subquery()
+    )
+
+    return (
+        select(
+            Ticket.id.label("ticket_id"),
+            Ticket.customer_email,
+            Ticket.customer_name,
+            Ticket.subject,
+            Ticket.status,
+            Ticket.channel,
+            Ticket.assigned_to,
+            User.name.label("assigned_user_name"),
+            User.email.label("assigned_user_email"),
+            User.role.label("assigned_user_role"),
+            Ticket.language_id,
+            CategoryLanguage.name.label("language_name"),
+            Ticket.voc_id,
+            CategoryVOC.name.label("voc_name"),
+            Ticket.priority_id,
+            CategoryPriority.name.label("priority_name"),
+            CategoryPriority.weight.label("priority_weight"),
+            message_count.label("message_count"),
+            last_message_snippet.label("last_message_snippet"),
+            last_message_at.label("last_message_at"),
+            last_inbound_at.label("last_inbound_at"),
+            Ticket.created_at,
+            Ticket.updated_at,
+        )
+        .select_from(Ticket)
+        .outerjoin(User, User.id == Ticket.assigned_to)
+        .outerjoin(CategoryLanguage, CategoryLanguage.id == Ticket.language_id)
+        .outerjoin(CategoryVOC, CategoryVOC.id == Ticket.voc_id)
+        .outerjoin(CategoryPriority, CategoryPriority.id == Ticket.priority_id)
+    )
+
+
+def refresh_tickets(connection, ticket_ids: Iterable[int]) -> None:
+    """Recompute projection rows for the given tickets on `connection`"""
+    ticket_ids = sorted({tid for tid in ticket_ids if tid is not None})
+    if not ticket_ids:
+        return
+
+    rows = [
+        dict(row) for row in
+        connection.execute(_projection_select().where(Ticket.id.in_(ticket_ids))).mappings()
+    ]
+
+    connection.execute(delete(TicketListView).where(TicketListView.ticket_id.in_(ticket_ids)))
+    if rows:
+        connection.execute(insert(TicketListView), rows)
+
+
+def rebuild_all(db: Session) -> int:
+    """Rebuild the whole projection in chunks. Returns number of tickets processed."""
+    processed = 0
+    last_id = 0
+
+    while True:
+        ids = [
+            tid for (tid,) in db.query(Ticket.id)
+            .filter(Ticket.id > last_id)
+            .order_by(Ticket.id)
+            .limit(REBUILD_CHUNK_SIZE)
+            .all()
+        ]
+        if not ids:
+            break
+
+        refresh_tickets(db.connection(), ids)
+        db.commit()
+
+        processed += len(ids)
+        last_id = ids[-1]
+        logger.info(f"ticket_list_view rebuilt up to ticket {last_id} ({processed} tickets)")
+
+    # Remove rows of tickets that no longer exist
+    db.execute(
+        delete(TicketListView).where(
+            ~TicketListView.ticket_id.in_(select(Ticket.id))
+        )
+    )
+    db.commit()
+    return processed
+
+
+def ensure_populated(db: Session) -> None:
+    """Backfill the projection if it is empty but tickets exist (fresh create_all setups)"""
+    has_rows = db.query(TicketListView.ticket_id).limit(1).first()
+    has_tickets = db.query(Ticket.id).limit(1).first()
+    if has_tickets and not has_rows:
+        logger.info("ticket_list_view is empty, rebuilding from tickets")
+        rebuild_all(db)
+
+
+# Lookup tables whose names are copied into the projection
+_RENAMES = (
+    (User, TicketListView.assigned_to, {
+        "name": TicketListView.assigned_user_name,
+        "email": TicketListView.assigned_user_email,
+        "role": TicketListView.assigned_user_role,
+    }),
+    (CategoryLanguage, TicketListView.language_id, {"name": TicketListView.language_name}),
+    (CategoryVOC, TicketListView.voc_id, {"name": TicketListView.voc_name}),
+    (CategoryPriority, TicketListView.priority_id, {
+        "name": TicketListView.priority_name,
+        "weight": TicketListView.priority_weight,
+    }),
+)
+
+
+@event.listens_for(Session, "after_flush")
+def _sync_ticket_list_view(session, flush_context):
+    """
+    Keep ticket_list_view in step with ticket writes inside the same
+    transaction: new/changed tickets, new messages and renamed lookups.
+    """
+    ticket_ids = set()
+    deleted_ids = set()
+
+    for obj in session.new | session.dirty:
+        if isinstance(obj, Ticket):
+            ticket_ids.add(obj.id)
+        elif isinstance(obj, TicketMessage):
+            ticket_ids.add(obj.ticket_id)
+
+    for obj in session.deleted:
+        if isinstance(obj, Ticket):
+            deleted_ids.add(obj.id)
+        elif isinstance(obj, TicketMessage):
+            ticket_ids.add(obj.ticket_id)
+
+    connection = session.connection()
+
+    if deleted_ids:
+        connection.execute(delete(TicketListView).where(TicketListView.ticket_id.in_(deleted_ids)))
+    refresh_tickets(connection, ticket_ids - deleted_ids)
+
+    for obj in session.dirty:
+        for model, fk_column, columns in _RENAMES:
+            if not isinstance(obj, model):
+                continue
+            # Only changes to the copied columns rewrite projection rows, not
+            # e.g. a user's is_online toggle
+            attrs = inspect(obj).attrs
+            if not any(attrs[attr].history.has_changes() for attr in columns):
+                continue
+            connection.execute(
+                update(TicketListView)
+                .where(fk_column == obj.id)
+                .values({column: getattr(obj, attr) for attr, column in columns.items()})
+            )
+
+
+if __name__ == "__main__":
+    from ..db import SessionLocal
+
+    db = SessionLocal()
+    try:
+        total = rebuild_all(db)
+        print("ticket_list_view rebuilt for", total, "tickets")
+    finally:
+        db.close()
@@ -42,4 +42,10 @@ def get_pagination_params(page: Optional[int] = None, page_size: Optional[int] =
 def apply_pagination(query, page: int, page_size: int):
     """Apply pagination to a SQLAlchemy query"""
     offset = (page - 1) * page_size
-    return query.offset(offset).limit(page_size) 
\ No newline at end of file
+    return query.offset(offset).limit(page_size)
+
+
+def fetch_page(query, page: int, page_size: int) -> tuple[list, bool]:
+    """One page of a query and whether more rows follow (one extra row instead of a COUNT)"""
+    rows = query.offset((page - 1) * page_size).limit(page_size + 1).all()
+    return rows[:page_size], len(rows) > page_size
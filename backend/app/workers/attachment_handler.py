@@ -1,14 +1,18 @@
 import os
+import hashlib
 import logging
+import uuid
 import email
 from email import policy
 from email.parser import BytesParser
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 import json
 from pathlib import Path
 
 logger = logging.getLogger(__name__)
 
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
 class AttachmentHandler:
     def __init__(self, attachment_dir: str):
         self.attachment_dir = Path(attachment_dir)
@@ -107,6 +111,75 @@ class AttachmentHandler:
             logger.error(f"Failed to save attachment {filename}: {str(e)}")
             return None
     
+    def save_upload(self, upload, msg_dir: str, max_size: Optional[int] = None) -> Tuple[Dict, bool]:
+        """
+        Stream an uploaded file into msg_dir in chunks, hashing it on the way
+
+        The file is stored as <sha256 prefix>_<name>, so re-sending the same
+        content reuses the file instead of overwriting a different one.
+
+        Returns:
+            (attachment metadata, whether a new file was written)
+        """
+        dir_path = self.attachment_dir / msg_dir
+        dir_path.mkdir(parents=True, exist_ok=True)
+
+        temp_path = dir_path / f".upload-{uuid.uuid4().hex}"
+        digest = hashlib.sha256()
+        size = 0
+
+        source = upload.file
+        source.seek(0)
+        try:
+            with open(temp_path, "wb") as f:
+                while True:
+                    chunk = source.read(UPLOAD_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    if max_size is not None and size > max_size:
+                        raise ValueError(f"Attachment {upload.filename} exceeds {max_size // (1024 * 1024)}MB limit")
+                    digest.update(chunk)
+                    f.write(chunk)
+
+            sha256 = digest.hexdigest()
+            safe_filename = f"{sha256[:16]}_{self._sanitize_filename(upload.filename)}"
+            file_path = dir_path / safe_filename
+
+            created = not file_path.exists()
+            if created:
+                os.replace(temp_path, file_path)
+        finally:
+            if temp_path.exists():
+                temp_path.unlink()
+
+        attachment_info = {
+            "filename": upload.filename,
+            "mime_type": upload.content_type,
+            "file_path": f"{msg_dir}/{safe_filename}",
+            "size": size,
+            "sha256": sha256
+        }
+        return attachment_info, created
+
+    def remove_files(self, relative_paths: List[str]):
+        """Remove saved attachment files (e.g. when sending failed)"""
+        for relative_path in relative_paths:
+            try:
+                (self.attachment_dir / relative_path).unlink(missing_ok=True)
+            except OSError as e:
+                logger.error(f"Failed to remove attachment {relative_path}: {str(e)}")
+
+    def remove_empty_dir(self, msg_dir: str):
+        """Remove an attachment directory if nothing is left in it"""
+        try:
+            (self.attachment_dir / msg_dir).rmdir()
+        except FileNotFoundError:
+            pass
+        except OSError:
+            # Not empty
+            pass
+
     def _get_extension_from_mime(self, mime_type: str) -> str:
         """Get file extension from MIME type"""
         mime_extensions = {
@@ -1,53 +1,345 @@
+"""
+Bulk email sender.
+
+Pending rows are claimed in batches with a lease (claimed_by /
+claimed_until), so every API process can run the scheduler without two
+of them sending the same row; on MySQL the claim also uses SKIP LOCKED so
+concurrent claimers don't wait on each other. A claimed batch is sent by
+BULK_EMAIL_WORKERS threads over the pooled SMTP connections, within the
+global and per-domain rate limits (shared by all processes through
+rate_limit_buckets), and results are written back in
+batched UPDATEs that also renew the lease on the rest of the batch.
+
+Only rows of running campaigns (or without a campaign) are claimed. Each
+result flush re-reads the status of the batch's campaigns, and rows of a
+campaign paused or cancelled meanwhile are skipped and handed back.
+
+A failed send is retried by a later run once its lease expires; the
+row is marked failed when its BULK_EMAIL_MAX_ATTEMPTS-th send fails.
+
+Delivery is at-least-once: rows sent by a process that dies before
+recording them are sent again once their lease expires.
+"""
+import os
+import socket
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from itertools import chain, zip_longest
+from typing import Dict, List, Set
+
 from apscheduler.schedulers.background import BackgroundScheduler
+from sqlalchemy import and_, bindparam, or_, select, update
 from sqlalchemy.orm import Session
-from datetime import datetime
-from ..db import get_db
-from ..models import BulkEmail, BulkEmailStatus
+
+from ..config import settings
+from ..db import SessionLocal
+from ..models import BulkCampaign, BulkEmail, BulkEmailStatus
 from ..services.mailer import send_mail
+from ..services import bulk_campaigns, templating
+from ..services.rate_limit import RateLimiter
 import logging
 
 logger = logging.getLogger(__name__)
 
-def send_pending_bulk_emails():
-    db: Session = next(get_db())
-    pending = db.query(BulkEmail).filter(BulkEmail.status == BulkEmailStatus.pending).all()
+# Results are written back every FLUSH_SIZE sends or FLUSH_SECONDS
+FLUSH_SIZE = 50
+FLUSH_SECONDS = 2.0
 
-    if not pending:
-        logger.info("No pending bulk emails to send")
-        return
+SENT = "sent"
+FAILED = "failed"
+SKIPPED = "skipped"
+
+# One set of buckets in the database for every process and run, so
+# scheduler runs and manual sends together stay within the limits
+limiter = RateLimiter(
+    settings.BULK_EMAIL_RATE_PER_MINUTE, settings.BULK_EMAIL_DOMAIN_RATE_PER_MINUTE, shared_name="bulk_email"
+)
+
+
+def _claimable(now: datetime):
+    return and_(
+        BulkEmail.status == BulkEmailStatus.pending,
+        BulkEmail.attempts < settings.BULK_EMAIL_MAX_ATTEMPTS,
+        or_(BulkEmail.claimed_until.is_(None), BulkEmail.claimed_until < now)
+    )
 
-    sent = 0
-    failed = 0
 
-    for record in pending:
-        try:
-            message_id = send_mail(
-                to_email=record.email,
-                subject="Bulk Mail Delivery",
-                body=record.content,
-                attachments=None
+def claim_batch(db: Session, worker_id: str, size: int) -> list:
+    """Lease up to `size` sendable rows to worker_id and return those won"""
+    now = datetime.utcnow()
+    ids = db.execute(
+        select(BulkEmail.id)
+        .where(_claimable(now), bulk_campaigns.claimable_condition(now))
+        .order_by(BulkEmail.id)
+        .limit(size)
+        .with_for_update(skip_locked=True)
+    ).scalars().all()
+
+    if ids:
+        # Re-check the lease in the UPDATE: without row locks (or SKIP LOCKED)
+        # another worker may have claimed some of these rows meanwhile
+        db.connection().execute(
+            update(BulkEmail)
+            .where(BulkEmail.id.in_(ids), _claimable(now))
+            .values(
+                claimed_by=worker_id,
+                claimed_until=now + timedelta(seconds=settings.BULK_EMAIL_LEASE_SECONDS)
             )
+        )
+    db.commit()
+    if not ids:
+        return []
+
+    return db.execute(
+        select(BulkEmail.id, BulkEmail.campaign_id, BulkEmail.email, BulkEmail.content, BulkEmail.attempts)
+        .where(BulkEmail.id.in_(ids), BulkEmail.claimed_by == worker_id)
+        .order_by(BulkEmail.id)
+    ).all()
+
+
+def _domain(email: str) -> str:
+    return email.rpartition("@")[2].lower()
+
+
+def _interleave_domains(rows: list) -> list:
+    """Round-robin rows across recipient domains, so one rate-limited domain doesn't stall the rest"""
+    by_domain: Dict[str, list] = defaultdict(list)
+    for row in rows:
+        by_domain[_domain(row.email)].append(row)
+    return [row for row in chain.from_iterable(zip_longest(*by_domain.values())) if row is not None]
+
+
+def _subjects(db: Session, rows: list) -> Dict[int, str]:
+    """Rendered subject per row id, one render_batch per campaign"""
+    by_campaign: Dict[int, list] = defaultdict(list)
+    for row in rows:
+        by_campaign[row.campaign_id].append(row)
+
+    templates = dict(db.execute(
+        select(BulkCampaign.id, BulkCampaign.subject)
+        .where(BulkCampaign.id.in_([cid for cid in by_campaign if cid is not None]))
+    ).all())
+
+    subjects = {}
+    for campaign_id, campaign_rows in by_campaign.items():
+        rendered = templating.render_batch(
+            templates.get(campaign_id) or bulk_campaigns.DEFAULT_SUBJECT,
+            [templating.recipient_variables(row.email) for row in campaign_rows]
+        )
+        subjects.update(zip([row.id for row in campaign_rows], rendered))
+    return subjects
+
+
+def _stopped_campaigns(db: Session, campaign_ids: Set[int]) -> Dict[int, str]:
+    """Status of those campaigns that are no longer running"""
+    if not campaign_ids:
+        return {}
+    return dict(db.execute(
+        select(BulkCampaign.id, BulkCampaign.status)
+        .where(BulkCampaign.id.in_(campaign_ids), BulkCampaign.status != bulk_campaigns.RUNNING)
+    ).all())
 
-            if message_id:
-                record.status = BulkEmailStatus.sent
-                record.response = f"Sent - MessageID {message_id}"
-                sent += 1
+
+def _send_one(row, subject: str, limiter: RateLimiter, stopped: Dict[int, str]) -> dict:
+    result = {"b_id": row.id, "campaign_id": row.campaign_id, "attempts": row.attempts}
+    if row.campaign_id in stopped:
+        return {**result, "outcome": SKIPPED}
+
+    limiter.wait(_domain(row.email))
+    # The campaign may have been stopped while waiting for the rate limit
+    if row.campaign_id in stopped:
+        return {**result, "outcome": SKIPPED}
+
+    try:
+        message_id = send_mail(
+            to_email=row.email,
+            subject=subject,
+            body=templating.render(row.content, templating.recipient_variables(row.email)),
+            attachments=None
+        )
+        response = f"Sent - MessageID {message_id}" if message_id else "Mail Failed"
+    except Exception as e:
+        message_id = None
+        response = f"Error: {str(e)}"
+    return {**result, "outcome": SENT if message_id else FAILED, "b_response": response}
+
+
+class _Flusher:
+    """Writes batched results and campaign counters, and tracks per-campaign send rates"""
+
+    def __init__(self, db: Session, worker_id: str):
+        self.db = db
+        self.worker_id = worker_id
+        self.results: List[dict] = []
+        self.flushed_at = time.monotonic()
+
+    def add(self, result: dict) -> None:
+        self.results.append(result)
+
+    def due(self) -> bool:
+        return len(self.results) >= FLUSH_SIZE or time.monotonic() - self.flushed_at >= FLUSH_SECONDS
+
+    def _cancelled_campaigns(self) -> Set[int]:
+        """
+        Campaigns of these results that are cancelled, read with their rows
+        locked: a cancel must not slip in between this read and the write
+        of the results, or a failed row would be handed back as pending
+        after the cancel's UPDATE and never be sent or counted.
+        """
+        campaign_ids = {result["campaign_id"] for result in self.results} - {None}
+        if not campaign_ids:
+            return set()
+        rows = self.db.execute(
+            select(BulkCampaign.id, BulkCampaign.status)
+            .where(BulkCampaign.id.in_(campaign_ids))
+            .order_by(BulkCampaign.id)
+            .with_for_update()
+        ).all()
+        return {campaign_id for campaign_id, status in rows if status == bulk_campaigns.CANCELLED}
+
+    def flush(self) -> None:
+        now = datetime.utcnow()
+        elapsed = max(time.monotonic() - self.flushed_at, 1e-3)
+        lease_until = now + timedelta(seconds=settings.BULK_EMAIL_LEASE_SECONDS)
+        cancelled_campaigns = self._cancelled_campaigns()
+
+        done, skipped = [], []
+        counts: Dict[int, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        attempted_by_campaign: Dict[int, int] = defaultdict(int)
+        for result in self.results:
+            campaign_id = result["campaign_id"]
+            outcome = result["outcome"]
+            if outcome == SKIPPED:
+                cancelled = campaign_id in cancelled_campaigns
+                skipped.append({
+                    "b_id": result["b_id"],
+                    "b_status": BulkEmailStatus.cancelled if cancelled else BulkEmailStatus.pending,
+                })
+                if cancelled:
+                    counts[campaign_id]["cancelled"] += 1
+                continue
+
+            sent = outcome == SENT
+            exhausted = not sent and result["attempts"] + 1 >= settings.BULK_EMAIL_MAX_ATTEMPTS
+            if sent:
+                status = BulkEmailStatus.sent
+            elif exhausted:
+                status = BulkEmailStatus.failed
+            elif campaign_id in cancelled_campaigns:
+                status = BulkEmailStatus.cancelled
             else:
-                record.response = "Mail Failed"
-                failed += 1
+                status = BulkEmailStatus.pending
+            done.append({
+                "b_id": result["b_id"],
+                "b_response": result["b_response"],
+                "b_status": status,
+                "b_sent_at": now if sent else None,
+                # Failed rows are retried by a later run, after one lease period
+                "b_claimed_until": lease_until if status == BulkEmailStatus.pending else None,
+            })
+            if campaign_id is None:
+                continue
+            attempted_by_campaign[campaign_id] += 1
+            # Campaign counters follow the row states; pending rows are retried
+            if sent:
+                counts[campaign_id]["sent"] += 1
+            elif status == BulkEmailStatus.failed:
+                counts[campaign_id]["failed"] += 1
+            elif status == BulkEmailStatus.cancelled:
+                counts[campaign_id]["cancelled"] += 1
 
-        except Exception as e:
-            record.response = f"Error: {str(e)}"
-            failed += 1
+        connection = self.db.connection()
+        if done:
+            connection.execute(
+                update(BulkEmail)
+                .where(BulkEmail.id == bindparam("b_id"), BulkEmail.claimed_by == self.worker_id)
+                .values(
+                    status=bindparam("b_status"),
+                    response=bindparam("b_response"),
+                    sent_at=bindparam("b_sent_at"),
+                    claimed_by=None,
+                    claimed_until=bindparam("b_claimed_until"),
+                    attempts=BulkEmail.attempts + 1
+                ),
+                done
+            )
+        if skipped:
+            connection.execute(
+                update(BulkEmail)
+                .where(BulkEmail.id == bindparam("b_id"), BulkEmail.claimed_by == self.worker_id)
+                .values(status=bindparam("b_status"), claimed_by=None, claimed_until=None),
+                skipped
+            )
+        connection.execute(
+            update(BulkEmail)
+            .where(BulkEmail.claimed_by == self.worker_id)
+            .values(claimed_until=lease_until)
+        )
+
+        rates = {campaign_id: sent / elapsed for campaign_id, sent in attempted_by_campaign.items()}
+        bulk_campaigns.record_results(connection, counts, rates, now)
+        self.db.commit()
 
-        db.commit()
+        self.results = []
+        self.flushed_at = time.monotonic()
 
-    logger.info(f"Bulk email worker finished: Sent={sent}, Failed={failed}")
+
+def send_pending_bulk_emails() -> dict:
+    """Claim and send pending bulk emails until none are left; returns sent / failed counts"""
+    worker_id = f"{socket.gethostname()[:40]}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+    sent = 0
+    failed = 0
+
+    db = SessionLocal()
+    try:
+        with ThreadPoolExecutor(
+            max_workers=settings.BULK_EMAIL_WORKERS, thread_name_prefix="bulk-email"
+        ) as executor:
+            while True:
+                rows = claim_batch(db, worker_id, settings.BULK_EMAIL_BATCH_SIZE)
+                if not rows:
+                    break
+
+                campaign_ids = {row.campaign_id for row in rows if row.campaign_id is not None}
+                subjects = _subjects(db, rows)
+                # Shared with the send threads; refreshed in place at every flush
+                stopped = _stopped_campaigns(db, campaign_ids)
+                flusher = _Flusher(db, worker_id)
+
+                futures = [
+                    executor.submit(_send_one, row, subjects[row.id], limiter, stopped)
+                    for row in _interleave_domains(rows)
+                ]
+                for future in as_completed(futures):
+                    result = future.result()
+                    flusher.add(result)
+                    if result["outcome"] == SENT:
+                        sent += 1
+                    elif result["outcome"] == FAILED:
+                        failed += 1
+                    if flusher.due():
+                        flusher.flush()
+                        stopped.update(_stopped_campaigns(db, campaign_ids))
+                flusher.flush()
+    finally:
+        db.close()
+
+    if sent or failed:
+        logger.info(f"Bulk email worker finished: Sent={sent}, Failed={failed}")
+    else:
+        logger.info("No pending bulk emails to send")
+    return {"sent": sent, "failed": failed}
 
 
 def start_scheduler():
     scheduler = BackgroundScheduler()
-    # Runs every 5 minutes
-    scheduler.add_job(send_pending_bulk_emails, 'interval', minutes=5, id="bulk_email_worker", replace_existing=True)
+    # Runs every 5 minutes; safe in every process since rows are claimed
+    scheduler.add_job(
+        send_pending_bulk_emails, 'interval', minutes=5,
+        id="bulk_email_worker", replace_existing=True, max_instances=1, coalesce=True
+    )
     scheduler.start()
     logger.info("Bulk email scheduler started")
@@ -24,6 +24,12 @@ from app.models import (
 from app.services.assignment import next_adviser_id
 from app.services.mailer import send_mail
 from app.services.auto_tagger import AutoTagger
+from app.services import ticket_list_view  # registers projection sync hooks
+from app.services import etags  # registers data version hooks
+from app.services import realtime  # registers event publishing hooks
+from app.services import sla  # registers SLA timer hooks
+from app.services import adviser_stats  # registers stats rollup hooks
+from app.services import templating
 from app.workers.attachment_handler import AttachmentHandler
 import re
 import unicodedata
@@ -126,6 +132,23 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Compiled once, rendered per new ticket
+AUTO_ACK_TEMPLATE = templating.compile_template(textwrap.dedent("""\
+    Dear {customer_name},
+
+    Thank you for contacting us. We have received your mail and it has been logged under Ticket #: TKT-{ticket_id}.
+
+    Our team is currently reviewing the details of your concern. You can expect an initial response within 72 hours (3 days), and we are committed to resolving the matter within 2–5 business days, depending on its complexity.
+
+    If you have any further details to share or would like to follow up, please feel free to reply to this email, quoting your ticket number for reference.
+
+    We appreciate your patience and assure you that your concern is receiving our full attention.
+
+    Warm regards,
+    Molecular
+    Customer Support Team
+    """))
+
 class IMAPWorker:
     def __init__(self):
         self.imap_client = None
@@ -492,21 +515,7 @@ class IMAPWorker:
             # Send auto-ack
             auto_ack_subject = f"Mail Acknowledgment - Ticket #: [TKT-{ticket.id}]"
             auto_ack_subject_clean = normalize_subject(auto_ack_subject)
-            auto_ack_body = textwrap.dedent(f"""\
-            Dear ,
-
-            Thank you for contacting us. We have received your mail and it has been logged under Ticket #: TKT-{ticket.id}.
-
-            Our team is currently reviewing the details of your concern. You can expect an initial response within 72 hours (3 days), and we are committed to resolving the matter within 2–5 business days, depending on its complexity.
-
-            If you have any further details to share or would like to follow up, please feel free to reply to this email, quoting your ticket number for reference.
-
-            We appreciate your patience and assure you that your concern is receiving our full attention.
-
-            Warm regards,
-            Molecular
-            Customer Support Team
-            """)
+            auto_ack_body = AUTO_ACK_TEMPLATE.render(templating.ticket_variables(ticket))
 
             ack_message_id = send_mail(
                 to_email=from_email,
@@ -0,0 +1,23 @@
+from apscheduler.schedulers.background import BackgroundScheduler
+from ..config import settings
+from ..services.sla import SLAScheduler
+import logging
+
+logger = logging.getLogger(__name__)
+
+sla_scheduler = SLAScheduler()
+
+
+def run_sla_tick():
+    sla_scheduler.tick()
+
+
+def start_scheduler():
+    scheduler = BackgroundScheduler()
+    # One tick per timer wheel slot; max_instances=1 keeps ticks from overlapping
+    scheduler.add_job(
+        run_sla_tick, 'interval', seconds=settings.SLA_TICK_SECONDS,
+        id="sla_worker", replace_existing=True, max_instances=1, coalesce=True
+    )
+    scheduler.start()
+    logger.info("SLA scheduler started")
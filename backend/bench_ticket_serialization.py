@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for ticket list serialization.
+
+Compares the old path (hydrated Ticket objects with joinedload relations,
+hand-built dicts, Pydantic TicketListResponse validation, JSONResponse)
+against the column-projection path (ticket_list_view row tuples,
+serialize_ticket_row, FastJSONResponse). Runs against an in-memory SQLite
+database so it needs no MySQL server.
+
+Usage: python bench_ticket_serialization.py [rows] [repeats]
+"""
+
+import sys
+import os
+import time
+from datetime import datetime, timedelta
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fastapi.responses import JSONResponse
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker, joinedload
+
+from app.models import (
+    Base, Ticket, TicketMessage, User, Role, TicketStatus, MsgDir,
+    CategoryLanguage, CategoryVOC, CategoryPriority, TicketListView
+)
+from app.routers.tickets import TicketListResponse
+from app.serializers import TICKET_COLUMNS, serialize_ticket_row, FastJSONResponse
+from app.services import ticket_list_view
+
+
+def setup_db(rows: int):
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+
+    db.add_all([
+        User(id=1, name="Adviser One", email="one@mas.local", role=Role.adviser, password_hash="x"),
+        CategoryLanguage(id=1, name="English"),
+        CategoryVOC(id=1, name="Refund Request"),
+        CategoryPriority(id=1, name="High", weight=10),
+    ])
+    now = datetime.utcnow()
+    for i in range(1, rows + 1):
+        db.add(Ticket(
+            id=i, customer_email=f"customer{i}@example.com", customer_name=f"customer{i}",
+            subject=f"Order {i} has not arrived yet", status=TicketStatus.Open,
+            assigned_to=1, language_id=1, voc_id=1, priority_id=1,
+            created_at=now - timedelta(minutes=i), updated_at=now - timedelta(minutes=i)
+        ))
+        db.add(TicketMessage(
+            id=i, ticket_id=i, direction=MsgDir.inbound, from_email=f"customer{i}@example.com",
+            to_email="support@mas.local", subject="Order", body="Where is my order? " * 20, sent_at=now
+        ))
+    db.commit()
+    return db
+
+
+def old_path(db, rows: int) -> bytes:
+    tickets = db.query(Ticket).options(
+        joinedload(Ticket.assigned_user),
+        joinedload(Ticket.language),
+        joinedload(Ticket.voc),
+        joinedload(Ticket.priority)
+    ).order_by(Ticket.updated_at.desc()).limit(rows).all()
+
+    ticket_dicts = []
+    for ticket in tickets:
+        ticket_dicts.append({
+            "id": ticket.id,
+            "customer_email": ticket.customer_email,
+            "customer_name": ticket.customer_name,
+            "subject": ticket.subject,
+            "status": ticket.status,
+            "assigned_to": ticket.assigned_to,
+            "language_id": ticket.language_id,
+            "voc_id": ticket.voc_id,
+            "priority_id": ticket.priority_id,
+            "created_at": ticket.created_at,
+            "updated_at": ticket.updated_at,
+            "assigned_user": {
+                "id": ticket.assigned_user.id,
+                "name": ticket.assigned_user.name,
+                "email": ticket.assigned_user.email,
+                "role": ticket.assigned_user.role.value if ticket.assigned_user.role else None
+            } if ticket.assigned_user else None,
+            "language": {"id": ticket.language.id, "name": ticket.language.name} if ticket.language else None,
+            "voc": {"id": ticket.voc.id, "name": ticket.voc.name} if ticket.voc else None,
+            "priority": {
+                "id": ticket.priority.id,
+                "name": ticket.priority.name,
+                "weight": ticket.priority.weight
+            } if ticket.priority else None
+        })
+
+    # What FastAPI does with response_model: validate, then dump to JSON-able data
+    model = TicketListResponse(tickets=ticket_dicts, total=len(ticket_dicts), page=1, page_size=rows)
+    return JSONResponse(model.model_dump(mode="json")).body
+
+
+def new_path(db, rows: int) -> bytes:
+    result = db.query(*TICKET_COLUMNS).order_by(TicketListView.updated_at.desc()).limit(rows).all()
+    return FastJSONResponse({
+        "tickets": [serialize_ticket_row(row) for row in result],
+        "total": len(result),
+        "page": 1,
+        "page_size": rows,
+        "total_is_estimate": False
+    }).body
+
+
+def bench(label: str, fn, db, rows: int, repeats: int) -> float:
+    fn(db, rows)  # warm up
+    start = time.perf_counter()
+    for _ in range(repeats):
+        db.expunge_all()
+        fn(db, rows)
+    elapsed = time.perf_counter() - start
+    per_row_us = elapsed / (repeats * rows) * 1_000_000
+    print(f"{label:<32} {elapsed / repeats * 1000:8.2f} ms/page  {per_row_us:7.2f} us/row")
+    return per_row_us
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+
+    db = setup_db(rows)
+    ticket_list_view.rebuild_all(db)
+
+    print(f"page_size={rows}, repeats={repeats}")
+    before = bench("ORM + Pydantic (before)", old_path, db, rows, repeats)
+    after = bench("row tuples + serializer (after)", new_path, db, rows, repeats)
+    print(f"speedup: {before / after:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
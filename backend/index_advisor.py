@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+Index advisor: runs EXPLAIN on the registered hot queries and flags
+full table scans, full index scans and filesorts.
+
+The queries below mirror the shapes used by the API and workers. Run this
+against a database with production-like row counts - on near-empty tables
+MySQL will happily choose a full scan regardless of the available indexes.
+
+Usage: python index_advisor.py [query-name ...]
+Exits with status 1 if any query does a full table scan.
+"""
+
+import sys
+import os
+from datetime import datetime, timedelta
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import select, func, case, exists, and_, or_
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+from app.config import settings
+from app.db import SessionLocal
+from app.models import (
+    Ticket, TicketMessage, TicketEvent, TicketFeedback, TicketListView, TicketSLA,
+    AdviserStatsDaily, BulkEmail, BulkEmailStatus, User, Role, TicketStatus, MsgDir
+)
+from app.services import bulk_campaigns
+
+
+class explain(Executable, ClauseElement):
+    """EXPLAIN wrapper that keeps bound parameters intact"""
+    inherit_cache = False
+
+    def __init__(self, statement):
+        self.statement = statement
+
+
+@compiles(explain)
+def _compile_explain(element, compiler, **kw):
+    return "EXPLAIN " + compiler.process(element.statement, **kw)
+
+
+NOW = datetime.utcnow()
+CUTOFF = NOW - timedelta(hours=48)
+SAMPLE_EMAIL = "customer@example.com"
+
+# name -> statement. Keep in sync with the query shapes in app/.
+HOT_QUERIES = {
+    "ticket_list.default": lambda: (
+        select(TicketListView.ticket_id)
+        .order_by(TicketListView.updated_at.desc())
+        .limit(25)
+    ),
+    "ticket_list.adviser": lambda: (
+        select(TicketListView.ticket_id)
+        .where(TicketListView.assigned_to == 1)
+        .order_by(TicketListView.updated_at.desc())
+        .limit(25)
+    ),
+    "ticket_list.status": lambda: (
+        select(TicketListView.ticket_id)
+        .where(TicketListView.status == TicketStatus.Open)
+        .order_by(TicketListView.updated_at.desc())
+        .limit(25)
+    ),
+    "ticket_list.search": lambda: (
+        select(TicketListView.ticket_id)
+        .where(
+            TicketListView.subject.ilike("%refund%")
+            | TicketListView.customer_email.ilike("%refund%")
+            | exists().where(
+                TicketMessage.ticket_id == TicketListView.ticket_id,
+                TicketMessage.body.ilike("%refund%")
+            )
+        )
+        .order_by(TicketListView.updated_at.desc())
+        .limit(25)
+    ),
+    "tickets.pending_reminders": lambda: (
+        select(Ticket.id)
+        .join(TicketSLA, TicketSLA.ticket_id == Ticket.id)
+        .where(TicketSLA.pending_reminder_due_at <= NOW, Ticket.status == TicketStatus.Pending)
+    ),
+    "tickets.pending_reminders_adviser": lambda: (
+        select(Ticket.id)
+        .join(TicketSLA, TicketSLA.ticket_id == Ticket.id)
+        .where(
+            TicketSLA.pending_reminder_due_at <= NOW,
+            Ticket.status == TicketStatus.Pending,
+            Ticket.assigned_to == 1
+        )
+    ),
+    "tickets.adviser_stats": lambda: (
+        select(
+            User.id,
+            func.sum(case((AdviserStatsDaily.status == TicketStatus.Open, AdviserStatsDaily.ticket_count), else_=0)),
+            func.sum(AdviserStatsDaily.ticket_count)
+        )
+        .join(AdviserStatsDaily, AdviserStatsDaily.adviser_id == User.id)
+        .where(User.role == Role.adviser, AdviserStatsDaily.day >= CUTOFF.date())
+        .group_by(User.id)
+    ),
+    "imap.subject_match": lambda: (
+        select(Ticket.id)
+        .where(Ticket.subject.ilike("Order not delivered"), Ticket.customer_email == SAMPLE_EMAIL)
+        .limit(1)
+    ),
+    "imap.latest_for_customer": lambda: (
+        select(Ticket.id)
+        .where(Ticket.customer_email == SAMPLE_EMAIL)
+        .order_by(Ticket.created_at.desc())
+        .limit(1)
+    ),
+    "messages.thread": lambda: (
+        select(TicketMessage.id)
+        .where(TicketMessage.ticket_id == 1)
+        .order_by(TicketMessage.sent_at)
+        .limit(50)
+    ),
+    "messages.last_for_reply": lambda: (
+        select(TicketMessage.smtp_message_id)
+        .where(TicketMessage.ticket_id == 1)
+        .order_by(TicketMessage.sent_at.desc())
+        .limit(1)
+    ),
+    "messages.previous_reply": lambda: (
+        select(TicketMessage.id)
+        .where(TicketMessage.ticket_id == 1, TicketMessage.direction == MsgDir.outbound)
+        .limit(1)
+    ),
+    "exports.messages": lambda: (
+        select(TicketMessage.id)
+        .where(TicketMessage.sent_at >= CUTOFF)
+        .order_by(TicketMessage.sent_at.desc())
+    ),
+    "exports.ticket_events": lambda: (
+        select(TicketEvent.id)
+        .where(TicketEvent.created_at >= CUTOFF)
+        .order_by(TicketEvent.created_at.desc())
+    ),
+    "exports.tickets_delta": lambda: (
+        select(TicketListView.ticket_id)
+        .where(
+            or_(
+                TicketListView.updated_at > CUTOFF,
+                and_(TicketListView.updated_at == CUTOFF, TicketListView.ticket_id > 1)
+            ),
+            TicketListView.updated_at <= NOW
+        )
+        .order_by(TicketListView.updated_at, TicketListView.ticket_id)
+        .limit(1000)
+    ),
+    "exports.ticket_events_delta": lambda: (
+        select(TicketEvent.id)
+        .where(
+            or_(
+                TicketEvent.created_at > CUTOFF,
+                and_(TicketEvent.created_at == CUTOFF, TicketEvent.id > 1)
+            ),
+            TicketEvent.created_at <= NOW
+        )
+        .order_by(TicketEvent.created_at, TicketEvent.id)
+        .limit(1000)
+    ),
+    "exports.feedback": lambda: (
+        select(TicketFeedback.id)
+        .where(TicketFeedback.created_at >= CUTOFF)
+    ),
+    "bulk.pending": lambda: (
+        select(BulkEmail.id)
+        .where(
+            BulkEmail.status == BulkEmailStatus.pending,
+            BulkEmail.attempts < settings.BULK_EMAIL_MAX_ATTEMPTS,
+            or_(BulkEmail.claimed_until.is_(None), BulkEmail.claimed_until < NOW),
+            bulk_campaigns.claimable_condition(NOW)
+        )
+        .order_by(BulkEmail.id)
+        .limit(100)
+    ),
+}
+
+
+def check_query(connection, name: str, statement) -> list:
+    """EXPLAIN one statement and return a list of (level, message) findings"""
+    findings = []
+    for row in connection.execute(explain(statement)).mappings():
+        table = row.get("table")
+        access = row.get("type")
+        extra = row.get("Extra") or ""
+
+        if access == "ALL":
+            findings.append(("FULL SCAN", f"{table}: full table scan (~{row.get('rows')} rows)"))
+        elif access == "index":
+            findings.append(("WARN", f"{table}: full index scan on {row.get('key')}"))
+
+        if "Using filesort" in extra:
+            findings.append(("WARN", f"{table}: filesort"))
+        if "Using temporary" in extra:
+            findings.append(("WARN", f"{table}: temporary table"))
+
+    return findings
+
+
+def main():
+    names = sys.argv[1:] or list(HOT_QUERIES)
+    unknown = [n for n in names if n not in HOT_QUERIES]
+    if unknown:
+        print(f"Unknown queries: {', '.join(unknown)}")
+        print(f"Available: {', '.join(HOT_QUERIES)}")
+        sys.exit(2)
+
+    db = SessionLocal()
+    full_scans = 0
+
+    try:
+        connection = db.connection()
+        for name in names:
+            findings = check_query(connection, name, HOT_QUERIES[name]())
+            if not findings:
+                print(f"[ OK ] {name}")
+                continue
+            for level, message in findings:
+                print(f"[{level}] {name}: {message}")
+                if level == "FULL SCAN":
+                    full_scans += 1
+    finally:
+        db.close()
+
+    print(f"\n{len(names)} queries checked, {full_scans} full table scans")
+    sys.exit(1 if full_scans else 0)
+
+
+if __name__ == "__main__":
+    main()
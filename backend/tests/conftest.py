@@ -0,0 +1,35 @@
+import os
+import sys
+
+import pytest
+from sqlalchemy import BigInteger, create_engine
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.pool import StaticPool
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@compiles(BigInteger, "sqlite")
+def _sqlite_bigint(type_, compiler, **kw):
+    # SQLite only autoincrements INTEGER PRIMARY KEY columns
+    return "INTEGER"
+
+
+@pytest.fixture
+def db():
+    """A session on a fresh in-memory SQLite database with every table"""
+    from app import db as app_db
+    from app.models import Base
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    previous = app_db.SessionLocal.kw["bind"]
+    app_db.SessionLocal.configure(bind=engine)
+
+    session = app_db.SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+        app_db.SessionLocal.configure(bind=previous)
+        engine.dispose()
@@ -0,0 +1,69 @@
+from app.models import AdviserStatsDaily, Ticket, TicketStatus
+from app.services import adviser_stats
+
+
+def _counts(db):
+    return {
+        (row.adviser_id, row.status): row.ticket_count
+        for row in db.query(AdviserStatsDaily)
+        if row.ticket_count
+    }
+
+
+def _ticket(db, **values):
+    ticket = Ticket(customer_email="c@example.com", subject="s", **values)
+    db.add(ticket)
+    db.commit()
+    return ticket
+
+
+def test_changes_move_tickets_between_buckets(db):
+    ticket = _ticket(db, assigned_to=7)
+    _ticket(db, assigned_to=7)
+    _ticket(db)  # unassigned tickets are not counted
+    assert _counts(db) == {(7, TicketStatus.Open): 2}
+
+    ticket.status = TicketStatus.Closed
+    ticket.assigned_to = 8
+    db.commit()
+    assert _counts(db) == {(7, TicketStatus.Open): 1, (8, TicketStatus.Closed): 1}
+
+    db.delete(ticket)
+    db.commit()
+    assert _counts(db) == {(7, TicketStatus.Open): 1}
+
+
+def test_buckets_are_updated_after_commit_only(db):
+    ticket = _ticket(db, assigned_to=7)
+
+    ticket.status = TicketStatus.Pending
+    db.flush()
+    # The writer's transaction does not touch the shared buckets
+    assert db.info[adviser_stats._PENDING_KEY] == {ticket.id}
+    assert _counts(db) == {(7, TicketStatus.Open): 1}
+
+    db.rollback()
+    assert adviser_stats._PENDING_KEY not in db.info
+    assert _counts(db) == {(7, TicketStatus.Open): 1}
+
+
+def test_tickets_without_net_changes_are_not_staged(db):
+    ticket = _ticket(db, assigned_to=7)
+    db.refresh(ticket)
+
+    ticket.subject = "changed"
+    ticket.subject = "s"
+    ticket.notes = []
+    assert ticket in db.dirty
+    db.flush()
+    assert adviser_stats._PENDING_KEY not in db.info
+
+
+def test_staged_ids_from_bulk_paths(db):
+    ticket = _ticket(db, assigned_to=7)
+    db.query(Ticket).filter(Ticket.id == ticket.id).update(
+        {"status": TicketStatus.Closed}, synchronize_session=False
+    )
+    adviser_stats.stage(db, [ticket.id])
+    db.commit()
+    assert _counts(db) == {(7, TicketStatus.Closed): 1}
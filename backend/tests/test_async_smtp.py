@@ -0,0 +1,368 @@
+import asyncio
+import io
+import smtplib
+import socket
+
+import pytest
+from aiosmtpd.controller import Controller
+from aiosmtpd.smtp import AuthResult, LoginPassword
+
+from app.services import mailer
+from app.services.async_smtp import AsyncSMTP
+from app.services.smtp_pool import AsyncSMTPConnectionPool, SMTPConnectionPool, SMTPDataInterrupted
+
+USER = "mailer"
+PASSWORD = "s3cret"
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class Sink:
+    """Records delivered messages; refuses recipients starting with 'bad'"""
+
+    def __init__(self):
+        self.messages = []
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address.startswith("bad"):
+            return "550 5.1.1 No such user"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append((envelope.mail_from, list(envelope.rcpt_tos), envelope.content))
+        return "250 Message accepted"
+
+
+class LosingSink(Sink):
+    """Accepts the next `lose_replies` messages but drops the connection before replying"""
+
+    def __init__(self):
+        super().__init__()
+        self.lose_replies = 0
+
+    async def handle_DATA(self, server, session, envelope):
+        reply = await super().handle_DATA(server, session, envelope)
+        if self.lose_replies:
+            self.lose_replies -= 1
+            server.transport.abort()
+        return reply
+
+
+def authenticate(server, session, envelope, mechanism, auth_data):
+    ok = (
+        isinstance(auth_data, LoginPassword)
+        and auth_data.login == USER.encode()
+        and auth_data.password == PASSWORD.encode()
+    )
+    # handled=False: let the server send the 535 reply
+    return AuthResult(success=ok, handled=False)
+
+
+def start_sink(**smtp_parameters):
+    sink = Sink()
+    controller = Controller(sink, hostname="127.0.0.1", port=free_port(), **smtp_parameters)
+    controller.start()
+    return controller, sink
+
+
+@pytest.fixture
+def sink():
+    controller, sink = start_sink()
+    yield controller, sink
+    controller.stop()
+
+
+async def _connect(controller) -> AsyncSMTP:
+    server = AsyncSMTP(controller.hostname, controller.port, timeout=5)
+    await server.connect()
+    return server
+
+
+async def _chunks(*chunks):
+    for chunk in chunks:
+        yield chunk
+
+
+def _message_file(text: str) -> io.BytesIO:
+    return io.BytesIO(text.replace("\n", "\r\n").encode("ascii"))
+
+
+def test_multiline_reply():
+    async def scripted(reader, writer):
+        writer.write(b"220 ready\r\n")
+        await reader.readline()
+        writer.write(b"250-first\r\n250-second line\r\n250 last\r\n")
+        await writer.drain()
+        await reader.readline()
+        writer.close()
+
+    async def run():
+        server_socket = await asyncio.start_server(scripted, "127.0.0.1", 0)
+        port = server_socket.sockets[0].getsockname()[1]
+        async with server_socket:
+            client = AsyncSMTP("127.0.0.1", port, timeout=5)
+            await client.connect()
+            reply = await client.noop()
+            client.close()
+            return reply
+
+    assert asyncio.run(run()) == (250, b"first\nsecond line\nlast")
+
+
+def test_ehlo_features(sink):
+    controller, _ = sink
+
+    async def run():
+        server = await _connect(controller)
+        code, _ = await server.ehlo()
+        await server.quit()
+        return code, server
+
+    code, server = asyncio.run(run())
+    assert code == 250
+    assert server.has_extn("8BITMIME") and server.has_extn("size")
+
+
+def test_dot_stuffing_round_trip(sink):
+    controller, received = sink
+    # Enough lines to span several DATA chunks
+    text = "Subject: dots\n\n" + "\n".join(
+        [".single", "..double", ".", "plain"] * (mailer.SEND_CHUNK_SIZE // 20)
+    ) + "\n"
+
+    async def run():
+        server = await _connect(controller)
+        refused = await server.sendmail_chunks(
+            "from@example.com", ["to@example.com"], mailer._data_chunks_async(_message_file(text))
+        )
+        await server.quit()
+        return refused
+
+    assert asyncio.run(run()) == {}
+    assert received.messages[0][2] == text.replace("\n", "\r\n").encode("ascii")
+
+
+def test_partial_recipient_refusal(sink):
+    controller, received = sink
+
+    async def run():
+        server = await _connect(controller)
+        refused = await server.sendmail_chunks(
+            "from@example.com", ["bad@example.com", "good@example.com"],
+            _chunks(b"Subject: x\r\n\r\nhi\r\n.\r\n")
+        )
+        await server.quit()
+        return refused
+
+    refused = asyncio.run(run())
+    assert list(refused) == ["bad@example.com"]
+    assert refused["bad@example.com"][0] == 550
+    assert received.messages[0][1] == ["good@example.com"]
+
+
+def test_all_recipients_refused_keeps_connection_usable(sink):
+    controller, received = sink
+
+    async def run():
+        server = await _connect(controller)
+        with pytest.raises(smtplib.SMTPRecipientsRefused):
+            await server.sendmail_chunks(
+                "from@example.com", ["bad@example.com"], _chunks(b"hi\r\n.\r\n")
+            )
+        await server.sendmail_chunks("from@example.com", ["good@example.com"], _chunks(b"hi\r\n.\r\n"))
+        await server.quit()
+
+    asyncio.run(run())
+    assert [rcpt for _, rcpt, _ in received.messages] == [["good@example.com"]]
+
+
+@pytest.mark.parametrize("exclude", [[], ["PLAIN"]], ids=["plain", "login"])
+def test_login(exclude):
+    controller, _ = start_sink(
+        authenticator=authenticate, auth_require_tls=False, auth_exclude_mechanism=exclude
+    )
+
+    async def run(password):
+        server = await _connect(controller)
+        try:
+            return (await server.login(USER, password))[0]
+        finally:
+            server.close()
+
+    try:
+        assert asyncio.run(run(PASSWORD)) == 235
+        with pytest.raises(smtplib.SMTPAuthenticationError):
+            asyncio.run(run("wrong"))
+    finally:
+        controller.stop()
+
+
+def test_login_without_auth_extension(sink):
+    controller, _ = sink
+
+    async def run():
+        server = await _connect(controller)
+        try:
+            await server.login(USER, PASSWORD)
+        finally:
+            server.close()
+
+    with pytest.raises(smtplib.SMTPNotSupportedError):
+        asyncio.run(run())
+
+
+def _pool(controller, **limits) -> AsyncSMTPConnectionPool:
+    options = dict(size=2, idle_timeout=60, max_messages=100, check_after=60)
+    options.update(limits)
+    return AsyncSMTPConnectionPool(lambda: _connect(controller), **options)
+
+
+def _send(server):
+    return server.sendmail_chunks("from@example.com", ["to@example.com"], _chunks(b"hi\r\n.\r\n"))
+
+
+def test_pool_reuses_connections(sink):
+    controller, received = sink
+
+    async def run():
+        pool = _pool(controller)
+        for _ in range(5):
+            await pool.send(_send)
+        await pool.close()
+        return pool.stats
+
+    stats = asyncio.run(run())
+    assert len(received.messages) == 5
+    assert stats["connects"] == 1 and stats["reuses"] == 4
+
+
+def test_pool_retries_dropped_connection(sink):
+    controller, received = sink
+
+    async def run():
+        pool = _pool(controller)
+        await pool.send(_send)
+        # The server drops the idle connection
+        pool._idle[0].server._writer.transport.abort()
+        await pool.send(_send)
+        await pool.close()
+        return pool.stats
+
+    stats = asyncio.run(run())
+    assert len(received.messages) == 2
+    assert stats["reconnects"] == 1 and stats["connects"] == 2
+
+
+def test_pool_keeps_connection_after_refusal(sink):
+    controller, received = sink
+
+    async def run():
+        pool = _pool(controller)
+        with pytest.raises(smtplib.SMTPRecipientsRefused):
+            await pool.send(lambda server: server.sendmail_chunks(
+                "from@example.com", ["bad@example.com"], _chunks(b"hi\r\n.\r\n")
+            ))
+        await pool.send(_send)
+        await pool.close()
+        return pool.stats
+
+    stats = asyncio.run(run())
+    assert len(received.messages) == 1
+    assert stats["connects"] == 1 and stats["reuses"] == 1
+
+
+def test_pool_checks_stale_connection_with_noop(sink):
+    controller, received = sink
+
+    async def run():
+        pool = _pool(controller, check_after=0)
+        await pool.send(_send)
+        pool._idle[0].server._writer.transport.abort()
+        await pool.send(_send)
+        await pool.close()
+        return pool.stats
+
+    stats = asyncio.run(run())
+    assert len(received.messages) == 2
+    assert stats["noop_failures"] == 1 and stats["reconnects"] == 0
+
+
+def test_pool_closes_after_max_messages(sink):
+    controller, _ = sink
+
+    async def run():
+        pool = _pool(controller, max_messages=2)
+        for _ in range(4):
+            await pool.send(_send)
+        await pool.close()
+        return pool.stats
+
+    assert asyncio.run(run())["connects"] == 2
+
+
+@pytest.fixture
+def losing_sink():
+    sink = LosingSink()
+    controller = Controller(sink, hostname="127.0.0.1", port=free_port())
+    controller.start()
+    yield controller, sink
+    controller.stop()
+
+
+def test_pool_does_not_retry_after_data(losing_sink):
+    controller, received = losing_sink
+
+    async def run():
+        pool = _pool(controller)
+        await pool.send(_send)
+        received.lose_replies = 1
+        # The relay took the message; resending it would deliver it twice
+        with pytest.raises(SMTPDataInterrupted):
+            await pool.send(_send)
+        await pool.close()
+        return pool.stats
+
+    stats = asyncio.run(run())
+    assert len(received.messages) == 2
+    assert stats["reconnects"] == 0 and stats["connects"] == 1
+
+
+def _sync_pool(controller) -> SMTPConnectionPool:
+    return SMTPConnectionPool(
+        lambda: smtplib.SMTP(controller.hostname, controller.port, timeout=5),
+        size=1, idle_timeout=60, max_messages=100, check_after=60
+    )
+
+
+def _sync_send(server):
+    return mailer.send_message_file(
+        server, "from@example.com", ["to@example.com"], _message_file("Subject: x\n\nhi\n")
+    )
+
+
+def test_sync_pool_retries_only_before_data(losing_sink):
+    controller, received = losing_sink
+    pool = _sync_pool(controller)
+
+    pool.send(_sync_send)
+    # Dropped while idle: nothing was sent yet, so the send is retried
+    pool._idle[0].server.sock.shutdown(socket.SHUT_RDWR)
+    pool.send(_sync_send)
+    assert len(received.messages) == 2
+    assert pool.stats["reconnects"] == 1
+
+    received.lose_replies = 1
+    with pytest.raises(SMTPDataInterrupted):
+        pool.send(_sync_send)
+    assert len(received.messages) == 3
+    assert pool.stats["reconnects"] == 1
+
+    pool.send(_sync_send)
+    assert len(received.messages) == 4
+    assert pool.stats["connects"] == 3
+    pool.close()
@@ -0,0 +1,108 @@
+import io
+
+import pytest
+from openpyxl import Workbook
+
+from app.models import BulkEmail, BulkEmailStatus
+from app.services import bulk_campaigns, bulk_email_import
+from app.services.bulk_email_import import ImportFormatError, import_recipients
+
+
+def _csv(text: str) -> io.BytesIO:
+    return io.BytesIO(text.encode("utf-8"))
+
+
+def _errors(result) -> list:
+    return [(error["row"], error["error"]) for error in result["errors"]]
+
+
+def test_validation_and_duplicates(db):
+    result = import_recipients(db, _csv(
+        "Name,EMAIL,Content\n"
+        "a, A@Example.com ,hello\n"  # normalized
+        ",,\n"  # blank row, not an error
+        "b,,hello\n"
+        "c,c@example.com,\n"
+        "d,not-an-email,hello\n"
+        "e,a@example.COM,again\n"
+        "f,f@example.com,hi\n"
+    ), "csv")
+
+    stats = result["stats"]
+    assert (stats["rows"], stats["inserted"], stats["blank"]) == (7, 2, 1)
+    assert (stats["invalid"], stats["duplicates_in_file"], stats["duplicates_pending"]) == (3, 1, 0)
+    assert _errors(result) == [
+        (4, "Missing email"),
+        (5, "Missing content"),
+        (6, "Invalid email address"),
+        (7, "Duplicate email in file"),
+    ]
+    assert not result["errors_truncated"]
+    assert [(row.email, row.content, row.status) for row in db.query(BulkEmail).order_by(BulkEmail.id)] == [
+        ("a@example.com", "hello", BulkEmailStatus.pending),
+        ("f@example.com", "hi", BulkEmailStatus.pending),
+    ]
+
+
+def test_duplicates_across_chunks(db, monkeypatch):
+    monkeypatch.setattr(bulk_email_import, "IMPORT_CHUNK_SIZE", 2)
+    result = import_recipients(db, _csv(
+        "email,content\n" + "".join(f"r{i % 3}@example.com,x\n" for i in range(7))
+    ), "csv")
+
+    assert result["stats"]["inserted"] == 3
+    assert result["stats"]["duplicates_in_file"] == 4
+    assert db.query(BulkEmail).count() == 3
+
+
+def test_pending_duplicates_are_scoped_to_the_campaign(db):
+    campaign = bulk_campaigns.create_campaign(db, "Spring", None, None, None)
+    import_recipients(db, _csv("email,content\na@example.com,x\nb@example.com,x\n"), "csv")
+    db.query(BulkEmail).filter(BulkEmail.email == "b@example.com").update({"status": BulkEmailStatus.sent})
+    db.commit()
+
+    again = import_recipients(db, _csv("email,content\na@example.com,x\nb@example.com,x\n"), "csv")
+    assert again["stats"]["duplicates_pending"] == 1
+    assert _errors(again) == [(2, "Already pending")]
+
+    into_campaign = import_recipients(
+        db, _csv("email,content\na@example.com,x\n"), "csv", campaign_id=campaign.id
+    )
+    assert into_campaign["stats"]["inserted"] == 1
+    db.refresh(campaign)
+    assert campaign.queued_count == 1
+
+
+def test_reported_errors_are_capped(db, monkeypatch):
+    monkeypatch.setattr(bulk_email_import, "MAX_REPORTED_ERRORS", 2)
+    result = import_recipients(db, _csv("email,content\n" + "bad,x\n" * 5), "csv")
+
+    assert result["stats"]["invalid"] == 5
+    assert len(result["errors"]) == 2
+    assert result["errors_truncated"]
+
+
+def test_xlsx_with_short_rows(db):
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.append(["content", "email"])
+    sheet.append(["hello", "x@example.com"])
+    sheet.append(["no email"])
+    file = io.BytesIO()
+    workbook.save(file)
+    file.seek(0)
+
+    result = import_recipients(db, file, "xlsx")
+    assert result["stats"]["inserted"] == 1
+    assert _errors(result) == [(3, "Missing email")]
+
+
+@pytest.mark.parametrize("file_type, data", [
+    ("csv", b"address,content\na@example.com,x\n"),
+    ("csv", b""),
+    ("xlsx", b"not a workbook"),
+])
+def test_format_errors(db, file_type, data):
+    with pytest.raises(ImportFormatError):
+        import_recipients(db, io.BytesIO(data), file_type)
+    assert db.query(BulkEmail).count() == 0
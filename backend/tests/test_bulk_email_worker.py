@@ -0,0 +1,166 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.config import settings
+from app.models import BulkEmail, BulkEmailStatus
+from app.services import rate_limit
+from app.services.rate_limit import RateLimiter, SharedTokenBucket, TokenBucket
+from app.workers import bulk_email_worker
+
+
+@pytest.fixture
+def sent(monkeypatch):
+    """Recipients mailed by the worker; addresses starting with 'bad' fail"""
+    recipients = []
+
+    def send_mail(to_email, subject, body, attachments=None):
+        recipients.append(to_email)
+        return None if to_email.startswith("bad") else f"<{len(recipients)}@test>"
+
+    monkeypatch.setattr(bulk_email_worker, "send_mail", send_mail)
+    monkeypatch.setattr(bulk_email_worker, "limiter", RateLimiter())
+    monkeypatch.setattr(settings, "BULK_EMAIL_MAX_ATTEMPTS", 3)
+    monkeypatch.setattr(settings, "BULK_EMAIL_LEASE_SECONDS", 300)
+    return recipients
+
+
+def _add(db, *emails):
+    db.add_all([BulkEmail(email=email, content="Hi {email}") for email in emails])
+    db.commit()
+
+
+def test_claims_do_not_overlap(db):
+    _add(db, *[f"r{i}@example.com" for i in range(5)])
+
+    first = bulk_email_worker.claim_batch(db, "worker-a", 3)
+    second = bulk_email_worker.claim_batch(db, "worker-b", 3)
+
+    assert [row.id for row in first] == [1, 2, 3]
+    assert [row.id for row in second] == [4, 5]
+    assert bulk_email_worker.claim_batch(db, "worker-c", 3) == []
+
+
+def test_expired_lease_is_reclaimed(db):
+    _add(db, "r@example.com")
+    bulk_email_worker.claim_batch(db, "crashed", 1)
+
+    db.query(BulkEmail).update({"claimed_until": datetime.utcnow() - timedelta(seconds=1)})
+    db.commit()
+
+    assert [row.id for row in bulk_email_worker.claim_batch(db, "worker-b", 1)] == [1]
+
+
+def test_failed_send_is_retried_after_lease(db, sent):
+    _add(db, "ok@example.com", "bad@example.com")
+
+    assert bulk_email_worker.send_pending_bulk_emails() == {"sent": 1, "failed": 1}
+
+    ok, bad = db.query(BulkEmail).order_by(BulkEmail.id).all()
+    assert (ok.status, ok.attempts, ok.claimed_by) == (BulkEmailStatus.sent, 1, None)
+    assert ok.sent_at is not None
+    assert (bad.status, bad.attempts, bad.claimed_by) == (BulkEmailStatus.pending, 1, None)
+    # Held back for one lease period, then retried
+    assert bad.claimed_until > datetime.utcnow()
+    assert bulk_email_worker.send_pending_bulk_emails() == {"sent": 0, "failed": 0}
+
+    bad.claimed_until = None
+    db.commit()
+    assert bulk_email_worker.send_pending_bulk_emails() == {"sent": 0, "failed": 1}
+    db.refresh(bad)
+    assert bad.attempts == 2
+
+
+def test_row_fails_after_last_attempt(db, sent, monkeypatch):
+    monkeypatch.setattr(settings, "BULK_EMAIL_LEASE_SECONDS", 0)
+    _add(db, "bad@example.com")
+
+    # Without a lease period the row is retried within the same run
+    assert bulk_email_worker.send_pending_bulk_emails() == {"sent": 0, "failed": 3}
+
+    row = db.query(BulkEmail).one()
+    assert (row.status, row.attempts, row.claimed_until) == (BulkEmailStatus.failed, 3, None)
+    assert sent == ["bad@example.com"] * 3
+    assert bulk_email_worker.send_pending_bulk_emails() == {"sent": 0, "failed": 0}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+        self.slept = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limit.time, "monotonic", clock.monotonic)
+    monkeypatch.setattr(rate_limit.time, "sleep", clock.sleep)
+    return clock
+
+
+def test_token_bucket_burst_then_spacing(clock):
+    bucket = TokenBucket(600)  # 10 per second, bursts of 10
+
+    assert [bucket.reserve() for _ in range(10)] == [0.0] * 10
+    # Later callers book successive slots instead of the same one
+    assert [round(bucket.reserve(), 3) for _ in range(3)] == [0.1, 0.2, 0.3]
+
+    clock.now += 10
+    assert bucket.reserve() == 0.0
+
+
+def test_token_bucket_slow_rate_allows_one(clock):
+    bucket = TokenBucket(30)  # one every two seconds
+
+    assert bucket.reserve() == 0.0
+    assert bucket.reserve() == pytest.approx(2.0)
+
+
+def test_rate_limiter_keys_are_independent(clock):
+    limiter = RateLimiter(per_minute=0, per_key_per_minute=60)
+
+    assert limiter.wait("a.com") == 0.0
+    assert limiter.wait("a.com") == pytest.approx(1.0)
+    assert limiter.wait("b.com") == 0.0
+    assert clock.slept == [pytest.approx(1.0)]
+
+
+def test_rate_limiter_global_limit_applies_across_keys(clock):
+    limiter = RateLimiter(per_minute=60)
+
+    assert limiter.wait("a.com") == 0.0
+    assert limiter.wait("b.com") == pytest.approx(1.0)
+    assert RateLimiter().wait("a.com") == 0.0
+
+
+def test_shared_bucket_is_one_limit_for_all_instances(db, monkeypatch):
+    now = [5000.0]
+    monkeypatch.setattr(rate_limit.time, "time", lambda: now[0])
+    # Two processes (or a scheduler run and a manual send) with their own objects
+    first, second = SharedTokenBucket("test:*", 60), SharedTokenBucket("test:*", 60)
+
+    assert first.reserve() == 0.0
+    assert second.reserve() == pytest.approx(1.0)
+    assert first.reserve() == pytest.approx(2.0)
+
+    now[0] += 10
+    assert second.reserve() == 0.0
+
+
+def test_shared_limiter_survives_new_runs(db, monkeypatch):
+    monkeypatch.setattr(rate_limit.time, "time", lambda: 5000.0)
+    monkeypatch.setattr(rate_limit.time, "sleep", lambda seconds: None)
+
+    assert RateLimiter(per_minute=60, shared_name="bulk_email").wait("a.com") == 0.0
+    # A new run does not start with a full bucket
+    assert RateLimiter(per_minute=60, shared_name="bulk_email").wait("b.com") == pytest.approx(1.0)
+    per_domain = RateLimiter(per_key_per_minute=60, shared_name="bulk_email")
+    assert per_domain.wait("a.com") == 0.0
+    assert per_domain.wait("b.com") == 0.0
+    assert RateLimiter(per_key_per_minute=60, shared_name="bulk_email").wait("a.com") == pytest.approx(1.0)
@@ -0,0 +1,106 @@
+import pytest
+from sqlalchemy import LargeBinary, select, type_coerce
+
+from app import compression
+from app.config import settings
+from app.models import BulkEmail, MsgDir, Ticket, TicketMessage
+from app.compression import compress_existing_rows, compress_text, decompress_text, is_compressed
+
+LONG = "Quoted reply line with ünïcode – " * 200
+
+
+@pytest.fixture
+def zlib_enabled(monkeypatch):
+    monkeypatch.setattr(settings, "TEXT_COMPRESSION", "zlib")
+    monkeypatch.setattr(settings, "TEXT_COMPRESSION_MIN_BYTES", 100)
+
+
+def _stored(db, row_id):
+    return db.execute(
+        select(type_coerce(BulkEmail.content, LargeBinary)).where(BulkEmail.id == row_id)
+    ).scalar_one()
+
+
+def test_zlib_round_trip():
+    packed = compress_text(LONG, "zlib")
+    assert packed.startswith(compression.ZLIB_MARKER)
+    assert len(packed) < len(LONG)
+    assert decompress_text(packed) == LONG
+
+
+def test_zstd_round_trip():
+    pytest.importorskip("zstandard")
+    packed = compress_text(LONG, "zstd")
+    assert packed.startswith(compression.ZSTD_MARKER)
+    assert decompress_text(packed) == LONG
+
+
+def test_plain_values_are_utf8():
+    assert decompress_text("héllo".encode("utf-8")) == "héllo"
+    assert not is_compressed(b"hello")
+    assert not is_compressed(None)
+
+
+def test_column_compresses_only_large_values(db, zlib_enabled):
+    db.add_all([BulkEmail(email="a@example.com", content="short"),
+                BulkEmail(email="b@example.com", content=LONG)])
+    db.commit()
+
+    assert _stored(db, 1) == b"short"
+    stored = _stored(db, 2)
+    assert is_compressed(stored)
+    # Raw compressed bytes, no base64 wrapping
+    assert stored == compress_text(LONG, "zlib")
+
+    db.expire_all()
+    assert [row.content for row in db.query(BulkEmail).order_by(BulkEmail.id)] == ["short", LONG]
+
+
+def test_marker_lookalike_is_escaped_with_compression_off(db):
+    assert settings.TEXT_COMPRESSION == "none"
+    lookalike = compression.ZLIB_MARKER.decode() + "not really compressed"
+    db.add_all([BulkEmail(email="a@example.com", content=LONG),
+                BulkEmail(email="b@example.com", content=lookalike)])
+    db.commit()
+
+    assert _stored(db, 1) == LONG.encode("utf-8")
+    assert is_compressed(_stored(db, 2))
+    db.expire_all()
+    assert db.get(BulkEmail, 2).content == lookalike
+
+
+def test_message_bodies_stay_searchable(db, zlib_enabled):
+    ticket = Ticket(customer_email="c@example.com", subject="s")
+    db.add(ticket)
+    db.flush()
+    db.add(TicketMessage(
+        ticket_id=ticket.id, direction=MsgDir.inbound, from_email="c@example.com",
+        to_email="support@example.com", subject="s", body=LONG + "deep in the quoted chain",
+    ))
+    db.commit()
+
+    assert db.query(TicketMessage).filter(TicketMessage.body.ilike("%DEEP IN THE QUOTED%")).count() == 1
+
+
+def test_compress_existing_rows(db, monkeypatch):
+    db.add_all([BulkEmail(email=f"r{i}@example.com", content=LONG if i % 2 else "short")
+                for i in range(5)])
+    db.commit()
+    monkeypatch.setattr(settings, "TEXT_COMPRESSION", "zlib")
+    monkeypatch.setattr(settings, "TEXT_COMPRESSION_MIN_BYTES", 100)
+
+    dry = compress_existing_rows(db, chunk_size=2, dry_run=True)["bulk_emails.content"]
+    assert (dry["rows"], dry["compressed"]) == (5, 2)
+    assert not is_compressed(_stored(db, 2))
+
+    stats = compress_existing_rows(db, chunk_size=2)["bulk_emails.content"]
+    assert (stats["rows"], stats["compressed"]) == (5, 2)
+    stored = [_stored(db, i) for i in range(1, 6)]
+    assert [is_compressed(value) for value in stored] == [False, True, False, True, False]
+    # Byte counts are what the column actually holds
+    assert stats["bytes_before"] == 2 * len(LONG.encode("utf-8")) + 3 * len(b"short")
+    assert stats["bytes_after"] == sum(len(value) for value in stored)
+
+    db.expire_all()
+    assert db.get(BulkEmail, 2).content == LONG
+    assert compress_existing_rows(db)["bulk_emails.content"]["compressed"] == 0
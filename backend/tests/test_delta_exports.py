@@ -0,0 +1,132 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import insert
+
+from app.config import settings
+from app.models import TicketEvent, TicketListView, TicketStatus
+from app.services import exports
+
+KIND = exports.TICKET_EVENTS
+
+
+def _add_events(db, times):
+    db.execute(insert(TicketEvent), [
+        {"ticket_id": 1, "event_type": "status_change", "new_value": str(i), "created_at": at}
+        for i, at in enumerate(times)
+    ])
+    db.commit()
+
+
+def _pull(db, token=None, since=None, limit=None, filters=None):
+    filters = filters or {}
+    export, next_token, has_more = exports.delta_export(
+        db, KIND, exports.ticket_events_export(**filters), filters, token=token, since=since, limit=limit
+    )
+    return [row.id for row in db.execute(export.statement)], next_token, has_more
+
+
+def test_token_round_trip():
+    at = datetime(2026, 3, 1, 12, 30, 5)
+    token = exports.encode_token(KIND, {"ticket_id": 4}, at, 17)
+    assert "=" not in token
+    assert exports.decode_token(KIND, {"ticket_id": 4}, token) == (at, 17)
+    assert exports.decode_token(KIND, {}, exports.encode_token(KIND, {}, at, None)) == (at, None)
+
+
+@pytest.mark.parametrize("kind, filters", [
+    (KIND, {"ticket_id": 5}),
+    (exports.TICKETS, {"ticket_id": 4}),
+])
+def test_token_rejects_other_export_or_filters(kind, filters):
+    token = exports.encode_token(KIND, {"ticket_id": 4}, datetime(2026, 3, 1), 1)
+    with pytest.raises(ValueError, match="different export"):
+        exports.decode_token(kind, filters, token)
+
+
+@pytest.mark.parametrize("token", ["", "not base64!", "e30", "eyJmIjogIngifQ"])
+def test_token_rejects_malformed(token):
+    with pytest.raises(ValueError, match="Invalid continuation token"):
+        exports.decode_token(KIND, {}, token)
+
+
+def test_token_rejects_non_integer_id():
+    token = exports.encode_token(KIND, {}, datetime(2026, 3, 1), "7")
+    with pytest.raises(ValueError, match="Invalid continuation token"):
+        exports.decode_token(KIND, {}, token)
+
+
+def test_keyset_pages_cover_ties_once(db):
+    base = datetime.utcnow().replace(microsecond=0) - timedelta(minutes=10)
+    # Several rows share a second, and page boundaries fall inside the ties
+    times = [base, base, base, base + timedelta(seconds=1), base + timedelta(seconds=1), base,
+             base + timedelta(seconds=2)]
+    _add_events(db, times)
+
+    seen, token, pages = [], None, 0
+    while True:
+        ids, token, has_more = _pull(db, token=token, limit=2)
+        seen.extend(ids)
+        pages += 1
+        if not has_more:
+            break
+
+    expected = [i + 1 for i, _ in sorted(enumerate(times), key=lambda item: (item[1], item[0]))]
+    assert seen == expected
+    assert pages == 4
+    # Nothing new after the last page
+    assert _pull(db, token=token, limit=2)[0] == []
+
+
+def test_unlimited_pull_ends_at_cutoff(db, monkeypatch):
+    monkeypatch.setattr(settings, "EXPORT_DELTA_LAG_SECONDS", 30)
+    now = datetime.utcnow().replace(microsecond=0)
+    _add_events(db, [now - timedelta(minutes=5), now - timedelta(seconds=5)])
+
+    ids, token, has_more = _pull(db)
+    assert ids == [1] and not has_more
+
+    # The token points at the cutoff, before the row still inside the lag
+    at, row_id = exports.decode_token(KIND, {}, token)
+    assert row_id is None
+    assert now - timedelta(minutes=5) <= at < now - timedelta(seconds=5)
+
+
+def test_lag_is_at_least_one_second(db, monkeypatch):
+    monkeypatch.setattr(settings, "EXPORT_DELTA_LAG_SECONDS", 0)
+    _add_events(db, [datetime.utcnow() + timedelta(seconds=1)])
+    assert _pull(db)[0] == []
+
+
+def test_since_and_filters(db):
+    base = datetime.utcnow().replace(microsecond=0) - timedelta(hours=1)
+    _add_events(db, [base, base + timedelta(minutes=1), base + timedelta(minutes=2)])
+    db.execute(insert(TicketEvent), [
+        {"ticket_id": 2, "event_type": "status_change", "created_at": base + timedelta(minutes=3)}
+    ])
+    db.commit()
+
+    assert _pull(db, since=base)[0] == [2, 3, 4]
+    ids, token, _ = _pull(db, since=base, filters={"ticket_id": 1})
+    assert ids == [2, 3]
+    with pytest.raises(ValueError):
+        _pull(db, token=token, filters={"ticket_id": 2})
+
+
+def test_ticket_pages_follow_updated_at(db):
+    base = datetime.utcnow().replace(microsecond=0) - timedelta(minutes=10)
+    updated = {1: base + timedelta(seconds=1), 2: base, 3: base + timedelta(seconds=1), 4: base}
+    db.execute(insert(TicketListView), [
+        {"ticket_id": ticket_id, "customer_email": "c@example.com", "subject": "s",
+         "status": TicketStatus.Open, "message_count": 0, "updated_at": at}
+        for ticket_id, at in updated.items()
+    ])
+    db.commit()
+
+    seen, token, has_more = [], None, True
+    while has_more:
+        export, token, has_more = exports.delta_export(
+            db, exports.TICKETS, exports.tickets_export(), {}, token=token, limit=3
+        )
+        seen.extend(row.ticket_id for row in db.execute(export.statement))
+    assert seen == [2, 4, 1, 3]
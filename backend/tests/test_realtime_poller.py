@@ -0,0 +1,122 @@
+import asyncio
+
+import pytest
+from sqlalchemy import insert
+
+from app.models import RealtimeEvent
+from app.services import realtime
+from app.services.realtime import DatabaseFanOut
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(realtime.time, "monotonic", clock.monotonic)
+    return clock
+
+
+def _commit_ids(db, *ids):
+    db.execute(insert(RealtimeEvent), [
+        {"id": event_id, "event_type": realtime.NEW_MESSAGE, "ticket_id": event_id, "payload": "{}"}
+        for event_id in ids
+    ])
+    db.commit()
+
+
+def _poller(floor=0) -> DatabaseFanOut:
+    poller = DatabaseFanOut()
+    poller._floor = floor
+    return poller
+
+
+def _poll(poller):
+    return [event["id"] for event in poller._poll()]
+
+
+def test_floor_follows_contiguous_ids(db, clock):
+    poller = _poller()
+    _commit_ids(db, 1, 2, 3)
+
+    assert _poll(poller) == [1, 2, 3]
+    assert (poller._floor, poller._seen, poller._gap_since) == (3, set(), None)
+    assert _poll(poller) == []
+
+
+def test_late_commit_behind_a_gap_is_delivered_once(db, clock):
+    poller = _poller()
+    # Id 3 is still uncommitted when 4 and 5 become visible
+    _commit_ids(db, 1, 2, 4, 5)
+
+    assert _poll(poller) == [1, 2, 4, 5]
+    assert poller._floor == 2
+    assert poller._gap_since == clock.now
+
+    clock.now += 1
+    assert _poll(poller) == []
+
+    _commit_ids(db, 3)
+    assert _poll(poller) == [3]
+    assert (poller._floor, poller._seen, poller._gap_since) == (5, set(), None)
+
+
+def test_gap_is_skipped_after_timeout(db, clock):
+    poller = _poller()
+    # Id 2 was rolled back and never shows up
+    _commit_ids(db, 1, 3, 4)
+
+    assert _poll(poller) == [1, 3, 4]
+    clock.now += realtime.GAP_TIMEOUT_SECONDS
+    assert _poll(poller) == []
+    assert poller._floor == 1
+
+    clock.now += 1
+    assert _poll(poller) == []
+    assert (poller._floor, poller._seen, poller._gap_since) == (4, set(), None)
+
+    _commit_ids(db, 5)
+    assert _poll(poller) == [5]
+
+
+def test_subscribers_only_see_their_tickets():
+    async def receive():
+        owner = realtime.broker.subscribe(user_id=7, is_admin=False)
+        other = realtime.broker.subscribe(user_id=8, is_admin=False)
+        admin = realtime.broker.subscribe(user_id=1, is_admin=True)
+        try:
+            realtime.broker.dispatch([
+                {"type": realtime.TICKET_ASSIGNED, "ticket_id": 1, "assigned_to": 8, "previous_assigned_to": 7},
+                {"type": realtime.NEW_MESSAGE, "ticket_id": 2, "assigned_to": 9},
+            ])
+            await asyncio.sleep(0)
+            return [
+                [subscriber.queue.get_nowait()["ticket_id"] for _ in range(subscriber.queue.qsize())]
+                for subscriber in (owner, other, admin)
+            ]
+        finally:
+            for subscriber in (owner, other, admin):
+                realtime.broker.unsubscribe(subscriber)
+
+    assert asyncio.run(receive()) == [[1], [1], [1, 2]]
+
+
+def test_slow_subscriber_gets_resync(monkeypatch):
+    monkeypatch.setattr(realtime, "SUBSCRIBER_QUEUE_SIZE", 2)
+
+    async def receive():
+        subscriber = realtime.broker.subscribe(user_id=1, is_admin=True)
+        try:
+            realtime.broker.dispatch([{"type": realtime.NEW_MESSAGE, "ticket_id": i} for i in range(3)])
+            await asyncio.sleep(0)
+            return [subscriber.queue.get_nowait() for _ in range(subscriber.queue.qsize())]
+        finally:
+            realtime.broker.unsubscribe(subscriber)
+
+    assert asyncio.run(receive()) == [{"type": realtime.RESYNC}]
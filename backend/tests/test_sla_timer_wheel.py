@@ -0,0 +1,98 @@
+from datetime import datetime, timedelta
+
+from app.config import settings
+from app.models import Ticket, TicketEvent, TicketSLA
+from app.services import sla
+from app.services.sla import SLAScheduler, TimerWheel
+
+BASE = datetime(2026, 3, 1, 12, 0, 0)
+
+
+def _at(seconds: int) -> datetime:
+    return BASE + timedelta(seconds=seconds)
+
+
+def test_key_fires_once_at_its_tick():
+    wheel = TimerWheel(tick_seconds=10, slots=8)
+    wheel.schedule(1, _at(25))
+    wheel.schedule(2, _at(40))
+
+    assert wheel.advance(_at(10)) == []
+    assert wheel.advance(_at(29)) == [1]
+    assert wheel.advance(_at(35)) == []
+    assert wheel.advance(_at(45)) == [2]
+    assert wheel.advance(_at(45)) == []
+    assert len(wheel) == 0
+
+
+def test_key_beyond_one_revolution_waits_for_its_own_tick():
+    wheel = TimerWheel(tick_seconds=10, slots=4)
+    wheel.schedule(1, _at(0))
+    wheel.schedule(2, _at(50))  # same slot as tick 1 of this revolution
+
+    assert wheel.advance(_at(10)) == [1]
+    assert wheel.advance(_at(49)) == []
+    assert wheel.advance(_at(50)) == [2]
+
+
+def test_jump_past_several_revolutions_fires_everything_due():
+    wheel = TimerWheel(tick_seconds=10, slots=4)
+    wheel.schedule(1, _at(0))
+    for key in range(2, 12):
+        wheel.schedule(key, _at(key * 10))
+    wheel.schedule(99, _at(500))
+
+    assert wheel.advance(_at(0)) == [1]
+    assert sorted(wheel.advance(_at(300))) == list(range(2, 12))
+    assert len(wheel) == 1
+
+
+def test_reschedule_and_cancel():
+    wheel = TimerWheel(tick_seconds=10, slots=8)
+    wheel.schedule(1, _at(20))
+    wheel.schedule(2, _at(20))
+    wheel.schedule(1, _at(60))
+    wheel.cancel(2)
+    wheel.cancel(3)  # unknown keys are ignored
+
+    assert wheel.advance(_at(30)) == []
+    assert len(wheel) == 1
+    assert wheel.advance(_at(60)) == [1]
+
+
+def test_overdue_key_fires_on_next_advance():
+    wheel = TimerWheel(tick_seconds=10, slots=8)
+    wheel.schedule(1, _at(-3600))  # first advance starts from the earliest key
+    assert wheel.advance(_at(0)) == [1]
+
+    # Scheduled behind the wheel: lands on the next tick instead of being lost
+    wheel.schedule(2, _at(-60))
+    assert wheel.advance(_at(5)) == []
+    assert wheel.advance(_at(10)) == [2]
+
+
+def test_scheduler_fires_breach_once(db, monkeypatch):
+    monkeypatch.setattr(settings, "SLA_FIRST_RESPONSE_HOURS", 1)
+    monkeypatch.setattr(settings, "SLA_RESOLUTION_HOURS", 24)
+    created = datetime.utcnow().replace(microsecond=0) - timedelta(hours=2)
+    db.add(Ticket(customer_email="c@example.com", subject="s", created_at=created, updated_at=created))
+    db.commit()
+
+    row = db.query(TicketSLA).one()
+    assert row.first_response_due_at == created + timedelta(hours=1)
+
+    scheduler = SLAScheduler(tick_seconds=5)
+    now = datetime.utcnow()
+    assert scheduler.tick(now) == 1
+    assert scheduler.tick(now + timedelta(seconds=5)) == 0
+
+    # A second process that loaded the same timer does not fire it again
+    assert sla.fire_due(db, [row.ticket_id], now) == 0
+
+    db.expire_all()
+    row = db.query(TicketSLA).one()
+    assert row.first_response_breached_at is not None
+    assert row.next_due_at == created + timedelta(hours=24)
+    assert [(e.event_type, e.new_value) for e in db.query(TicketEvent)] == [
+        (sla.KIND_EVENT_TYPES[sla.FIRST_RESPONSE], sla.FIRST_RESPONSE)
+    ]
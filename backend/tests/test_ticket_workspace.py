@@ -0,0 +1,85 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.db import get_db
+from app.deps import get_current_user
+from app.models import MsgDir, Role, Ticket, TicketEvent, TicketFeedback, TicketMessage, TicketNote, User
+from app.routers import tickets
+
+
+@pytest.fixture
+def client(db):
+    admin = User(name="Admin", email="admin@example.com", role=Role.admin, password_hash="x")
+    adviser = User(name="Adviser", email="adviser@example.com", role=Role.adviser, password_hash="x")
+    db.add_all([admin, adviser])
+    db.flush()
+    ticket = Ticket(customer_email="c@example.com", subject="Help", assigned_to=admin.id)
+    db.add(ticket)
+    db.flush()
+    db.add_all(
+        [TicketMessage(ticket_id=ticket.id, direction=MsgDir.inbound, from_email="c@example.com",
+                       to_email="support@example.com", subject="Help", body=f"message {i}") for i in range(3)]
+        + [TicketNote(ticket_id=ticket.id, user_id=admin.id, note=f"note {i}") for i in range(3)]
+        + [TicketEvent(ticket_id=ticket.id, event_type="status_change", new_value="Pending")]
+        + [TicketFeedback(ticket_id=ticket.id, token="token", support_rating=5)]
+    )
+    db.commit()
+
+    app = FastAPI()
+    app.include_router(tickets.router, prefix="/tickets")
+    user = {"current": admin}
+    app.dependency_overrides[get_db] = lambda: db
+    app.dependency_overrides[get_current_user] = lambda: user["current"]
+    client = TestClient(app)
+    client.user, client.adviser = user, adviser
+    return client
+
+
+def test_sections_page_with_has_more(client):
+    body = client.get("/tickets/1/workspace?messages_page_size=2&notes_page_size=2").json()
+
+    assert body["ticket"]["subject"] == "Help"
+    assert [m["body"] for m in body["messages"]["items"]] == ["message 0", "message 1"]
+    assert (body["messages"]["total"], body["messages"]["has_more"]) == (3, True)
+    assert len(body["notes"]["items"]) == 2 and body["notes"]["has_more"]
+    assert "total" not in body["notes"]
+    assert len(body["events"]["items"]) == 1 and not body["events"]["has_more"]
+    assert body["feedback"]["support_rating"] == 5
+
+    last = client.get("/tickets/1/workspace?notes_page=2&notes_page_size=2").json()["notes"]
+    assert len(last["items"]) == 1 and not last["has_more"]
+
+
+def test_unchanged_workspace_is_not_modified(client, db):
+    first = client.get("/tickets/1/workspace")
+    etag = first.headers["etag"]
+    assert client.get("/tickets/1/workspace", headers={"If-None-Match": etag}).status_code == 304
+    # Different pages are different representations
+    assert client.get("/tickets/1/workspace?notes_page_size=1", headers={"If-None-Match": etag}).status_code == 200
+
+    db.add(TicketNote(ticket_id=1, user_id=1, note="new"))
+    db.commit()
+    changed = client.get("/tickets/1/workspace", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert len(changed.json()["notes"]["items"]) == 4
+
+    etag = changed.headers["etag"]
+    db.query(TicketFeedback).one().product_rating = 3
+    db.commit()
+    changed = client.get("/tickets/1/workspace", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.json()["feedback"]["product_rating"] == 3
+
+
+def test_notes_hidden_from_other_advisers(client):
+    etag = client.get("/tickets/1/workspace").headers["etag"]
+    client.user["current"] = client.adviser
+
+    response = client.get("/tickets/1/workspace", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["notes"] is None
+
+
+def test_missing_ticket(client):
+    assert client.get("/tickets/99/workspace").status_code == 404
@@ -78,6 +78,10 @@ export interface Ticket {
   language?: { id: number; name: string }
   voc?: { id: number; name: string }
   priority?: { id: number; name: string; weight: number }
+  message_count?: number
+  last_message_snippet?: string
+  last_message_at?: string
+  last_inbound_at?: string
 }
 
 export interface TicketMessage {
@@ -92,6 +96,19 @@ export interface TicketMessage {
   created_by?: number
 }
 
+export interface TicketMessageSummary {
+  id: number
+  direction: 'inbound' | 'outbound'
+  from_email: string
+  to_email: string
+  subject: string
+  snippet: string
+  body_size: number
+  attachment_count: number
+  sent_at: string
+  created_by?: number
+}
+
 export interface CategoryLanguage {
   id: number
   name: string
@@ -130,11 +147,90 @@ export interface LoginResponse {
   user: User
 }
 
+export interface WorkspaceSection<T> {
+  items: T[]
+  // Only messages report a total; every section reports has_more
+  total?: number
+  has_more: boolean
+  page: number
+  page_size: number
+}
+
+export interface TicketWorkspace {
+  ticket: Ticket
+  messages: WorkspaceSection<TicketMessage>
+  notes: WorkspaceSection<any> | null
+  events: WorkspaceSection<{
+    id: number
+    event_type: string
+    old_value?: string
+    new_value?: string
+    created_at: string
+  }>
+  feedback: {
+    support_rating?: number
+    delivery_rating?: number
+    product_rating?: number
+    submitted_at?: string
+    created_at: string
+  } | null
+  reference: {
+    language_ids: number[]
+    voc_ids: number[]
+    priority_ids: number[]
+    template_ids: number[]
+  }
+}
+
 export interface TicketListResponse {
   tickets: Ticket[]
-  total: number
+  total: number | null
   page: number
   page_size: number
+  total_is_estimate?: boolean
+}
+
+export interface BulkTicketSelection {
+  ticket_ids?: number[]
+  filter?: {
+    status?: string
+    priority_id?: number
+    assigned_to?: number
+    unassigned?: boolean
+    from_date?: string
+    to_date?: string
+  }
+}
+
+export interface BulkTicketJob {
+  job_id: number
+  operation: 'reassign' | 'status' | 'retag'
+  status: 'queued' | 'running' | 'completed' | 'failed'
+  total: number
+  processed: number
+  updated: number
+  error?: string | null
+  created_at: string
+  finished_at?: string | null
+}
+
+export type InboxEventType =
+  | 'ticket_created'
+  | 'ticket_assigned'
+  | 'status_changed'
+  | 'new_message'
+  | 'sla_breach'
+  | 'pending_reminder'
+  | 'resync'
+
+export interface InboxEvent {
+  id?: number
+  type: InboxEventType
+  ticket_id?: number
+  assigned_to?: number | null
+  previous_assigned_to?: number | null
+  data?: Record<string, any>
+  at?: string
 }
 
 // Auth API
@@ -162,6 +258,7 @@ export const ticketsAPI = {
     sort_order?: 'asc' | 'desc'
     page?: number
     page_size?: number
+    count?: 'exact' | 'estimate' | 'none'
   }): Promise<TicketListResponse> => {
     const response: AxiosResponse<TicketListResponse> = await apiClient.get('/tickets', { params })
     return response.data
@@ -197,6 +294,18 @@ export const ticketsAPI = {
     return response.data
   },
 
+  workspace: async (id: number, params?: {
+    messages_page?: number
+    messages_page_size?: number
+    notes_page?: number
+    notes_page_size?: number
+    events_page?: number
+    events_page_size?: number
+  }): Promise<TicketWorkspace> => {
+    const response: AxiosResponse<TicketWorkspace> = await apiClient.get(`/tickets/${id}/workspace`, { params })
+    return response.data
+  },
+
   getMessages: async (id: number, page?: number, page_size?: number): Promise<TicketMessage[]> => {
     const response: AxiosResponse<TicketMessage[]> = await apiClient.get(`/tickets/${id}/messages`, {
       params: { page, page_size }
@@ -204,6 +313,21 @@ export const ticketsAPI = {
     return response.data
   },
 
+  getMessageSummaries: async (id: number, page?: number, page_size?: number): Promise<TicketMessageSummary[]> => {
+    const response: AxiosResponse<TicketMessageSummary[]> = await apiClient.get(`/tickets/${id}/messages`, {
+      params: { page, page_size, mode: 'summary' }
+    })
+    return response.data
+  },
+
+  getMessageBodies: async (id: number, ids: number[]): Promise<{ id: number; body: string; attachments_json?: string }[]> => {
+    const response = await apiClient.get(`/tickets/${id}/messages/bodies`, {
+      params: { ids },
+      paramsSerializer: { indexes: null }
+    })
+    return response.data
+  },
+
 //   reply: async (id: number, text: string, template_id?: number, close_after?: boolean): Promise<any> => {
 //     const payload: Record<string, any> = {
 //         text: text.trim(),
@@ -235,6 +359,29 @@ export const ticketsAPI = {
     return response.data
   },
 
+  bulkReassign: async (selection: BulkTicketSelection, assigned_to: number): Promise<BulkTicketJob> => {
+    const response = await apiClient.post('/tickets/bulk/reassign', { ...selection, assigned_to })
+    return response.data
+  },
+
+  bulkStatus: async (selection: BulkTicketSelection, status: string, send_feedback = false): Promise<BulkTicketJob> => {
+    const response = await apiClient.post('/tickets/bulk/status', { ...selection, status, send_feedback })
+    return response.data
+  },
+
+  bulkRetag: async (
+    selection: BulkTicketSelection,
+    tags: { language_id?: number; voc_id?: number; priority_id?: number }
+  ): Promise<BulkTicketJob> => {
+    const response = await apiClient.post('/tickets/bulk/retag', { ...selection, ...tags })
+    return response.data
+  },
+
+  bulkJob: async (jobId: number): Promise<BulkTicketJob> => {
+    const response = await apiClient.get(`/tickets/bulk/jobs/${jobId}`)
+    return response.data
+  },
+
 
   addNote(ticketId: number, note: string) {
       return apiClient.post(`/ticket-notes/${ticketId}`, { note });
@@ -407,4 +554,20 @@ export const bulkEmailAPI = {
   }
 }
 
+// Realtime inbox events (Server-Sent Events)
+export const eventsAPI = {
+  subscribe: (onEvent: (event: InboxEvent) => void): EventSource | null => {
+    const token = localStorage.getItem('token')
+    if (!token) return null
+
+    // EventSource can't send an Authorization header
+    const source = new EventSource(`${API_BASE_URL}/events/stream?token=${encodeURIComponent(token)}`)
+    const types: InboxEventType[] = ['ticket_created', 'ticket_assigned', 'status_changed', 'new_message', 'sla_breach', 'pending_reminder', 'resync']
+    types.forEach(type =>
+      source.addEventListener(type, (e) => onEvent(JSON.parse((e as MessageEvent).data)))
+    )
+    return source
+  },
+}
+
 export default apiClient 
\ No newline at end of file
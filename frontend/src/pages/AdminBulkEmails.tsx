@@ -9,7 +9,7 @@ export default function AdminBulkEmails() {
 
   // Upload Excel
   const handleUpload = async () => {
-    if (!file) return setError("Please upload an Excel file first")
+    if (!file) return setError("Please upload an Excel or CSV file first")
 
     setError(""); setMessage("")
 
@@ -51,7 +51,7 @@ export default function AdminBulkEmails() {
       <div className="p-4 bg-white rounded shadow space-y-3">
         <input
           type="file"
-          accept=".xlsx,.xls"
+          accept=".xlsx,.csv"
           onChange={(e) => setFile(e.target.files?.[0] || null)}
         />
 
@@ -1,5 +1,5 @@
 import React, { useState, useEffect } from 'react'
-import { ticketsAPI, usersAPI, User, Ticket } from '../api/client'
+import { ticketsAPI, usersAPI, User, Ticket, BulkTicketJob, BulkTicketSelection } from '../api/client'
 
 const AdminBulkReassign: React.FC = () => {
   const [advisers, setAdvisers] = useState<User[]>([])
@@ -11,6 +11,7 @@ const AdminBulkReassign: React.FC = () => {
   const [isReassigning, setIsReassigning] = useState(false)
   const [error, setError] = useState('')
   const [success, setSuccess] = useState('')
+  const [progress, setProgress] = useState<BulkTicketJob | null>(null)
 
   const [fromDate, setFromDate] = useState('')
   const [toDate, setToDate] = useState('')
@@ -78,32 +79,41 @@ const AdminBulkReassign: React.FC = () => {
     setSelectedTickets(newSelected)
   }
 
-  const handleBulkReassign = async () => {
-    if (!targetAgentId || selectedTickets.size === 0) return
+  const handleBulkReassign = async (allMatching = false) => {
+    if (!targetAgentId || !sourceAgentId) return
+    if (!allMatching && selectedTickets.size === 0) return
+
+    // "All matching" uses the same filter as the list, without the page size limit
+    const selection: BulkTicketSelection = allMatching
+      ? {
+          filter: {
+            assigned_to: sourceAgentId,
+            status: 'Open',
+            from_date: fromDate || undefined,
+            to_date: toDate || undefined
+          }
+        }
+      : { ticket_ids: Array.from(selectedTickets) }
 
     setIsReassigning(true)
     setError('')
     setSuccess('')
 
     try {
-      let successCount = 0
-      let errorCount = 0
-
-      // Reassign each ticket
-      for (const ticketId of selectedTickets) {
-        try {
-          await ticketsAPI.reassign(ticketId, targetAgentId)
-          successCount++
-        } catch (err) {
-          errorCount++
-          console.error(`Failed to reassign ticket ${ticketId}:`, err)
-        }
+      // One set-based job instead of a request per ticket
+      let job = await ticketsAPI.bulkReassign(selection, targetAgentId)
+      setProgress(job)
+
+      while (job.status === 'queued' || job.status === 'running') {
+        await new Promise(resolve => setTimeout(resolve, 1000))
+        job = await ticketsAPI.bulkJob(job.job_id)
+        setProgress(job)
       }
 
-      if (errorCount === 0) {
-        setSuccess(`Successfully reassigned ${successCount} ticket(s) to the new agent`)
+      if (job.status === 'completed') {
+        setSuccess(`Successfully reassigned ${job.updated} ticket(s) to the new agent`)
       } else {
-        setSuccess(`Reassigned ${successCount} ticket(s). ${errorCount} failed.`)
+        setError(`Reassigned ${job.updated} of ${job.total} ticket(s) before failing: ${job.error || 'unknown error'}`)
       }
 
       // Refresh tickets
@@ -111,9 +121,10 @@ const AdminBulkReassign: React.FC = () => {
       setSelectedTickets(new Set())
       setTargetAgentId(null)
     } catch (err: any) {
-      setError('Failed to complete bulk reassignment')
+      setError(err.response?.data?.detail || 'Failed to complete bulk reassignment')
     } finally {
       setIsReassigning(false)
+      setProgress(null)
     }
   }
 
@@ -465,11 +476,20 @@ const AdminBulkReassign: React.FC = () => {
               Reset
             </button>
             <button
-              onClick={handleBulkReassign}
+              onClick={() => handleBulkReassign(true)}
+              disabled={!targetAgentId || isReassigning}
+              className="px-6 py-2 text-sm font-medium text-blue-700 bg-white border border-blue-300 rounded-md hover:bg-blue-50 disabled:opacity-50 disabled:cursor-not-allowed"
+            >
+              Transfer All Open Tickets
+            </button>
+            <button
+              onClick={() => handleBulkReassign()}
               disabled={!targetAgentId || selectedTickets.size === 0 || isReassigning}
               className="px-6 py-2 text-sm font-medium text-white bg-blue-600 rounded-md hover:bg-blue-700 disabled:opacity-50 disabled:cursor-not-allowed"
             >
-              {isReassigning ? 'Transferring...' : `Transfer ${selectedTickets.size} Ticket(s)`}
+              {isReassigning
+                ? `Transferring${progress ? ` ${progress.processed}/${progress.total}` : ''}...`
+                : `Transfer ${selectedTickets.size} Ticket(s)`}
             </button>
           </div>
         </div>
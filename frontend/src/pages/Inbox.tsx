@@ -1,6 +1,6 @@
-import React, { useState, useEffect } from 'react'
+import React, { useState, useEffect, useRef } from 'react'
 import { useSearchParams, useNavigate } from 'react-router-dom'
-import { ticketsAPI, usersAPI, Ticket, User } from '../api/client'
+import { ticketsAPI, usersAPI, eventsAPI, Ticket, User } from '../api/client'
 import { useAuth } from '../hooks/useAuth'
 import TagPills from '../components/TagPills'
 
@@ -24,6 +24,11 @@ const Inbox: React.FC = () => {
 
   const [pendingReminders, setPendingReminders] = useState(0)
 
+  // Bumped by pushed inbox events to refetch without the loading screen
+  const [refreshKey, setRefreshKey] = useState(0)
+  const [remindersKey, setRemindersKey] = useState(0)
+  const silentRefresh = useRef(false)
+
   // Get filters from URL params
   const status = searchParams.get('status')
   const priorityId = searchParams.get('priority_id')
@@ -53,11 +58,29 @@ const Inbox: React.FC = () => {
     } catch {}
     }
 
+    // Refetched on pushed status changes and pending reminders
     fetchReminders()
+  }, [remindersKey])
 
-    const interval = setInterval(fetchReminders, 60000) // every 1 min
+  useEffect(() => {
+    let timer: ReturnType<typeof setTimeout> | undefined
 
-    return () => clearInterval(interval)
+    const source = eventsAPI.subscribe((event) => {
+      if (event.type === 'status_changed' || event.type === 'pending_reminder' || event.type === 'resync') {
+        setRemindersKey(key => key + 1)
+      }
+      // Coalesce bursts (e.g. new ticket + auto-assign) into one refetch
+      clearTimeout(timer)
+      timer = setTimeout(() => {
+        silentRefresh.current = true
+        setRefreshKey(key => key + 1)
+      }, 500)
+    })
+
+    return () => {
+      clearTimeout(timer)
+      source?.close()
+    }
   }, [])
 
 
@@ -68,8 +91,12 @@ const Inbox: React.FC = () => {
 
   useEffect(() => {
     const fetchTickets = async () => {
-      setIsLoading(true)
-      setError('')
+      const silent = silentRefresh.current
+      silentRefresh.current = false
+      if (!silent) {
+        setIsLoading(true)
+        setError('')
+      }
       
       try {
         const params: any = { page, page_size: pageSize }
@@ -86,7 +113,7 @@ const Inbox: React.FC = () => {
         
         const response = await ticketsAPI.list(params)
         setTickets(response.tickets)
-        setTotal(response.total)
+        setTotal(response.total ?? 0)
         console.log(`Fetched ${response.tickets.length} tickets, total: ${response.total}`)
       } catch (err: any) {
         setError(err.response?.data?.detail || 'Failed to fetch tickets')
@@ -96,7 +123,7 @@ const Inbox: React.FC = () => {
     }
 
     fetchTickets()
-  }, [status, priorityId, assignedTo, unassigned, search, page, pageSize, createdFrom, createdTo, sortBy, sortOrder])
+  }, [status, priorityId, assignedTo, unassigned, search, page, pageSize, createdFrom, createdTo, sortBy, sortOrder, refreshKey])
 
   useEffect(() => {
     if (currentUser?.role === 'admin') {
@@ -31,9 +31,7 @@ const TicketView: React.FC = () => {
 
   useEffect(() => {
     if (id) {
-      fetchTicket()
-      fetchMessages()
-      fetchNotes()
+      fetchWorkspace()
     }
   }, [id])
 
@@ -75,6 +73,20 @@ const TicketView: React.FC = () => {
   }
 
 
+  // Initial load: ticket, messages and notes in one request
+  const fetchWorkspace = async () => {
+    try {
+      const workspace = await ticketsAPI.workspace(parseInt(id!))
+      setTicket(workspace.ticket)
+      setMessages(workspace.messages.items)
+      setNotes(workspace.notes ? workspace.notes.items : [])
+    } catch (err: any) {
+      setError(err.response?.data?.detail || 'Failed to fetch ticket')
+    } finally {
+      setIsLoading(false)
+    }
+  }
+
   const fetchTicket = async () => {
     try {
       const ticketData = await ticketsAPI.get(parseInt(id!))